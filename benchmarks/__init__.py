@@ -0,0 +1,11 @@
+"""
+Benchmarks for json_modify.
+
+Run all scenarios and compare them with stored baseline::
+
+    python -m benchmarks --baseline benchmarks/baseline.json
+
+Baseline depends on the machine, so it isn't stored in repository: use
+``--save-baseline`` to store current results as new baseline. Comparison is
+skipped with a message, when baseline file doesn't exist yet.
+"""
@@ -0,0 +1,69 @@
+import argparse
+import json
+import sys
+import typing
+
+from benchmarks.measure import compare, load_baseline, run_scenarios, SCENARIOS
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "-s",
+        "--scenario",
+        action="append",
+        choices=[scenario["name"] for scenario in SCENARIOS],
+        help="scenario to run, can be repeated. default is all scenarios",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=20)
+    parser.add_argument("-o", "--output", help="file to write results to")
+    parser.add_argument("-b", "--baseline", help="baseline file to compare with")
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative regression. default is 0.2",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write results to baseline file instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.scenario or scenario["name"] in args.scenario
+    ]
+    results = run_scenarios(scenarios, args.repeat)
+
+    for name, metrics in sorted(results.items()):
+        print(
+            "{:<14} ".format(name)
+            + " ".join(
+                "{}={:.2f}".format(metric, value)
+                for metric, value in sorted(metrics.items())
+            )
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    elif args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            return 0
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Synthetic documents and action lists of configurable size.
+"""
+
+import bisect
+import itertools
+import random
+import typing
+
+ACTION_KINDS = (
+    "filter",
+    "index",
+    "add",
+    "replace",
+    "delete",
+    "rename",
+)
+
+
+def _leaf_paths(depth: int, fan_out: int) -> typing.List[typing.List[str]]:
+    paths = [[]]  # type: typing.List[typing.List[str]]
+    for _ in range(depth):
+        paths = [
+            path + ["key{}".format(index)] for path in paths for index in range(fan_out)
+        ]
+    return paths
+
+
+def _leaf(list_length: int) -> typing.Dict[str, typing.Any]:
+    return {
+        "items": [
+            {"name": "item{}".format(index), "value": index, "tags": ["a", "b"]}
+            for index in range(list_length)
+        ],
+        "meta": {"field{}".format(index): index for index in range(8)},
+    }
+
+
+def generate_document(
+    depth: int = 3, fan_out: int = 3, list_length: int = 100
+) -> typing.Dict[str, typing.Any]:
+    """
+    Generate document, that is tree of dictionaries with leaves, containing
+    list of dictionaries ('items') and flat dictionary ('meta').
+    :param depth: number of dictionaries between root and leaf
+    :param fan_out: number of keys in each dictionary on the way to leaves
+    :param list_length: number of elements in each 'items' list
+    :return: generated document
+    """
+    document = {}  # type: typing.Dict[str, typing.Any]
+    for path in _leaf_paths(depth, fan_out):
+        section = document
+        for key in path:
+            section = section.setdefault(key, {})
+        section.update(_leaf(list_length))
+    if not depth:
+        document.update(_leaf(list_length))
+    return document
+
+
+def generate_actions(
+    count: int,
+    depth: int = 3,
+    fan_out: int = 3,
+    list_length: int = 100,
+    mix: typing.Optional[typing.Dict[str, float]] = None,
+    seed: int = 0,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Generate actions, that can be applied to document from generate_document
+    with the same parameters one after another.
+    :param count: number of actions
+    :param depth: depth of the document
+    :param fan_out: fan out of the document
+    :param list_length: list length of the document
+    :param mix: relative weights of action kinds (see ACTION_KINDS).
+        default is equal weights
+    :param seed: seed for random generator
+    :return: list of actions
+    """
+    mix = mix or {kind: 1.0 for kind in ACTION_KINDS}
+    unknown = set(mix) - set(ACTION_KINDS)
+    if unknown:
+        raise ValueError("Unknown action kinds: {}".format(sorted(unknown)))
+
+    rnd = random.Random(seed)
+    kinds = sorted(mix)
+    cumulative = list(itertools.accumulate(mix[kind] for kind in kinds))
+    leaves = [
+        (path, ["item{}".format(index) for index in range(list_length)], list(range(8)))
+        for path in _leaf_paths(depth, fan_out)
+    ]
+
+    actions = []  # type: typing.List[typing.Dict[str, typing.Any]]
+    while len(actions) < count:
+        kind = kinds[bisect.bisect(cumulative, rnd.random() * cumulative[-1])]
+        path, names, fields = rnd.choice(leaves)
+        # Zero is not accepted as value of action.
+        number = len(actions) + 1
+        if kind in ("filter", "delete") and names:
+            position = rnd.randrange(len(names))
+            action = {
+                "path": path + ["items", "$item", "value"],
+                "item": [{"key": "name", "value": names[position]}],
+            }  # type: typing.Dict[str, typing.Any]
+            if kind == "delete":
+                action.update(action="delete", path=path + ["items", "$item"])
+                names.pop(position)
+            else:
+                action.update(action="replace", value=number)
+        elif kind == "index" and names:
+            action = {
+                "action": "replace",
+                "path": path
+                + ["items", "${}".format(rnd.randrange(len(names))), "value"],
+                "value": number,
+            }
+        elif kind == "add":
+            action = {
+                "action": "add",
+                "path": path + ["meta"],
+                "value": {"added{}".format(number): number},
+            }
+        elif kind == "replace":
+            action = {
+                "action": "replace",
+                "path": path + ["meta", "field{}".format(rnd.choice(fields))],
+                "value": number,
+            }
+        elif kind == "rename" and fields:
+            field = fields.pop(rnd.randrange(len(fields)))
+            action = {
+                "action": "rename",
+                "path": path + ["meta", "field{}".format(field)],
+                "value": "renamed{}".format(number),
+            }
+        else:
+            continue
+        actions.append(action)
+    return actions
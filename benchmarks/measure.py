@@ -0,0 +1,184 @@
+"""
+Measurement of scenarios and comparison with baseline.
+"""
+
+import copy
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import typing
+
+from benchmarks.generate import generate_actions, generate_document
+
+from json_modify import apply_actions, compile_actions
+
+Scenario = typing.Dict[str, typing.Any]
+Results = typing.Dict[str, typing.Dict[str, float]]
+
+SCENARIOS = [
+    {
+        "name": "filter-heavy",
+        "depth": 1,
+        "fan_out": 2,
+        "list_length": 5000,
+        "actions": 200,
+        "mix": {"filter": 1.0},
+    },
+    {
+        "name": "index-heavy",
+        "depth": 2,
+        "fan_out": 3,
+        "list_length": 500,
+        "actions": 200,
+        "mix": {"index": 1.0},
+    },
+    {
+        "name": "mixed",
+        "depth": 3,
+        "fan_out": 3,
+        "list_length": 200,
+        "actions": 200,
+        "mix": None,
+    },
+    {
+        "name": "deep-copy",
+        "depth": 4,
+        "fan_out": 4,
+        "list_length": 100,
+        "actions": 20,
+        "mix": {"replace": 1.0, "add": 1.0},
+        "copy": True,
+    },
+    {
+        "name": "path-copy",
+        "depth": 4,
+        "fan_out": 4,
+        "list_length": 100,
+        "actions": 20,
+        "mix": {"replace": 1.0, "add": 1.0},
+        "copy": "path",
+    },
+]
+
+# Metrics, where bigger value is better. For others smaller value is better.
+HIGHER_IS_BETTER = ("documents_per_second", "actions_per_second")
+
+
+def percentile(values: typing.Sequence[float], percent: float) -> float:
+    """
+    Get percentile of values with linear interpolation.
+    :param values: measured values
+    :param percent: percentile from 0 to 100
+    :return: value of percentile
+    """
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def run_scenario(scenario: Scenario, repeat: int = 20) -> typing.Dict[str, float]:
+    """
+    Measure single scenario.
+    :param scenario: description of document, actions and copy mode
+    :param repeat: number of measured applications
+    :return: metrics of scenario
+    """
+    shape = {key: scenario[key] for key in ("depth", "fan_out", "list_length")}
+    document = generate_document(**shape)
+    actions = generate_actions(scenario["actions"], mix=scenario["mix"], **shape)
+    copy_mode = scenario.get("copy", False)
+
+    start = time.perf_counter()
+    plan = compile_actions(actions)
+    compile_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeat):
+        source = document if copy_mode else copy.deepcopy(document)
+        gc.collect()
+        start = time.perf_counter()
+        apply_actions(source, plan, copy=copy_mode)
+        latencies.append(time.perf_counter() - start)
+
+    source = document if copy_mode else copy.deepcopy(document)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        apply_actions(source, plan, copy=copy_mode)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "compile_ms": compile_time * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "documents_per_second": repeat / total,
+        "actions_per_second": repeat * len(actions) / total,
+        "peak_memory_kb": peak / 1024.0,
+    }
+
+
+def run_scenarios(
+    scenarios: typing.Iterable[Scenario] = SCENARIOS, repeat: int = 20
+) -> Results:
+    """
+    Measure scenarios.
+    :param scenarios: scenarios to measure. default is SCENARIOS
+    :param repeat: number of measured applications for each scenario
+    :return: metrics for each scenario by it's name
+    """
+    return {scenario["name"]: run_scenario(scenario, repeat) for scenario in scenarios}
+
+
+def compare(
+    results: Results, baseline: Results, tolerance: float = 0.2
+) -> typing.List[str]:
+    """
+    Compare results with baseline.
+    :param results: measured metrics
+    :param baseline: stored metrics
+    :param tolerance: allowed relative change of metric to the worse side
+    :return: descriptions of regressions, empty when there are none
+    """
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            expected = baseline.get(name, {}).get(metric)
+            if not expected:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                regressed = value < expected * (1 - tolerance)
+            else:
+                regressed = value > expected * (1 + tolerance)
+            if regressed:
+                regressions.append(
+                    "{} {}: {:.3f} (baseline {:.3f})".format(
+                        name, metric, value, expected
+                    )
+                )
+    return regressions
+
+
+def load_baseline(file_name: str) -> typing.Optional[Results]:
+    """
+    Read stored baseline.
+    :param file_name: baseline file
+    :return: stored metrics or None, when file doesn't exist yet
+    """
+    if not os.path.exists(file_name):
+        print(
+            "baseline {} not found, comparison is skipped. "
+            "Run with --save-baseline to create it".format(file_name),
+            file=sys.stderr,
+        )
+        return None
+    with open(file_name, "r") as f:
+        return typing.cast(Results, json.load(f))
@@ -21,12 +21,27 @@
 #   SOFTWARE.
 
 
+import bisect
+import collections
+import contextlib
 from copy import deepcopy
+import functools
+import hashlib
+import importlib
+import itertools
 import json
+import marshal
+import mmap
 import typing
 import os
+import re
+import sys
+import threading
+import time
 
-import yaml
+if typing.TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+    from concurrent.futures import Executor, Future
 
 __version__ = "1.0.1"
 __license__ = "MIT"
@@ -41,24 +56,464 @@ __all__ = (
     "get_path",
     "get_section",
     "get_reader",
+    "get_writer",
+    "write_file",
+    "get_codec",
+    "register_codec",
+    "sniff_codec",
+    "Codec",
     "find_section_in_list",
+    "ActionError",
+    "ActionKeyError",
+    "ActionTypeError",
+    "ActionIndexError",
+    "ActionValueError",
+    "compile_action",
+    "compile_actions",
+    "FileCache",
+    "set_file_cache",
+    "CacheInfo",
+    "validation_cache_info",
+    "set_validation_cache_size",
+    "clear_validation_cache",
+    "optimize_actions",
+    "OptimizedActions",
+    "OptimizationStep",
+    "analyze_actions",
+    "ActionAnalysis",
+    "ActionGroup",
+    "Conflict",
+    "apply_actions_parallel",
+    "ActionPlan",
+    "CompiledAction",
+    "Marker",
+    "apply_actions_many",
+    "apply_patch",
+    "compile_patch",
+    "JsonPatch",
+    "resolve_pointer",
+    "apply_variants",
+    "BatchResult",
+    "ApplyStats",
+    "Observer",
+    "StatsObserver",
+    "profiled",
+    "UndoLog",
+    "read_json_lines",
+    "write_json_lines",
+    "apply_actions_stream",
+    "apply_actions_jsonl",
+    "read_yaml_documents",
+    "write_yaml_documents",
+    "apply_actions_yaml_stream",
+    "apply_actions_splice",
+    "diff_to_actions",
+    "apply_actions_async",
+    "apply_actions_many_async",
+    "main",
 )
 
 
-def get_reader(
-    file_name: str,
-) -> typing.Callable[[typing.Any], typing.Iterable[typing.Any]]:
+Reader = typing.Callable[[typing.IO[str]], typing.Iterable[typing.Any]]
+Writer = typing.Callable[[typing.Any, typing.IO[str]], None]
+
+Codec = typing.NamedTuple(
+    "Codec",
+    [
+        ("name", str),
+        ("extensions", typing.Tuple[str, ...]),
+        ("reader", Reader),
+        ("writer", Writer),
+    ],
+)
+Codec.__doc__ = """
+Reader and writer for file format.
+:param name: name of the format
+:param extensions: file extensions (with dot), handled by codec
+:param reader: function to read data from opened file
+:param writer: function to write data to opened file
+"""
+
+_CODECS = {}  # type: typing.Dict[str, Codec]
+_EXTENSIONS = {}  # type: typing.Dict[str, str]
+
+
+def register_codec(
+    name: str,
+    extensions: typing.Iterable[str],
+    reader: Reader,
+    writer: Writer,
+) -> Codec:
+    """
+    Register reader and writer for file format. Codec, registered for the same
+    name or extension before, is replaced.
+    :param name: name of the format
+    :param extensions: file extensions, handled by codec (for example '.json')
+    :param reader: function to read data from opened file
+    :param writer: function to write data to opened file
+    :return: registered codec
+    """
+    codec = Codec(name, tuple(ext.lower() for ext in extensions), reader, writer)
+    _CODECS[name] = codec
+    for ext in codec.extensions:
+        _EXTENSIONS[ext] = name
+    return codec
+
+
+def _yaml() -> typing.Any:
+    import yaml
+
+    return yaml
+
+
+def _yaml_reader(file: typing.IO[str]) -> typing.Any:
+    """
+    Read yaml document, using libyaml based loader when it's available.
+    """
+    yaml = _yaml()
+    return yaml.load(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def _yaml_writer(data: typing.Any, file: typing.IO[str]) -> None:
+    """
+    Write yaml document, using libyaml based dumper when it's available.
+    """
+    yaml = _yaml()
+    yaml.dump(
+        data,
+        file,
+        Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper),
+        default_flow_style=False,
+        sort_keys=False,
+    )
+
+
+def _json_loads() -> typing.Callable[[str], typing.Any]:
+    """
+    Find the fastest installed json parser: orjson, ujson or json.
+    """
+    for module_name in ("orjson", "ujson"):
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        return module.loads  # type: ignore
+    return json.loads
+
+
+def _json_reader(file: typing.IO[str]) -> typing.Any:
+    """
+    Read json document with the fastest installed parser. Documents, that it
+    rejects (for example NaN or big integers), are parsed by json module.
+    """
+    global _fast_json_loads
+    if _fast_json_loads is None:
+        _fast_json_loads = _json_loads()
+    content = file.read()
+    try:
+        return _fast_json_loads(content)
+    except ValueError:
+        return json.loads(content)
+
+
+_fast_json_loads = None  # type: typing.Optional[typing.Callable[[str], typing.Any]]
+
+
+_WRITE_BUFFER = 1 << 16
+# Members of containers with more members are treated as records and are
+# encoded at once, unless they are large containers themselves.
+_SPLIT_SIZE = 64
+
+
+def _json_chunks(
+    value: typing.Any, depth: int, record: bool = False
+) -> typing.Iterator[str]:
+    """
+    Encode value piece by piece exactly like json.dumps. Containers are split
+    into members up to depth levels, records of large containers and scalars
+    are encoded at once by the C encoder, so only the largest record is kept
+    in memory.
+    """
+    kind = type(value)
+    if (
+        depth
+        and (kind is list or kind is dict)
+        and (not record or len(value) > _SPLIT_SIZE)
+    ):
+        record = len(value) > _SPLIT_SIZE
+        if kind is list:
+            yield "["
+            separator = ""
+            for item in value:
+                yield separator
+                separator = ", "
+                yield from _json_chunks(item, depth - 1, record)
+            yield "]"
+            return
+        if all(type(key) is str for key in value):
+            yield "{"
+            separator = ""
+            for key, item in value.items():
+                yield separator + json.dumps(key) + ": "
+                separator = ", "
+                yield from _json_chunks(item, depth - 1, record)
+            yield "}"
+            return
+    yield json.dumps(value)
+
+
+def _json_writer(data: typing.Any, file: typing.IO[str]) -> None:
+    """
+    Write json document in chunks, encoded by the C encoder, instead of
+    json.dump, that encodes with pure python encoder.
+    """
+    buffer = []  # type: typing.List[str]
+    size = 0
+    for chunk in _json_chunks(data, 8):
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= _WRITE_BUFFER:
+            file.write("".join(buffer))
+            buffer = []
+            size = 0
+    file.write("".join(buffer))
+
+
+register_codec("json", [".json"], _json_reader, _json_writer)
+register_codec("yaml", [".yaml", ".yml"], _yaml_reader, _yaml_writer)
+
+
+def sniff_codec(sample: str) -> str:
+    """
+    Determine format by content of the file.
+    :param sample: beginning of the file
+    :return: 'json' when content starts with object or array, 'yaml' otherwise
+    """
+    if sample.lstrip()[:1] in ("{", "["):
+        return "json"
+    return "yaml"
+
+
+def get_codec(file_name: str, sniff: bool = False) -> Codec:
+    """
+    Determine codec for file by it's extension.
+    :param file_name: name of the file
+    :param sniff: when extension is unknown, determine codec by content of
+        the file. default is False
+    :return: codec for file
+    """
+    ext = os.path.splitext(file_name)[-1]
+    name = _EXTENSIONS.get(ext.lower())
+    if name is None and sniff:
+        with open(file_name, "r") as f:
+            name = sniff_codec(f.read(1024))
+    if name is None:
+        raise ValueError("Cant determine reader for {} extension".format(ext))
+    return _CODECS[name]
+
+
+def get_reader(file_name: str, sniff: bool = False) -> Reader:
     """
     Determine reader for file.
     :param file_name: name of the file with source data
+    :param sniff: when extension is unknown, determine reader by content of
+        the file. default is False
     :return: function to read data from file
     """
-    ext = os.path.splitext(file_name)[-1]
-    if ext in [".yaml", "yml"]:
-        return yaml.safe_load
-    elif ext == ".json":
-        return json.load
-    raise ValueError("Cant determine reader for {} extension".format(ext))
+    return get_codec(file_name, sniff).reader
+
+
+def get_writer(file_name: str) -> Writer:
+    """
+    Determine writer for file.
+    :param file_name: name of the file for data
+    :return: function to write data to file
+    """
+    return get_codec(file_name).writer
+
+
+_TEXT_LIMIT = 200
+
+
+def _repr_parts(value: typing.Any) -> typing.Iterator[str]:
+    """
+    Generate repr of value piece by piece, so that repr of big containers can
+    be cut without visiting all of their elements.
+    """
+    kind = type(value)
+    if kind is dict:
+        yield "{"
+        for position, (key, item) in enumerate(value.items()):
+            if position:
+                yield ", "
+            yield from _repr_parts(key)
+            yield ": "
+            yield from _repr_parts(item)
+        yield "}"
+    elif kind is list or kind is tuple:
+        yield "[" if kind is list else "("
+        for position, item in enumerate(value):
+            if position:
+                yield ", "
+            yield from _repr_parts(item)
+        if kind is tuple and len(value) == 1:
+            yield ","
+        yield "]" if kind is list else ")"
+    elif kind is str and len(value) > _TEXT_LIMIT:
+        yield repr(value[: _TEXT_LIMIT + 1])
+    else:
+        yield repr(value)
+
+
+def _short_text(value: typing.Any) -> str:
+    """
+    Convert value to string like str() does, but cut it to _TEXT_LIMIT chars.
+    """
+    if isinstance(value, str):
+        if len(value) > _TEXT_LIMIT:
+            return value[:_TEXT_LIMIT] + "..."
+        return value
+    parts = []
+    size = 0
+    for part in _repr_parts(value):
+        parts.append(part)
+        size += len(part)
+        if size > _TEXT_LIMIT:
+            return "".join(parts)[:_TEXT_LIMIT] + "..."
+    return "".join(parts)
+
+
+class _Text(object):
+    """
+    Field of error message, that is converted to string only when message is
+    formatted.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: typing.Any) -> None:
+        self.value = value
+
+    def __format__(self, format_spec: str) -> str:
+        # Format 'r' quotes strings, so that "2" and 2 look differently.
+        if format_spec == "r" and isinstance(self.value, str):
+            return _short_text(repr(self.value))
+        return _short_text(self.value)
+
+
+class ActionError(Exception):
+    """
+    Base class for errors caused by actions. Action, offending key and section
+    are kept as fields, and message is built only when error is rendered, with
+    long values cut, so that errors are cheap to raise and catch on big
+    documents.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        action: typing.Any = None,
+        key: typing.Any = None,
+        section: typing.Any = None,
+        **details: typing.Any
+    ) -> None:
+        """
+        :param message: template of message, where {key}, {section} and names
+            of details are replaced by their values
+        :param action: action object
+        :param key: offending key, marker or field of action
+        :param section: section, where error happened
+        :param details: other values used in message
+        """
+        super().__init__(message)
+        self.message = message
+        self.action = action
+        self.key = key
+        self.section = section
+        self.details = details
+        #: index of action in actions list, when error is raised by plan
+        self.index = None  # type: typing.Optional[int]
+        self._text = None  # type: typing.Optional[str]
+
+    @property
+    def path(self) -> typing.Any:
+        """
+        Path of action, that caused error.
+        """
+        if isinstance(self.action, typing.Dict):
+            return self.action.get("path")
+        return None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            fields = {name: _Text(value) for name, value in self.details.items()}
+            self._text = "Action {}: {}".format(
+                _Text(self.action),
+                self.message.format(
+                    key=_Text(self.key), section=_Text(self.section), **fields
+                ),
+            )
+        return self._text
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(type(self).__name__, ActionError.__str__(self))
+
+    def __reduce__(self) -> typing.Any:
+        # Section can be big, so only rendered message is pickled.
+        return (
+            _restore_error,
+            (
+                type(self),
+                self.message,
+                self.action,
+                self.key,
+                self.index,
+                ActionError.__str__(self),
+            ),
+        )
+
+
+def _restore_error(
+    cls: typing.Type[ActionError],
+    message: str,
+    action: typing.Any,
+    key: typing.Any,
+    index: typing.Optional[int],
+    text: str,
+) -> ActionError:
+    error = cls(message, action, key)
+    error.index = index
+    error._text = text
+    return error
+
+
+class ActionKeyError(ActionError, KeyError):
+    """
+    Action refers to missing key or marker, or misses required field.
+    """
+
+    def __str__(self) -> str:
+        # Message is shown as repr, like for any KeyError.
+        return repr(ActionError.__str__(self))
+
+
+class ActionTypeError(ActionError, TypeError):
+    """
+    Action or section, on which it's applied, is of wrong type.
+    """
+
+
+class ActionIndexError(ActionError, IndexError):
+    """
+    List element, selected by marker of action, doesn't exist.
+    """
+
+
+class ActionValueError(ActionError, ValueError):
+    """
+    Action has malformed value (for example JSON Pointer), or value found by
+    action isn't the expected one (failed test of JSON Patch).
+    """
 
 
 def find_section_in_list(
@@ -75,14 +530,14 @@ def find_section_in_list(
     if key.isdigit():
         return int(key)
     if key not in action:
-        raise KeyError("Action {}: marker {} not found in action".format(action, key))
+        raise ActionKeyError("marker {key} not found in action", action, key)
     compares = action[key]
 
-    for index, section in enumerate(section):
-        if all(section[compare["key"]] == compare["value"] for compare in compares):
+    for index, item in enumerate(section):
+        if all(item[compare["key"]] == compare["value"] for compare in compares):
             return index
-    raise IndexError(
-        "Action {}: Value with {} filters not found".format(action, compares)
+    raise ActionIndexError(
+        "Value with {filters} filters not found", action, key, section, filters=compares
     )
 
 
@@ -101,9 +556,7 @@ def get_path(action: typing.Dict[str, typing.Any], path_delim: str) -> typing.Li
     elif isinstance(path, typing.List) and all(isinstance(key, str) for key in path):
         return path
     else:
-        raise TypeError(
-            "Action {}: path should be str or list of strings".format(action)
-        )
+        raise ActionTypeError("path should be str or list of strings", action, "path")
 
 
 def get_section(
@@ -129,17 +582,23 @@ def get_section(
         key = key.strip()
         if key.startswith("$"):
             if not isinstance(section, typing.List):
-                raise TypeError(
-                    "Action {}: section {} is not list".format(action, section)
+                raise ActionTypeError(
+                    "section {section} is not list", action, key, section
                 )
             section_index = find_section_in_list(section, action, key)
-            section = section[section_index]
+            try:
+                section = section[section_index]
+            except IndexError as error:
+                raise _missing_child(error, action, key, section) from None
         else:
             if not isinstance(section, typing.Dict):
-                raise TypeError(
-                    "Action {}: section {} is not dict".format(action, section)
+                raise ActionTypeError(
+                    "section {section} is not dict", action, key, section
                 )
-            section = section[key]
+            try:
+                section = section[key]
+            except KeyError as error:
+                raise _missing_child(error, action, key, section) from None
     return section
 
 
@@ -147,44 +606,61 @@ def apply_to_dict(
     section: typing.Dict[str, typing.Any],
     action: typing.Dict[str, typing.Any],
     path_delim: str,
+    undo: typing.Optional["UndoLog"] = None,
 ) -> None:
     """
     Apply action to dictionary.
     :param section: section on which action should be applied
     :param action: action object that should be applied
     :param path_delim: delimiter
+    :param undo: log, where inverse of the change should be recorded
     """
     action_name = action["action"]
     value = action.get("value")
 
     if action_name == "add":
         if isinstance(value, typing.Dict):
+            if undo is not None:
+                for key in value:
+                    undo.record_dict_set(section, key)
             section.update(value)
         else:
-            raise TypeError(
-                "Action {}: value for add operation on dict should "
-                "be of type dict".format(action)
+            raise ActionTypeError(
+                "value for add operation on dict should be of type dict",
+                action,
+                "value",
+                section,
             )
     else:
         path = get_path(action, path_delim)
         key = path[-1].strip()
 
         if action_name == "replace":
+            if undo is not None:
+                undo.record_dict_set(section, key)
             section[key] = value
         elif action_name == "delete":
             if key not in section:
-                raise KeyError("Action {}: no such key {}".format(action, key))
+                raise ActionKeyError("no such key {key}", action, key, section)
+            if undo is not None:
+                undo.record_dict_del(section, key)
             del section[key]
         elif action_name == "rename":
             if key not in section:
-                raise KeyError("Action {}: no such key {}".format(action, key))
+                raise ActionKeyError("no such key {key}", action, key, section)
             elif isinstance(value, str):
+                if undo is not None:
+                    undo.record_dict_set(section, value)
                 section[value] = section[key]
+                if undo is not None:
+                    undo.record_dict_del(section, key)
                 del section[key]
             else:
-                raise TypeError(
-                    "Action {}: for rename action on dict value "
-                    "should be string".format(action)
+                raise ActionTypeError(
+                    "for rename action on dict value should be string",
+                    action,
+                    "value",
+                    section,
                 )
 
 
@@ -192,31 +668,43 @@ def apply_to_list(
     section: typing.List[typing.Any],
     action: typing.Dict[str, typing.Any],
     path_delim: str,
+    undo: typing.Optional["UndoLog"] = None,
 ) -> None:
     """
     Apply action to list.
     :param section: section on which action should be applied
     :param action: action object that should be applied
     :param path_delim: delimiter
+    :param undo: log, where inverse of the change should be recorded
     """
     action_name = action["action"]
     value = action.get("value")
 
     if action_name == "add":
         if isinstance(value, list):
+            if undo is not None:
+                undo.record_list_extend(section)
             section.extend(value)
         else:
-            raise TypeError(
-                "Action {}: value for add operation on list should "
-                "be of type list".format(action)
+            raise ActionTypeError(
+                "value for add operation on list should be of type list",
+                action,
+                "value",
+                section,
             )
     else:
         path = get_path(action, path_delim)
         key = path[-1].strip()
         section_index = find_section_in_list(section, action, key)
+        if section_index >= len(section) and action_name in ("replace", "delete"):
+            raise ActionIndexError("no element {key}", action, key, section)
         if action_name == "replace":
+            if undo is not None:
+                undo.record_list_set(section, section_index)
             section[section_index] = value
         elif action_name == "delete":
+            if undo is not None:
+                undo.record_list_del(section, section_index)
             section.pop(section_index)
 
 
@@ -224,20 +712,22 @@ def apply_action(
     section: typing.Iterable[typing.Any],
     action: typing.Dict[str, typing.Any],
     path_delim: str,
+    undo: typing.Optional["UndoLog"] = None,
 ) -> None:
     """
     Apply action to selected section.
     :param section: section to be modified
     :param action: action object
     :param path_delim: path delimiter. default is '/'
+    :param undo: log, where inverse of the change should be recorded
     """
     if isinstance(section, typing.Dict):
-        apply_to_dict(section, action, path_delim)
+        apply_to_dict(section, action, path_delim, undo)
     elif isinstance(section, typing.List):
-        apply_to_list(section, action, path_delim)
+        apply_to_list(section, action, path_delim, undo)
     else:
-        raise TypeError(
-            "Action {}: Section {} is not of type dict or list".format(action, section)
+        raise ActionTypeError(
+            "Section {section} is not of type dict or list", action, None, section
         )
 
 
@@ -248,30 +738,28 @@ def validate_marker(action: typing.Dict[str, typing.Any], key: str) -> None:
     :param key: key that is used as marker
     """
     key = key[1:]
+    if key.startswith("*"):
+        # Wildcard marker: $* selects every element, $*name every element
+        # matching filter marker name.
+        key = key[1:]
+        if not key:
+            return
     marker = action.get(key)
     if not marker:
-        raise KeyError(
-            "Action {}: marker {} should be defined in action".format(action, key)
-        )
+        raise ActionKeyError("marker {key} should be defined in action", action, key)
     if not isinstance(marker, typing.List):
-        raise TypeError(
-            "Action {}: marker {} should be of type list".format(action, key)
-        )
+        raise ActionTypeError("marker {key} should be of type list", action, key)
     for search_filter in marker:
         if not isinstance(search_filter, typing.Dict):
-            raise TypeError(
-                "Action {}: marker {} filters should be of type dict".format(
-                    action, key
-                )
+            raise ActionTypeError(
+                "marker {key} filters should be of type dict", action, key
             )
 
         filter_key = search_filter.get("key")
         filter_value = search_filter.get("value")
         if not filter_key or not filter_value:
-            raise KeyError(
-                "Action {}: for marker {} key and value should be specified".format(
-                    action, key
-                )
+            raise ActionKeyError(
+                "for marker {key} key and value should be specified", action, key
             )
 
 
@@ -283,11 +771,11 @@ def validate_action(action: typing.Dict[str, typing.Any], path_delim: str) -> No
     """
     action_name = action.get("action")
     if not action_name:
-        raise KeyError("Action {}: key action is required".format(action))
+        raise ActionKeyError("key {key} is required", action, "action")
 
     path = action.get("path")
     if not path:
-        raise KeyError("Action {}: key path is required".format(action))
+        raise ActionKeyError("key {key} is required", action, "path")
 
     path = get_path(action, path_delim)
 
@@ -298,73 +786,5095 @@ def validate_action(action: typing.Dict[str, typing.Any], path_delim: str) -> No
     value = action.get("value")
 
     if action_name in ["add", "replace", "rename"] and not value:
-        raise KeyError(
-            "Action {}: for {} action key value is required".format(action, action_name)
+        raise ActionKeyError(
+            "for {name} action key {key} is required", action, "value", name=action_name
         )
 
     if action_name == "add":
         key = path[-1]
         if key.startswith("$") and not isinstance(value, typing.List):
-            raise TypeError(
-                "Action {}: for add action on list value should be list".format(action)
+            raise ActionTypeError(
+                "for add action on list value should be list", action, "value"
             )
         elif not isinstance(value, typing.Dict):
-            raise TypeError(
-                "Action {}: for add action on dict value should be dict".format(action)
+            raise ActionTypeError(
+                "for add action on dict value should be dict", action, "value"
             )
     elif action_name == "rename":
         if not isinstance(value, str):
-            raise TypeError(
-                "Action {}: for rename action on dict value should be string".format(
-                    action
-                )
+            raise ActionTypeError(
+                "for rename action on dict value should be string", action, "value"
             )
 
 
-def apply_actions(
-    source: typing.Union[typing.Dict[str, typing.Any], str],
-    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], str],
-    copy: bool = False,
-    path_delim: str = "/",
-) -> typing.Iterable[typing.Any]:
+Marker = typing.NamedTuple(
+    "Marker",
+    [
+        ("key", str),
+        ("index", typing.Optional[int]),
+        ("filters", typing.Optional[typing.Tuple[typing.Tuple[str, typing.Any], ...]]),
+        ("many", bool),
+    ],
+)
+Marker.__new__.__defaults__ = (False,)
+Marker.__doc__ = """
+Pre-parsed list marker from action's path.
+:param key: marker as it's written in path (for example ``$name`` or ``$0``)
+:param index: index for index marker, None for filter marker
+:param filters: pairs of (key, value) for filter marker. None when filters
+    can't be resolved from action, in that case lookup falls back to
+    find_section_in_list.
+:param many: True for wildcard marker (``$*`` or ``$*name``), that selects
+    all matching elements instead of the first one. default is False
+"""
+
+PathToken = typing.Union[str, Marker]
+
+CompiledAction = typing.NamedTuple(
+    "CompiledAction",
+    [
+        ("action", typing.Dict[str, typing.Any]),
+        ("name", str),
+        ("path", typing.Tuple[PathToken, ...]),
+        ("target", typing.Optional[str]),
+        ("target_marker", typing.Optional[Marker]),
+        ("value", typing.Any),
+    ],
+)
+CompiledAction.__doc__ = """
+Validated action with pre-split path.
+:param action: original action object (used in error messages)
+:param name: name of the action
+:param path: tokens leading to the section on which action is applied
+:param target: last key of path for actions other than add
+:param target_marker: target parsed as marker, when it's marker
+:param value: value of the action
+"""
+
+
+def _compile_marker(action: typing.Dict[str, typing.Any], key: str) -> Marker:
     """
-    Apply actions on source_data.
-    :param source: dictionary or json/yaml file with data that should be modified
-    :param actions: list or json/yaml file with actions, that should be applied to
-        source
-    :param copy: should source be copied before modification or changed in place
-        (works only when source is dictionary not file). default is False
-    :param path_delim: path delimiter. default is '/'
-    :return: source modified after applying actions
+    Parse marker from action's path.
+    :param action: action object
+    :param key: stripped key that starts with $
+    :return: parsed marker
     """
-    if isinstance(source, str):
-        reader = get_reader(source)
-        with open(source, "r") as f:
-            source_data = reader(f)
-    elif isinstance(source, typing.Dict):
-        if copy:
-            source_data = deepcopy(source)
-        else:
-            source_data = source
-    else:
-        raise TypeError("source should be data dictionary or file_name with data")
+    name = key[1:]
+    if name.isdigit():
+        return Marker(key, int(name), None, False)
+    many = name.startswith("*")
+    if many:
+        name = name[1:]
+        if not name:
+            return Marker(key, None, (), True)
 
-    if isinstance(actions, str):
-        reader = get_reader(actions)
-        with open(actions, "r") as f:
-            actions_data = reader(f)
-    elif isinstance(actions, typing.List):
-        actions_data = actions
+    compares = action.get(name)
+    filters = None
+    if isinstance(compares, typing.List) and all(
+        isinstance(compare, typing.Dict) and "key" in compare and "value" in compare
+        for compare in compares
+    ):
+        filters = tuple((compare["key"], compare["value"]) for compare in compares)
+    return Marker(key, None, filters, many)
+
+
+def compile_action(
+    action: typing.Dict[str, typing.Any], path_delim: str, validate: bool = True
+) -> CompiledAction:
+    """
+    Validate action and split it's path into keys and markers. Value isn't
+    copied here, since it's copied on each change made by compiled action, so
+    action shouldn't be changed while it's compiled action is used.
+    :param action: action object
+    :param path_delim: path delimiter
+    :param validate: False to skip validation of action, that is known to be
+        valid. default is True
+    :return: compiled action
+    """
+    if validate:
+        validate_action(action, path_delim)
+    return _compile(action, path_delim, action.get("value"))
+
+
+def _compile(
+    action: typing.Dict[str, typing.Any], path_delim: str, value: typing.Any
+) -> CompiledAction:
+    """
+    Split path of valid action into keys and markers.
+    :param action: action object
+    :param path_delim: path delimiter
+    :param value: value of compiled action
+    :return: compiled action
+    """
+    keys = [key.strip() for key in get_path(action, path_delim)]
+    tokens = [
+        _compile_marker(action, key) if key.startswith("$") else key for key in keys
+    ]  # type: typing.List[PathToken]
+
+    target = None
+    target_marker = None
+    if not action["action"] == "add":
+        target = keys[-1]
+        last = tokens.pop()
+        if isinstance(last, Marker):
+            target_marker = last
+
+    return CompiledAction(
+        action,
+        action["action"],
+        tuple(tokens),
+        target,
+        target_marker,
+        value,
+    )
+
+
+CacheInfo = typing.NamedTuple(
+    "CacheInfo",
+    [
+        ("hits", int),
+        ("misses", int),
+        ("maxsize", int),
+        ("currsize", int),
+        ("maxbytes", typing.Optional[int]),
+        ("currbytes", int),
+    ],
+)
+CacheInfo.__doc__ = """
+Counters of cache.
+:param hits: number of lookups, that found entry
+:param misses: number of lookups, that didn't find entry
+:param maxsize: maximal number of entries
+:param currsize: current number of entries
+:param maxbytes: maximal total size of entries, None when size isn't limited
+:param currbytes: current total size of entries
+"""
+
+
+# Result of cache lookup, that found nothing, since None can be cached value.
+_MISSING = object()
+
+
+class _LRUCache(object):
+    """
+    Mapping bounded by number and total size of entries, that evicts least
+    recently used entries. It's shared between threads, so changes are made
+    under lock.
+    """
+
+    __slots__ = (
+        "_maxsize",
+        "_maxbytes",
+        "_entries",
+        "_bytes",
+        "_lock",
+        "hits",
+        "misses",
+    )
+
+    def __init__(self, maxsize: int, maxbytes: typing.Optional[int] = None) -> None:
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._entries = (
+            collections.OrderedDict()
+        )  # type: typing.MutableMapping[typing.Any, typing.Tuple[typing.Any, int]]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: typing.Any) -> typing.Any:
+        """
+        :return: cached value or _MISSING
+        """
+        # Lookups don't take lock: single operations on OrderedDict are
+        # atomic, and entry can only be evicted between them.
+        entries = self._entries
+        entry = entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        try:
+            entries.move_to_end(key)  # type: ignore
+        except KeyError:
+            pass
+        return entry[0]
+
+    def put(self, key: typing.Any, value: typing.Any, nbytes: int = 0) -> None:
+        """
+        :param nbytes: size of value, that counts towards maxbytes
+        """
+        with self._lock:
+            if self._maxsize <= 0 or (
+                self._maxbytes is not None and nbytes > self._maxbytes
+            ):
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def discard(self, match: typing.Callable[[typing.Any], bool]) -> int:
+        """
+        Remove entries, which keys match.
+        :return: number of removed entries
+        """
+        with self._lock:
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[1]
+            return len(keys)
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self._maxsize, 0) or (
+            self._maxbytes is not None and self._bytes > self._maxbytes
+        ):
+            self._bytes -= self._entries.popitem(last=False)[1][1]  # type: ignore
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self._maxsize,
+                len(self._entries),
+                self._maxbytes,
+                self._bytes,
+            )
+
+
+_COMPILED = _LRUCache(1024)
+
+
+def _compile_cached(
+    action: typing.Dict[str, typing.Any], path_delim: str
+) -> CompiledAction:
+    """
+    Compile action or take it from cache, where actions are stored by hash of
+    their content, so that equal actions are validated once. Value can be
+    big, so only the parts of it, that are checked by validation (type and
+    emptiness), are part of the key, and value is taken from action itself.
+    :param action: action object
+    :param path_delim: path delimiter
+    :return: compiled action
+    """
+    value = action.get("value")
+    key = [path_delim, type(value), not value]  # type: typing.List[typing.Any]
+    for name, item in action.items():
+        if name == "value":
+            continue
+        key.append(name)
+        # repr distinguishes types (list and tuple, 1 and True) and keeps
+        # order of keys, strings are compared as they are.
+        key.append(item if type(item) is str else (repr(item),))
+    cache_key = tuple(key)
+    compiled = _COMPILED.get(cache_key)
+    if compiled is _MISSING:
+        compiled = compile_action(action, path_delim)
+        # Cache shouldn't keep values and actions alive.
+        _COMPILED.put(cache_key, compiled._replace(action={}, value=None))
+        return compiled
+    # Errors should refer to the caller's action, like for uncached actions.
+    return CompiledAction(
+        action,
+        compiled.name,
+        compiled.path,
+        compiled.target,
+        compiled.target_marker,
+        value,
+    )
+
+
+def validation_cache_info() -> CacheInfo:
+    """
+    Get counters of cache of validated actions.
+    :return: cache hits, misses, maximal and current size
+    """
+    return _COMPILED.info()
+
+
+def set_validation_cache_size(maxsize: int) -> None:
+    """
+    Change number of validated actions, that are cached. Least recently used
+    actions are evicted, when cache is full.
+    :param maxsize: maximal number of cached actions, 0 disables cache
+    """
+    _COMPILED.resize(maxsize)
+
+
+def clear_validation_cache() -> None:
+    """
+    Remove all validated actions from cache and reset its counters.
+    """
+    _COMPILED.clear()
+
+
+_IndexKey = typing.Tuple[int, typing.Tuple[str, ...]]
+_Index = typing.Tuple[typing.Dict[typing.Any, int], int]
+
+
+class _FilterIndex(object):
+    """
+    Lookup indexes for filter markers, built lazily for each list and set of
+    filter keys and shared by all actions of single apply.
+
+    Index maps tuple of values of filter keys to the index of the first element
+    with such values. Elements that can't be indexed (missing key, unhashable
+    value, not dict) stop indexing, lookups past them fall back to linear scan.
+    """
+
+    __slots__ = ("_indexes", "_lists", "_seen", "indexed")
+
+    def __init__(self) -> None:
+        self.indexed = 0
+        self._indexes = {}  # type: typing.Dict[_IndexKey, _Index]
+        self._lists = {}  # type: typing.Dict[int, typing.List[typing.Any]]
+        self._seen = set()  # type: typing.Set[_IndexKey]
+
+    def lookup(
+        self,
+        section: typing.List[typing.Any],
+        filters: typing.Tuple[typing.Tuple[str, typing.Any], ...],
+    ) -> typing.Optional[int]:
+        """
+        Find index of first element of section matching filters.
+        :param section: list, where we want to search
+        :param filters: pairs of (key, value)
+        :return: index of element, -1 when there is no such element
+            or None when linear scan should be used instead
+        """
+        keys = tuple(key for key, _ in filters)
+        values = tuple(value for _, value in filters)
+        try:
+            hash(values)
+        except TypeError:
+            return None
+
+        cache_key = (id(section), keys)
+        entry = self._indexes.get(cache_key)
+        if entry is None:
+            # Build index only on repeated lookup, single lookup is
+            # cheaper with linear scan, that stops on first match.
+            if cache_key not in self._seen:
+                self._seen.add(cache_key)
+                self._lists[id(section)] = section
+                return None
+            entry = self._build(section, keys)
+            self._indexes[cache_key] = entry
+            self.indexed += entry[1]
+
+        mapping, first_bad = entry
+        index = mapping.get(values, -1)
+        if index == -1 or index > first_bad:
+            return -1 if first_bad == len(section) else None
+        return index
+
+    @staticmethod
+    def _build(
+        section: typing.List[typing.Any], keys: typing.Tuple[str, ...]
+    ) -> _Index:
+        mapping = {}  # type: typing.Dict[typing.Any, int]
+        for index, item in enumerate(section):
+            try:
+                values = tuple(item[key] for key in keys)
+                mapping.setdefault(values, index)
+            except (KeyError, TypeError, IndexError):
+                return mapping, index
+        return mapping, len(section)
+
+    def invalidate_list(self, section: typing.List[typing.Any]) -> None:
+        """
+        Drop indexes of list, that was changed.
+        :param section: changed list
+        """
+        section_id = id(section)
+        if section_id not in self._lists:
+            return
+        for cache_key in [key for key in self._indexes if key[0] == section_id]:
+            del self._indexes[cache_key]
+        self._seen = set(key for key in self._seen if key[0] != section_id)
+
+    def invalidate_keys(self, keys: typing.Iterable[typing.Any]) -> None:
+        """
+        Drop indexes, that use any of changed dictionary keys.
+        :param keys: keys of dictionary, that were changed
+        """
+        if not self._indexes:
+            return
+        changed = set(keys)
+        for cache_key in [
+            key for key in self._indexes if not changed.isdisjoint(key[1])
+        ]:
+            del self._indexes[cache_key]
+
+
+def _lookup_marker(
+    section: typing.List[typing.Any],
+    action: CompiledAction,
+    marker: Marker,
+    filter_index: typing.Optional[_FilterIndex],
+) -> typing.Tuple[int, int]:
+    """
+    Find index of section in list by compiled marker.
+    :param section: list, where we want to search
+    :param action: compiled action
+    :param marker: compiled marker
+    :param filter_index: indexes for filter markers to use for lookup
+    :return: index of searched section and number of scanned elements
+    """
+    if marker.index is not None:
+        return marker.index, 0
+    if marker.filters is None:
+        index = find_section_in_list(section, action.action, marker.key)
+        return index, 0 if marker.key[1:].isdigit() else index + 1
+
+    filters = marker.filters
+    found = None  # type: typing.Optional[int]
+    indexed = 0
+    if filter_index is not None:
+        indexed = filter_index.indexed
+        found = filter_index.lookup(section, filters)
+        indexed = filter_index.indexed - indexed
+    if found is None:
+        for index, item in enumerate(section):
+            if all(item[key] == value for key, value in filters):
+                return index, indexed + index + 1
+    elif found >= 0:
+        return found, indexed
+    raise ActionIndexError(
+        "Value with {filters} filters not found",
+        action.action,
+        marker.key,
+        section,
+        filters=action.action.get(marker.key[1:]),
+    )
+
+
+def _find_marker_index(
+    section: typing.List[typing.Any],
+    action: CompiledAction,
+    marker: Marker,
+    run: typing.Optional["_Run"] = None,
+) -> int:
+    """
+    Find index of section in list by compiled marker and report it to
+    observer of the run.
+    :param section: list, where we want to search
+    :param action: compiled action
+    :param marker: compiled marker
+    :param run: state of current run
+    :return: index of searched section
+    """
+    if run is None:
+        return _lookup_marker(section, action, marker, None)[0]
+    observer = run.observer
+    if observer is None:
+        return _lookup_marker(section, action, marker, run.filter_index)[0]
+
+    start = time.perf_counter()
+    index, scanned = _lookup_marker(section, action, marker, run.filter_index)
+    run.scanned += scanned
+    observer.on_marker_scan(run.index, time.perf_counter() - start, scanned)
+    return index
+
+
+def _find_marker_indexes(
+    section: typing.List[typing.Any],
+    action: CompiledAction,
+    marker: Marker,
+    run: typing.Optional["_Run"] = None,
+) -> typing.List[int]:
+    """
+    Find indexes of all elements matching wildcard marker in single scan.
+    Elements, that can't be checked by filters (for example missing filter
+    key), don't match.
+    :param section: list, where we want to search
+    :param action: compiled action
+    :param marker: compiled wildcard marker
+    :param run: state of current run
+    :return: indexes of matching elements in ascending order
+    """
+    observer = run.observer if run is not None else None
+    start = time.perf_counter() if observer is not None else 0.0
+    filters = marker.filters
+    if filters is None:
+        raise ActionKeyError(
+            "marker {key} not found in action", action.action, marker.key
+        )
+    if not filters:
+        indexes = list(range(len(section)))
     else:
-        raise TypeError(
-            "actions should be data dictionary or file_name with actions list"
+        indexes = []
+        for index, item in enumerate(section):
+            try:
+                if all(item[key] == value for key, value in filters):
+                    indexes.append(index)
+            except (KeyError, TypeError, IndexError):
+                continue
+    if observer is not None and run is not None:
+        scanned = len(section) if filters else 0
+        run.scanned += scanned
+        observer.on_marker_scan(run.index, time.perf_counter() - start, scanned)
+    return indexes
+
+
+class _PathCopier(object):
+    """
+    Shallow copies containers on paths of actions, so that source is never
+    changed and untouched subtrees are shared between source and result.
+    """
+
+    __slots__ = ("_owned",)
+
+    def __init__(self) -> None:
+        self._owned = {}  # type: typing.Dict[int, typing.Any]
+
+    def own(self, value: typing.Any) -> typing.Any:
+        """
+        Get container, that can be changed.
+        :param value: container from source or from result
+        :return: value itself, when it's already copied or not a container,
+            shallow copy otherwise
+        """
+        if id(value) in self._owned:
+            return value
+        if isinstance(value, typing.Dict):
+            value = value.copy()
+        elif isinstance(value, typing.List):
+            value = value[:]
+        else:
+            return value
+        self._owned[id(value)] = value
+        return value
+
+
+class _PathTrie(object):
+    """
+    Prefix tree of paths of compiled actions. Only nodes, that are shared by
+    several actions, get id, since only they are worth to be remembered.
+    """
+
+    __slots__ = ("prefixes", "parents", "children", "keys", "filter_nodes")
+
+    def __init__(self, actions: typing.Sequence[CompiledAction]) -> None:
+        nodes = {}  # type: typing.Dict[typing.Tuple[int, typing.Any], int]
+        paths = []  # type: typing.List[typing.List[int]]
+        parents = []  # type: typing.List[int]
+        keys = []  # type: typing.List[typing.Any]
+        usage = []  # type: typing.List[int]
+
+        for action in actions:
+            parent = -1
+            path = []
+            for token in action.path:
+                key = self._token_key(token)
+                node = nodes.get((parent, key), -1) if key is not None else -1
+                if node == -1:
+                    node = len(parents)
+                    parents.append(parent)
+                    keys.append(key)
+                    usage.append(0)
+                    if key is not None:
+                        nodes[(parent, key)] = node
+                usage[node] += 1
+                path.append(node)
+                parent = node
+            paths.append(path)
+
+        # Renumber shared nodes, so that unshared ones are -1.
+        shared = {}  # type: typing.Dict[int, int]
+        for node, count in enumerate(usage):
+            if count > 1:
+                shared[node] = len(shared)
+
+        self.prefixes = tuple(
+            tuple(shared.get(node, -1) for node in path) for path in paths
         )
+        self.parents = [-1] * len(shared)
+        self.keys = [None] * len(shared)  # type: typing.List[typing.Any]
+        self.children = [[] for _ in shared]  # type: typing.List[typing.List[int]]
+        self.filter_nodes = {}  # type: typing.Dict[str, typing.List[int]]
+        for node, shared_node in shared.items():
+            key = keys[node]
+            self.keys[shared_node] = key
+            parent = shared.get(parents[node], -1)
+            self.parents[shared_node] = parent
+            if parent != -1:
+                self.children[parent].append(shared_node)
+            if isinstance(key, tuple) and key[1] is not None:
+                for filter_key, _ in key[1]:
+                    self.filter_nodes.setdefault(filter_key, []).append(shared_node)
 
-    for action in actions_data:
-        validate_action(action, path_delim)
+    @staticmethod
+    def _token_key(token: PathToken) -> typing.Any:
+        """
+        Get key, that identifies path token for all actions.
+        :param token: dictionary key or marker
+        :return: dictionary key for keys, (index, filters) for markers or None
+            when marker depends on action and can't be shared
+        """
+        if not isinstance(token, Marker):
+            return token
+        if token.many or (token.index is None and token.filters is None):
+            # Wildcards lead to many sections, that aren't cached.
+            return None
+        key = (token.index, token.filters)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
 
-    for action in actions_data:
-        section = get_section(source_data, action, path_delim)
-        apply_action(section, action, path_delim)
 
-    return source_data
+class _SectionCache(object):
+    """
+    Sections, resolved for shared nodes of path trie during single run. Each
+    node keeps container, where it was found, and key or list index, chosen
+    by its marker, so that change of container drops only nodes, it affects.
+    """
+
+    __slots__ = ("_trie", "_resolved", "_parents", "_keys", "_by_parent")
+
+    def __init__(self, trie: _PathTrie) -> None:
+        self._trie = trie
+        self._resolved = {}  # type: typing.Dict[int, typing.Any]
+        self._parents = {}  # type: typing.Dict[int, int]
+        self._keys = {}  # type: typing.Dict[int, typing.Any]
+        self._by_parent = {}  # type: typing.Dict[int, typing.Set[int]]
+
+    def deepest(
+        self, nodes: typing.Sequence[int], source_data: typing.Any
+    ) -> typing.Tuple[int, typing.Any]:
+        """
+        Find the deepest resolved prefix of path.
+        :param nodes: trie nodes of action's path
+        :param source_data: root of the document
+        :return: length of resolved prefix and section, that it leads to
+        """
+        resolved = self._resolved
+        for depth in range(len(nodes) - 1, -1, -1):
+            node = nodes[depth]
+            if node in resolved:
+                return depth + 1, resolved[node]
+        return 0, source_data
+
+    def store(
+        self, node: int, parent: typing.Any, key: typing.Any, section: typing.Any
+    ) -> None:
+        """
+        Remember section of node.
+        :param node: shared trie node
+        :param parent: container, where section was found
+        :param key: dictionary key or list index of section in parent
+        :param section: resolved section
+        """
+        self._resolved[node] = section
+        self._parents[node] = id(parent)
+        self._keys[node] = key
+        self._by_parent.setdefault(id(parent), set()).add(node)
+
+    def _drop(self, node: int) -> None:
+        if node not in self._resolved:
+            return
+        del self._resolved[node]
+        del self._keys[node]
+        self._by_parent[self._parents.pop(node)].discard(node)
+        for child in self._trie.children[node]:
+            self._drop(child)
+
+    def changed_dict(
+        self, section: typing.Dict[str, typing.Any], keys: typing.Iterable[typing.Any]
+    ) -> None:
+        """
+        Forget sections, that could be changed by change of dictionary keys.
+        :param section: changed dictionary
+        :param keys: changed keys
+        """
+        if not self._resolved:
+            return
+        keys = set(keys)
+        for node in list(self._by_parent.get(id(section), ())):
+            if self._trie.keys[node] in keys:
+                self._drop(node)
+        # Filter markers depend on keys of list elements, wherever they are.
+        for key in keys:
+            for node in self._trie.filter_nodes.get(key, ()):
+                self._drop(node)
+
+    def changed_list(
+        self, section: typing.List[typing.Any], first: int = 0, shift: bool = True
+    ) -> None:
+        """
+        Forget sections inside of list, that could be changed.
+        :param section: changed list
+        :param first: index of the first changed element
+        :param shift: True when elements from first on are replaced or moved,
+            False when only element at first is replaced
+        """
+        nodes = self._by_parent.get(id(section))
+        if not nodes:
+            return
+        keys = self._keys
+        trie_keys = self._trie.keys
+        for node in list(nodes):
+            index = keys[node]
+            # Filter markers take the first match, so it can move only to
+            # the replaced element, but not past it.
+            if index == first or (
+                index > first and (shift or trie_keys[node][1] is not None)
+            ):
+                self._drop(node)
+
+
+class ApplyStats(object):
+    """
+    Counters collected while plan is applied. The same object can be passed
+    to several runs to accumulate counters. Section hits and misses count
+    lookups of paths, that have prefixes shared with other actions, which did
+    or didn't find resolved prefix in cache of the run.
+    """
+
+    __slots__ = ("actions", "steps", "steps_saved", "section_hits", "section_misses")
+
+    def __init__(self) -> None:
+        self.actions = 0
+        self.steps = 0
+        self.steps_saved = 0
+        self.section_hits = 0
+        self.section_misses = 0
+
+    @property
+    def section_hit_rate(self) -> float:
+        """
+        Share of section lookups, that were served from cache.
+        :return: number from 0 to 1, 0 when there were no lookups
+        """
+        lookups = self.section_hits + self.section_misses
+        return self.section_hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> typing.Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return "ApplyStats({})".format(
+            ", ".join(
+                "{}={}".format(name, value) for name, value in self.as_dict().items()
+            )
+        )
+
+
+class Observer(object):
+    """
+    Base class for observers of actions processing. All hooks do nothing, so
+    subclasses can override only the ones they need. Each hook gets index of
+    action, duration of the phase in seconds and number of list elements
+    scanned by it.
+    """
+
+    def on_validate(self, index: int, duration: float, scanned: int) -> None:
+        """Action was validated and compiled."""
+
+    def on_resolve(self, index: int, duration: float, scanned: int) -> None:
+        """Section of action was found (including marker scans)."""
+
+    def on_marker_scan(self, index: int, duration: float, scanned: int) -> None:
+        """Index of list element was found by marker."""
+
+    def on_mutate(self, index: int, duration: float, scanned: int) -> None:
+        """Action was applied to it's section."""
+
+
+PHASES = ("validate", "resolve", "marker_scan", "mutate")
+
+
+class StatsObserver(Observer):
+    """
+    Observer, that aggregates count, total and maximal duration and number of
+    scanned elements for each action and phase.
+    """
+
+    def __init__(self) -> None:
+        self.actions = (
+            {}
+        )  # type: typing.Dict[int, typing.Dict[str, typing.Dict[str, float]]]
+        self.phases = {
+            phase: self._empty() for phase in PHASES
+        }  # type: typing.Dict[str, typing.Dict[str, float]]
+
+    @staticmethod
+    def _empty() -> typing.Dict[str, float]:
+        return {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "scanned": 0}
+
+    def _record(self, phase: str, index: int, duration: float, scanned: int) -> None:
+        phases = self.actions.setdefault(index, {})
+        for stats in (phases.setdefault(phase, self._empty()), self.phases[phase]):
+            stats["count"] += 1
+            stats["seconds"] += duration
+            stats["scanned"] += scanned
+            if duration > stats["max_seconds"]:
+                stats["max_seconds"] = duration
+
+    def on_validate(self, index: int, duration: float, scanned: int) -> None:
+        self._record("validate", index, duration, scanned)
+
+    def on_resolve(self, index: int, duration: float, scanned: int) -> None:
+        self._record("resolve", index, duration, scanned)
+
+    def on_marker_scan(self, index: int, duration: float, scanned: int) -> None:
+        self._record("marker_scan", index, duration, scanned)
+
+    def on_mutate(self, index: int, duration: float, scanned: int) -> None:
+        self._record("mutate", index, duration, scanned)
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Export collected stats.
+        :return: dictionary with 'phases' (stats by phase) and 'actions'
+            (stats by action index and phase)
+        """
+        return {
+            "phases": deepcopy(self.phases),
+            "actions": deepcopy(self.actions),
+        }
+
+    def to_prometheus(self, prefix: str = "json_modify") -> str:
+        """
+        Export collected stats in Prometheus text format.
+        :param prefix: prefix of metric names
+        :return: metrics text
+        """
+        metrics = (
+            ("count", "calls_total", "Number of calls of phase."),
+            ("seconds", "seconds_total", "Time spent in phase."),
+            ("max_seconds", "max_seconds", "Longest call of phase."),
+            ("scanned", "scanned_total", "List elements scanned in phase."),
+        )
+        lines = []
+        for field, suffix, description in metrics:
+            name = "{}_phase_{}".format(prefix, suffix)
+            kind = "gauge" if field == "max_seconds" else "counter"
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for phase in PHASES:
+                lines.append(
+                    '{}{{phase="{}"}} {}'.format(name, phase, self.phases[phase][field])
+                )
+            name = "{}_action_{}".format(prefix, suffix)
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for index, phases in sorted(self.actions.items()):
+                for phase, stats in sorted(phases.items()):
+                    lines.append(
+                        '{}{{action="{}",phase="{}"}} {}'.format(
+                            name, index, phase, stats[field]
+                        )
+                    )
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def profiled(file_name: typing.Optional[str]) -> typing.Iterator[None]:
+    """
+    Run block under cProfile and dump pstats to file.
+    :param file_name: file for pstats. When None, block isn't profiled
+    """
+    if file_name is None:
+        yield
+        return
+
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(file_name)
+
+
+class UndoLog(object):
+    """
+    Log of inverse operations for changes made by actions. Changes are
+    reverted in reverse order, so cost of revert depends on number of changes,
+    not on the size of the document.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self) -> None:
+        self._entries = []  # type: typing.List[typing.Tuple[typing.Any, ...]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record_dict_set(self, section: typing.Dict[str, typing.Any], key: str) -> None:
+        """
+        Record dictionary key, that is going to be set.
+        """
+        if key in section:
+            self._entries.append(("dict_set", section, key, section[key]))
+        else:
+            self._entries.append(("dict_del", section, key))
+
+    def record_dict_del(self, section: typing.Dict[str, typing.Any], key: str) -> None:
+        """
+        Record dictionary key, that is going to be deleted, with keys following
+        it, so it's position can be restored.
+        """
+        if key in section:
+            keys = iter(section)
+            for item in keys:
+                if item == key:
+                    break
+            following = tuple(keys)
+            self._entries.append(("dict_insert", section, key, section[key], following))
+
+    def record_list_set(self, section: typing.List[typing.Any], index: int) -> None:
+        """
+        Record list element, that is going to be replaced.
+        """
+        if 0 <= index < len(section):
+            self._entries.append(("list_set", section, index, section[index]))
+
+    def record_list_del(self, section: typing.List[typing.Any], index: int) -> None:
+        """
+        Record list element, that is going to be deleted.
+        """
+        if 0 <= index < len(section):
+            self._entries.append(("list_insert", section, index, section[index]))
+
+    def record_list_insert(self, section: typing.List[typing.Any], index: int) -> None:
+        """
+        Record list position, where element is going to be inserted.
+        """
+        self._entries.append(("list_pop", section, index))
+
+    def record_list_assign(self, section: typing.List[typing.Any]) -> None:
+        """
+        Record list, whose content is going to be replaced as a whole.
+        """
+        self._entries.append(("list_assign", section, list(section)))
+
+    def record_list_extend(self, section: typing.List[typing.Any]) -> None:
+        """
+        Record list, that is going to be extended.
+        """
+        self._entries.append(("list_truncate", section, len(section)))
+
+    def revert(self, mark: int = 0) -> None:
+        """
+        Revert changes in reverse order and remove them from log.
+        :param mark: number of entries, that should be kept (see len(log)).
+            default is 0, all changes are reverted
+        """
+        while len(self._entries) > mark:
+            entry = self._entries.pop()
+            kind, section = entry[0], entry[1]
+            if kind == "dict_set":
+                section[entry[2]] = entry[3]
+            elif kind == "dict_del":
+                del section[entry[2]]
+            elif kind == "dict_insert":
+                key, value, following = entry[2:]
+                section[key] = value
+                for item in following:
+                    section[item] = section.pop(item)
+            elif kind == "list_set":
+                section[entry[2]] = entry[3]
+            elif kind == "list_insert":
+                section.insert(entry[2], entry[3])
+            elif kind == "list_pop":
+                section.pop(entry[2])
+            elif kind == "list_truncate":
+                length = entry[2]
+                del section[length:]
+            elif kind == "list_assign":
+                section[:] = entry[2]
+
+
+class _Run(object):
+    """
+    State shared by all actions of single plan application.
+    """
+
+    __slots__ = (
+        "filter_index",
+        "copier",
+        "sections",
+        "stats",
+        "observer",
+        "index",
+        "scanned",
+        "undo",
+    )
+
+    def __init__(
+        self,
+        trie: typing.Optional[_PathTrie] = None,
+        copier: typing.Optional[_PathCopier] = None,
+        stats: typing.Optional[ApplyStats] = None,
+        observer: typing.Optional[Observer] = None,
+        undo: typing.Optional[UndoLog] = None,
+    ) -> None:
+        self.filter_index = _FilterIndex()
+        self.copier = copier
+        self.sections = _SectionCache(trie) if trie is not None else None
+        self.stats = stats
+        self.observer = observer
+        # Index of current action and list elements scanned by it's
+        # current phase, maintained only when observer is set.
+        self.index = 0
+        self.scanned = 0
+        self.undo = undo
+
+    def changed_dict(
+        self, section: typing.Dict[str, typing.Any], keys: typing.Iterable[typing.Any]
+    ) -> None:
+        keys = list(keys)
+        self.filter_index.invalidate_keys(keys)
+        if self.sections is not None:
+            self.sections.changed_dict(section, keys)
+
+    def changed_list(
+        self, section: typing.List[typing.Any], first: int = 0, shift: bool = True
+    ) -> None:
+        self.filter_index.invalidate_list(section)
+        if self.sections is not None:
+            self.sections.changed_list(section, first, shift)
+
+
+def _resolve_section(
+    source_data: typing.Iterable[typing.Any],
+    action: CompiledAction,
+    run: typing.Optional[_Run] = None,
+    nodes: typing.Sequence[int] = (),
+    stop: typing.Optional[int] = None,
+) -> typing.Iterable[typing.Any]:
+    """
+    Get section described by compiled action's path.
+    :param source_data: source data where to search
+    :param action: compiled action
+    :param run: state of current run: indexes, copier and resolved sections
+    :param nodes: trie nodes of action's path, used to reuse resolved sections
+    :param stop: number of path tokens to resolve. default is whole path
+    :return: section from source_data described by path
+    """
+    path = action.path
+    stop = len(path) if stop is None else stop
+    section = source_data  # type: typing.Any
+    start = 0
+    copier = None
+    sections = None
+    if run is not None:
+        copier = run.copier
+        sections = run.sections
+        if sections is not None and nodes:
+            start, section = sections.deepest(nodes[:stop], source_data)
+        stats = run.stats
+        if stats is not None:
+            stats.steps += stop - start
+            stats.steps_saved += start
+            if start:
+                stats.section_hits += 1
+            elif sections is not None and any(node != -1 for node in nodes[:stop]):
+                stats.section_misses += 1
+
+    for depth in range(start, stop):
+        token = path[depth]
+        if isinstance(token, Marker):
+            if not isinstance(section, typing.List):
+                raise ActionTypeError(
+                    "section {section} is not list", action.action, token.key, section
+                )
+            key = _find_marker_index(
+                section, action, token, run
+            )  # type: typing.Union[int, str]
+        else:
+            if not isinstance(section, typing.Dict):
+                raise ActionTypeError(
+                    "section {section} is not dict", action.action, token, section
+                )
+            key = token
+        try:
+            child = _descend(section, key, copier)
+        except (KeyError, IndexError) as error:
+            raise _missing_child(error, action.action, token, section) from None
+        if sections is not None and nodes and nodes[depth] != -1:
+            sections.store(nodes[depth], section, key, child)
+        section = child
+    return section  # type: ignore
+
+
+def _descend(
+    section: typing.Any, key: typing.Any, copier: typing.Optional[_PathCopier]
+) -> typing.Any:
+    """
+    Get child of section, copying it when path is copied.
+    """
+    child = section[key]
+    if copier is not None:
+        owned = copier.own(child)
+        if owned is not child:
+            # Copy has equal values, so indexes of parent stay valid.
+            section[key] = owned
+            child = owned
+    return child
+
+
+def _missing_child(
+    error: Exception, action: typing.Any, token: PathToken, section: typing.Any
+) -> ActionError:
+    """
+    Convert error of section lookup into error of action.
+    :param error: KeyError or IndexError raised by lookup
+    :param action: action object
+    :param token: key or marker of missing child
+    :param section: section, where child was looked up
+    :return: error to raise
+    """
+    key = token.key if isinstance(token, Marker) else token
+    if isinstance(error, IndexError):
+        return ActionIndexError("no element {key}", action, key, section)
+    return ActionKeyError("no such key {key}", action, key, section)
+
+
+def _first_wildcard(path: typing.Sequence[PathToken]) -> int:
+    """
+    Find position of the first wildcard marker in path, -1 when there is none.
+    """
+    for depth, token in enumerate(path):
+        if isinstance(token, Marker) and token.many:
+            return depth
+    return -1
+
+
+def _resolve_sections(
+    source_data: typing.Iterable[typing.Any],
+    action: CompiledAction,
+    run: typing.Optional[_Run] = None,
+    nodes: typing.Sequence[int] = (),
+    wildcard: int = -1,
+) -> typing.List[typing.Any]:
+    """
+    Get all sections described by compiled action's path. Path is resolved
+    once up to the first wildcard marker, and then fans out to each element
+    it matches.
+    :param source_data: source data where to search
+    :param action: compiled action
+    :param run: state of current run
+    :param nodes: trie nodes of action's path
+    :param wildcard: position of the first wildcard marker in path, -1 when
+        path has no wildcards
+    :return: list of sections
+    """
+    if wildcard == -1:
+        return [_resolve_section(source_data, action, run, nodes)]
+
+    copier = run.copier if run is not None else None
+    stats = run.stats if run is not None else None
+    sections = [_resolve_section(source_data, action, run, nodes, wildcard)]
+    for token in action.path[wildcard:]:
+        children = []  # type: typing.List[typing.Any]
+        for section in sections:
+            if isinstance(token, Marker):
+                if not isinstance(section, typing.List):
+                    raise ActionTypeError(
+                        "section {section} is not list",
+                        action.action,
+                        token.key,
+                        section,
+                    )
+                if token.many:
+                    keys = _find_marker_indexes(
+                        section, action, token, run
+                    )  # type: typing.Sequence[typing.Any]
+                else:
+                    keys = (_find_marker_index(section, action, token, run),)
+            else:
+                if not isinstance(section, typing.Dict):
+                    raise ActionTypeError(
+                        "section {section} is not dict", action.action, token, section
+                    )
+                keys = (token,)
+            try:
+                children.extend(_descend(section, key, copier) for key in keys)
+            except (KeyError, IndexError) as error:
+                raise _missing_child(error, action.action, token, section) from None
+        if stats is not None:
+            stats.steps += len(sections)
+        sections = children
+    return sections
+
+
+def _copy_value(value: typing.Any) -> typing.Any:
+    """
+    Copy value of compiled action, so that documents never share it.
+    :param value: value to copy
+    :return: copy of containers, value itself for scalars
+    """
+    if isinstance(value, (typing.Dict, typing.List)):
+        return deepcopy(value)
+    return value
+
+
+def _apply_compiled(
+    section: typing.Any, action: CompiledAction, run: typing.Optional[_Run] = None
+) -> None:
+    """
+    Apply compiled action to selected section.
+    :param section: section to be modified
+    :param action: compiled action
+    :param run: state of current run, that should be updated by this change
+    """
+    name = action.name
+    undo = run.undo if run is not None else None
+    if isinstance(section, typing.Dict):
+        if name == "add":
+            if not isinstance(action.value, typing.Dict):
+                raise ActionTypeError(
+                    "value for add operation on dict should be of type dict",
+                    action.action,
+                    "value",
+                    section,
+                )
+            if run is not None:
+                run.changed_dict(section, action.value)
+            if undo is not None:
+                for key in action.value:
+                    undo.record_dict_set(section, key)
+            section.update(_copy_value(action.value))
+            return
+
+        key = typing.cast(str, action.target)
+        if run is not None:
+            run.changed_dict(
+                section, (key, action.value) if name == "rename" else (key,)
+            )
+        if name == "replace":
+            if undo is not None:
+                undo.record_dict_set(section, key)
+            section[key] = _copy_value(action.value)
+        elif name == "delete":
+            if key not in section:
+                raise ActionKeyError("no such key {key}", action.action, key, section)
+            if undo is not None:
+                undo.record_dict_del(section, key)
+            del section[key]
+        elif name == "rename":
+            if key not in section:
+                raise ActionKeyError("no such key {key}", action.action, key, section)
+            if undo is not None:
+                undo.record_dict_set(section, action.value)
+            section[action.value] = section[key]
+            if undo is not None:
+                undo.record_dict_del(section, key)
+            del section[key]
+    elif isinstance(section, typing.List):
+        if name == "add":
+            if not isinstance(action.value, list):
+                raise ActionTypeError(
+                    "value for add operation on list should be of type list",
+                    action.action,
+                    "value",
+                    section,
+                )
+            if run is not None:
+                run.changed_list(section, len(section), False)
+            if undo is not None:
+                undo.record_list_extend(section)
+            section.extend(_copy_value(action.value))
+            return
+
+        if action.target_marker is not None and action.target_marker.many:
+            _apply_to_matches(section, action, run)
+            return
+        if action.target_marker is not None:
+            section_index = _find_marker_index(
+                section, action, action.target_marker, run
+            )
+        else:
+            section_index = find_section_in_list(
+                section, action.action, typing.cast(str, action.target)
+            )
+        if section_index >= len(section) and name in ("replace", "delete"):
+            raise ActionIndexError(
+                "no element {key}", action.action, action.target, section
+            )
+        if run is not None:
+            run.changed_list(section, section_index, name == "delete")
+        if name == "replace":
+            if undo is not None:
+                undo.record_list_set(section, section_index)
+            section[section_index] = _copy_value(action.value)
+        elif name == "delete":
+            if undo is not None:
+                undo.record_list_del(section, section_index)
+            section.pop(section_index)
+    else:
+        raise ActionTypeError(
+            "Section {section} is not of type dict or list",
+            action.action,
+            None,
+            section,
+        )
+
+
+def _apply_to_matches(
+    section: typing.List[typing.Any],
+    action: CompiledAction,
+    run: typing.Optional[_Run] = None,
+) -> None:
+    """
+    Apply compiled action to all elements of list, matching wildcard target.
+    Matching elements are deleted by single pass over the list.
+    :param section: list to be modified
+    :param action: compiled action with wildcard target marker
+    :param run: state of current run, that should be updated by this change
+    """
+    marker = typing.cast(Marker, action.target_marker)
+    indexes = _find_marker_indexes(section, action, marker, run)
+    if not indexes:
+        return
+    undo = run.undo if run is not None else None
+    if run is not None:
+        run.changed_list(section, indexes[0])
+    if action.name == "replace":
+        for index in indexes:
+            if undo is not None:
+                undo.record_list_set(section, index)
+            section[index] = _copy_value(action.value)
+    elif action.name == "delete":
+        if undo is not None:
+            undo.record_list_assign(section)
+        matched = set(indexes)
+        section[:] = [
+            item for index, item in enumerate(section) if index not in matched
+        ]
+
+
+class ActionPlan(object):
+    """
+    Immutable list of compiled actions, that can be applied to many documents.
+    """
+
+    __slots__ = ("_actions", "_path_delim", "_trie", "_wildcards")
+
+    def __init__(
+        self, actions: typing.Iterable[CompiledAction], path_delim: str = "/"
+    ) -> None:
+        self._actions = tuple(actions)
+        self._path_delim = path_delim
+        self._trie = _PathTrie(self._actions)
+        self._wildcards = tuple(
+            _first_wildcard(action.path) for action in self._actions
+        )
+
+    @property
+    def actions(self) -> typing.Tuple[CompiledAction, ...]:
+        return self._actions
+
+    @property
+    def path_delim(self) -> str:
+        return self._path_delim
+
+    def __len__(self) -> int:
+        return len(self._actions)
+
+    def __repr__(self) -> str:
+        return "ActionPlan({} actions)".format(len(self._actions))
+
+    def apply(
+        self,
+        source_data: typing.Any,
+        copy: typing.Union[bool, str] = False,
+        stats: typing.Optional[ApplyStats] = None,
+        observer: typing.Optional[Observer] = None,
+        transactional: bool = False,
+        undo: typing.Optional[UndoLog] = None,
+    ) -> typing.Any:
+        """
+        Apply compiled actions on source_data. Sections on path prefixes shared
+        by several actions are resolved once, until they're changed by action.
+        :param source_data: data that should be modified
+        :param copy: False to change source_data in place, True to change its
+            deep copy, 'path' to copy only containers on paths of actions and
+            share the rest with source_data. default is False
+        :param stats: counters to be updated by this run
+        :param observer: observer to be notified about each phase of each action
+        :param transactional: revert all changes of this run, when any action
+            fails. default is False
+        :param undo: log, where inverse of each change is recorded, so that
+            changes can be reverted later with undo.revert()
+        :return: source_data or its copy modified after applying actions
+        """
+        copier = None
+        if copy == "path":
+            copier = _PathCopier()
+            source_data = copier.own(source_data)
+        elif copy is True:
+            source_data = deepcopy(source_data)
+        elif copy is not False:
+            raise ValueError("copy should be True, False or 'path'")
+
+        if transactional and undo is None:
+            undo = UndoLog()
+        mark = len(undo) if undo is not None else 0
+        run = _Run(self._trie, copier, stats, observer, undo)
+        try:
+            self._run(source_data, run)
+        except BaseException:
+            if transactional and undo is not None:
+                undo.revert(mark)
+            raise
+        return source_data
+
+    def _run(self, source_data: typing.Any, run: _Run) -> None:
+        observer = run.observer
+        stats = run.stats
+        index = 0
+        try:
+            for index, (action, nodes, wildcard) in enumerate(
+                zip(self._actions, self._trie.prefixes, self._wildcards)
+            ):
+                if observer is None:
+                    if wildcard == -1:
+                        section = _resolve_section(source_data, action, run, nodes)
+                        _apply_compiled(section, action, run)
+                    else:
+                        for section in _resolve_sections(
+                            source_data, action, run, nodes, wildcard
+                        ):
+                            _apply_compiled(section, action, run)
+                else:
+                    run.index = index
+                    run.scanned = 0
+                    start = time.perf_counter()
+                    sections = _resolve_sections(
+                        source_data, action, run, nodes, wildcard
+                    )
+                    resolved = time.perf_counter()
+                    observer.on_resolve(index, resolved - start, run.scanned)
+                    run.scanned = 0
+                    for section in sections:
+                        _apply_compiled(section, action, run)
+                    observer.on_mutate(
+                        index, time.perf_counter() - resolved, run.scanned
+                    )
+                if stats is not None:
+                    stats.actions += 1
+
+        except ActionError as error:
+            # Error is raised by helpers, that don't know position of action.
+            if error.index is None:
+                error.index = index
+            raise
+
+
+def compile_actions(
+    actions: typing.Iterable[typing.Dict[str, typing.Any]],
+    path_delim: str = "/",
+    observer: typing.Optional[Observer] = None,
+    validate: bool = True,
+) -> ActionPlan:
+    """
+    Validate actions once and compile them into reusable plan. Validated
+    actions are cached by hash of their content, so that actions, that are
+    compiled again (for example by apply_actions in long running worker), are
+    not validated again.
+    :param actions: list of actions
+    :param path_delim: path delimiter. default is '/'
+    :param observer: observer to be notified about validation of each action
+    :param validate: False to skip validation and cache for actions, that are
+        known to be valid. default is True
+    :return: plan, that can be applied to any number of documents
+    """
+    if validate:
+        compile_one = _compile_cached
+    else:
+        compile_one = functools.partial(compile_action, validate=False)
+    compiled = []  # type: typing.List[CompiledAction]
+    try:
+        if observer is None:
+            for action in actions:
+                compiled.append(compile_one(action, path_delim))
+        else:
+            for action in actions:
+                start = time.perf_counter()
+                compiled.append(compile_one(action, path_delim))
+                observer.on_validate(len(compiled) - 1, time.perf_counter() - start, 0)
+    except ActionError as error:
+        error.index = len(compiled)
+        raise
+    return ActionPlan(compiled, path_delim)
+
+
+OptimizationStep = typing.NamedTuple(
+    "OptimizationStep",
+    [("kind", str), ("indexes", typing.Tuple[int, ...]), ("description", str)],
+)
+OptimizationStep.__doc__ = """
+Change of actions list made by optimize_actions.
+:param kind: 'fused', 'removed' or 'collapsed'
+:param indexes: indexes of original actions, that were changed
+:param description: human readable description of the change
+"""
+
+
+class _OptimizedEntry(object):
+    __slots__ = ("compiled", "indexes")
+
+    def __init__(self, compiled: CompiledAction, indexes: typing.Tuple[int, ...]):
+        self.compiled = compiled
+        self.indexes = indexes
+
+
+def _same_token(first: PathToken, second: PathToken) -> bool:
+    """
+    Check, that tokens always select the same section. Markers are compared
+    without their names, as $a and $b with the same filters are equivalent.
+    """
+    if isinstance(first, Marker) and isinstance(second, Marker):
+        return (first.index, first.filters, first.many) == (
+            second.index,
+            second.filters,
+            second.many,
+        )
+    return first == second
+
+
+def _distinct_token(first: PathToken, second: PathToken) -> bool:
+    """
+    Check, that tokens never select the same section: different keys or
+    different index markers. Filter and wildcard markers can match any element.
+    """
+    if isinstance(first, str) and isinstance(second, str):
+        return first != second
+    if isinstance(first, Marker) and isinstance(second, Marker):
+        return (
+            first.index is not None
+            and second.index is not None
+            and first.index != second.index
+        )
+    return False
+
+
+def _footprints(action: CompiledAction) -> typing.List[typing.Tuple[PathToken, ...]]:
+    """
+    Paths of all sections, that can be changed by action. Changes of list
+    elements (except replacing element by index) can shift other elements, so
+    they change the whole list.
+    """
+    if action.name == "add":
+        return [action.path]
+    marker = action.target_marker
+    if marker is not None and (action.name == "delete" or marker.index is None):
+        return [action.path]
+    target = marker if marker is not None else typing.cast(str, action.target)
+    footprints = [action.path + (target,)]
+    if action.name == "rename":
+        footprints.append(action.path + (action.value,))
+    return footprints
+
+
+def _overlaps(action: CompiledAction, path: typing.Sequence[PathToken]) -> bool:
+    """
+    Check, whether action can change section on path or any section, that is
+    used to resolve path.
+    """
+    for footprint in _footprints(action):
+        if not any(
+            _distinct_token(first, second) for first, second in zip(footprint, path)
+        ):
+            return True
+    return False
+
+
+def _written_keys(action: CompiledAction) -> typing.Set[str]:
+    if action.name == "add":
+        return set(action.value) if isinstance(action.value, typing.Dict) else set()
+    if action.target_marker is not None:
+        return set()
+    keys = {typing.cast(str, action.target)}
+    if action.name == "rename":
+        keys.add(action.value)
+    return keys
+
+
+def _stable_section(*actions: CompiledAction) -> bool:
+    """
+    Check, that actions can't change, which elements are selected by markers
+    on their path: no filter of markers checks keys written by actions.
+    """
+    written = set()  # type: typing.Set[str]
+    for action in actions:
+        written.update(_written_keys(action))
+    for token in actions[0].path:
+        if not isinstance(token, Marker):
+            continue
+        if token.key.lstrip("$*") == "value":
+            # Filters are stored in value of action, that would be rewritten.
+            return False
+        if token.filters is None:
+            if written:
+                return False
+        elif any(key in written for key, _ in token.filters):
+            return False
+    return True
+
+
+def _previous_entry(
+    entries: typing.Sequence[_OptimizedEntry], end: int, action: CompiledAction
+) -> int:
+    """
+    Find last entry before end, that is applied on the same section as action,
+    when all entries between them change other sections only.
+    :return: position of entry or -1
+    """
+    path = action.path
+    for position in range(end - 1, -1, -1):
+        other = entries[position].compiled
+        if len(other.path) == len(path) and all(
+            _same_token(first, second) for first, second in zip(other.path, path)
+        ):
+            return position
+        if _overlaps(other, path):
+            return -1
+    return -1
+
+
+def _same_target(first: CompiledAction, second: CompiledAction) -> bool:
+    if first.target_marker is None and second.target_marker is None:
+        return first.target == second.target
+    if first.target_marker is not None and second.target_marker is not None:
+        return (
+            first.target_marker.index is not None
+            and first.target_marker.index == second.target_marker.index
+        )
+    return False
+
+
+def _rewrite(action: CompiledAction, value: typing.Any) -> CompiledAction:
+    """
+    Create copy of compiled action with other value.
+    """
+    return action._replace(action=dict(action.action, value=value), value=value)
+
+
+def _fuse(previous: CompiledAction, action: CompiledAction) -> typing.Any:
+    """
+    Fuse two writes of the same dict section into single add.
+    :return: compiled add action or None, when writes can't be fused
+    """
+    if previous.name == "add" and action.name == "add":
+        if isinstance(previous.value, list) and isinstance(action.value, list):
+            return _rewrite(previous, previous.value + action.value)
+        if not isinstance(previous.value, typing.Dict) or not isinstance(
+            action.value, typing.Dict
+        ):
+            return None
+        value = dict(previous.value)
+        value.update(action.value)
+        return _rewrite(previous, value)
+    if (
+        previous.name == "add"
+        and action.name == "replace"
+        and action.target_marker is None
+        and isinstance(previous.value, typing.Dict)
+    ):
+        value = dict(previous.value)
+        value[typing.cast(str, action.target)] = action.value
+        return _rewrite(previous, value)
+    if (
+        previous.name == "replace"
+        and action.name == "add"
+        and previous.target_marker is None
+        and isinstance(action.value, typing.Dict)
+        and previous.target in action.value
+    ):
+        # Replaced key keeps position, where replace put it.
+        value = {typing.cast(str, previous.target): previous.value}
+        value.update(action.value)
+        return _rewrite(action, value)
+    return None
+
+
+class OptimizedActions(object):
+    """
+    Actions list produced by optimize_actions together with log of changes.
+    """
+
+    __slots__ = ("actions", "steps", "origins")
+
+    def __init__(
+        self,
+        actions: typing.List[typing.Dict[str, typing.Any]],
+        steps: typing.List[OptimizationStep],
+        origins: typing.List[typing.Tuple[int, ...]],
+    ) -> None:
+        #: optimized actions, that can be passed to apply_actions
+        self.actions = actions
+        #: changes, in order they were made
+        self.steps = steps
+        #: indexes of original actions, merged into each optimized action
+        self.origins = origins
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def __repr__(self) -> str:
+        return "OptimizedActions({} actions, {} steps)".format(
+            len(self.actions), len(self.steps)
+        )
+
+    def explain(self) -> str:
+        """
+        Describe, which actions were fused or removed.
+        :return: one line per change
+        """
+        if not self.steps:
+            return "no actions were fused or removed"
+        return "\n".join(
+            "{} {} {}: {}".format(
+                step.kind,
+                "action" if len(step.indexes) == 1 else "actions",
+                ", ".join(str(index) for index in step.indexes),
+                step.description,
+            )
+            for step in self.steps
+        )
+
+
+def optimize_actions(
+    actions: typing.Iterable[typing.Dict[str, typing.Any]], path_delim: str = "/"
+) -> OptimizedActions:
+    """
+    Validate actions and remove redundant work from them: consecutive adds to
+    the same section are fused, replaces overwritten by later writes of the
+    same key are removed, and rename chains are collapsed.
+    Actions are only combined with actions on the same section, when all actions
+    between them change sections on diverging paths, and when markers on the
+    path don't filter by changed keys, so applying optimized actions gives the
+    same document (including order of keys) as applying original ones, and
+    fails when original ones fail.
+    :param actions: list of actions
+    :param path_delim: path delimiter. default is '/'
+    :return: optimized actions with explanation of changes
+    """
+    entries = []  # type: typing.List[_OptimizedEntry]
+    steps = []  # type: typing.List[OptimizationStep]
+    for index, action in enumerate(actions):
+        try:
+            compiled = compile_action(action, path_delim)
+        except ActionError as error:
+            error.index = index
+            raise
+        entry = _OptimizedEntry(compiled, (index,))
+        position = _previous_entry(entries, len(entries), entry.compiled)
+        if position != -1:
+            previous = entries[position]
+            step = _combine(entries, position, entry, path_delim)
+            if step is not None:
+                steps.append(step)
+                if step.kind == "removed":
+                    del entries[position]
+                    entry.indexes = previous.indexes + entry.indexes
+                    entries.append(entry)
+                continue
+        entries.append(entry)
+
+    return OptimizedActions(
+        [entry.compiled.action for entry in entries],
+        steps,
+        [entry.indexes for entry in entries],
+    )
+
+
+def _describe(action: CompiledAction, path_delim: str) -> str:
+    path = action.action["path"]
+    if not isinstance(path, str):
+        path = path_delim.join(path)
+    return "{} {}".format(action.name, path)
+
+
+def _combine(
+    entries: typing.List[_OptimizedEntry],
+    position: int,
+    entry: _OptimizedEntry,
+    path_delim: str,
+) -> typing.Optional[OptimizationStep]:
+    """
+    Combine entry with entry on position, that is applied on the same section.
+    Entry on position is updated in place (or should be removed, when returned
+    step is 'removed').
+    :return: step, that describes change, or None when entries can't be combined
+    """
+    previous = entries[position]
+    first, second = previous.compiled, entry.compiled
+    if not _stable_section(first, second):
+        return None
+    indexes = previous.indexes + entry.indexes
+
+    if (
+        first.name == "replace"
+        and second.name == "replace"
+        and _same_target(first, second)
+    ):
+        return OptimizationStep(
+            "removed",
+            previous.indexes,
+            "{} is overwritten by action {}".format(
+                _describe(first, path_delim), entry.indexes[-1]
+            ),
+        )
+
+    fused = _fuse(first, second)
+    if fused is not None:
+        previous.compiled = fused
+        previous.indexes = indexes
+        return OptimizationStep("fused", indexes, _describe(fused, path_delim))
+
+    if (
+        first.name == "rename"
+        and second.name == "rename"
+        and first.target_marker is None
+        and second.target == first.value
+        and len({first.target, first.value, second.value}) == 3
+        and _key_absent(entries, position, first)
+    ):
+        # Renamed key is removed by the second rename, so the chain is the same
+        # as single rename, when there was no such key before the first one.
+        previous.compiled = _rewrite(first, second.value)
+        previous.indexes = indexes
+        return OptimizationStep(
+            "collapsed",
+            indexes,
+            "{} to {}".format(_describe(first, path_delim), second.value),
+        )
+    return None
+
+
+def _key_absent(
+    entries: typing.Sequence[_OptimizedEntry], position: int, action: CompiledAction
+) -> bool:
+    """
+    Check, that key, which is the value of rename action, was removed from the
+    section by previous action (deleted or renamed), as both of them fail when
+    key is missing.
+    """
+    previous = _previous_entry(entries, position, action)
+    if previous == -1:
+        return False
+    other = entries[previous].compiled
+    return (
+        other.name in ("delete", "rename")
+        and other.target_marker is None
+        and other.target == action.value
+        and _stable_section(other, action)
+    )
+
+
+Conflict = typing.NamedTuple(
+    "Conflict",
+    [("kind", str), ("first", int), ("second", int), ("description", str)],
+)
+Conflict.__doc__ = """
+Pair of actions found by analyze_actions, that give other result in other order.
+:param kind: 'deleted' when second action uses key deleted or renamed by the
+    first one, 'shifted' when index marker of second action selects other
+    element after the first one deletes element of the list, 'overwritten'
+    when second action replaces value written by the first one
+:param first: index of the earlier action
+:param second: index of the later action
+:param description: human readable description of the conflict
+"""
+
+ActionGroup = typing.NamedTuple(
+    "ActionGroup",
+    [
+        ("indexes", typing.Tuple[int, ...]),
+        ("path", typing.List[str]),
+        ("actions", typing.List[typing.Dict[str, typing.Any]]),
+    ],
+)
+ActionGroup.__doc__ = """
+Actions found by analyze_actions, that change only section on path and don't
+depend on actions of other groups.
+:param indexes: indexes of actions in original list
+:param path: keys of the section, empty for the whole document
+:param actions: actions with paths relative to the section
+"""
+
+
+def _concrete_key(path: typing.Sequence[PathToken]) -> typing.Tuple[typing.Any, ...]:
+    """
+    Leading keys and index markers of path, which select the same sections in
+    any document. Index markers are replaced by their indexes.
+    """
+    key = []  # type: typing.List[typing.Any]
+    for token in path:
+        if isinstance(token, Marker):
+            if token.index is None:
+                break
+            key.append(token.index)
+        else:
+            key.append(token)
+    return tuple(key)
+
+
+class _PrefixIndex(object):
+    """
+    Items stored by concrete keys of paths. Only items on the path and below it
+    can select the same sections as the path, so they're found without
+    comparing the path with all items.
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self) -> None:
+        # Node is [items, children by key, children by index].
+        self._root = [[], {}, {}]  # type: typing.List[typing.Any]
+
+    def add(self, key: typing.Sequence[typing.Any], item: typing.Any) -> None:
+        node = self._root
+        for token in key:
+            children = node[2] if isinstance(token, int) else node[1]
+            node = children.setdefault(token, [[], {}, {}])
+        node[0].append(item)
+
+    def related(self, key: typing.Sequence[typing.Any]) -> typing.Iterator[typing.Any]:
+        """
+        Find items, whose keys are prefix of key or start with key. Keys and
+        indexes on the same level are never distinct, since lookup of one of
+        them fails.
+        """
+        node = self._root
+        for token in key:
+            for item in node[0]:
+                yield item
+            same, other = (node[2], node[1]) if isinstance(token, int) else node[1:]
+            for child in other.values():
+                for item in self._subtree(child):
+                    yield item
+            node = same.get(token)
+            if node is None:
+                return
+        for item in self._subtree(node):
+            yield item
+
+    @staticmethod
+    def _subtree(node: typing.List[typing.Any]) -> typing.Iterator[typing.Any]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for item in node[0]:
+                yield item
+            stack.extend(node[1].values())
+            stack.extend(node[2].values())
+
+
+def _accesses(action: CompiledAction) -> typing.List[typing.Tuple[PathToken, ...]]:
+    """
+    Paths of all sections, that action changes or reads: footprints of action
+    and keys checked by filter markers of it's path.
+    """
+    accesses = _footprints(action)
+    path = action.path
+    for depth, token in enumerate(path):
+        if not isinstance(token, Marker) or token.index is not None:
+            continue
+        if token.filters:
+            accesses.extend(path[: depth + 1] + (key,) for key, _ in token.filters)
+        else:
+            accesses.append(path[: depth + 1])
+    return accesses
+
+
+def _depends(
+    first: CompiledAction,
+    second: CompiledAction,
+    accesses: typing.Sequence[typing.Sequence[typing.Tuple[PathToken, ...]]],
+) -> bool:
+    return any(_overlaps(first, path) for path in accesses[1]) or any(
+        _overlaps(second, path) for path in accesses[0]
+    )
+
+
+def _full_path(action: CompiledAction) -> typing.Tuple[PathToken, ...]:
+    if action.name == "add":
+        return action.path
+    target = action.target_marker or typing.cast(str, action.target)
+    return action.path + (target,)
+
+
+def _path_text(path: typing.Sequence[PathToken], path_delim: str) -> str:
+    return path_delim.join(
+        token.key if isinstance(token, Marker) else token for token in path
+    )
+
+
+def _starts_with(
+    path: typing.Sequence[PathToken], prefix: typing.Sequence[PathToken]
+) -> bool:
+    return len(path) >= len(prefix) and all(
+        _same_token(first, second) for first, second in zip(prefix, path)
+    )
+
+
+def _conflict(
+    first: CompiledAction,
+    second: CompiledAction,
+    indexes: typing.Tuple[int, int],
+    path_delim: str,
+) -> typing.Optional[Conflict]:
+    """
+    Describe, why order of dependent actions matters, when it's not only
+    because they change the same section.
+    """
+    removed = _full_path(first)
+    used = _full_path(second)
+    if first.name in ("delete", "rename") and first.target_marker is None:
+        if _starts_with(used, removed):
+            return Conflict(
+                "deleted",
+                indexes[0],
+                indexes[1],
+                "action {} uses {} after action {} {} it".format(
+                    indexes[1],
+                    _path_text(removed, path_delim),
+                    indexes[0],
+                    "deletes" if first.name == "delete" else "renames",
+                ),
+            )
+    elif first.name == "delete":
+        deleted = first.target_marker
+        depth = len(first.path)
+        if len(used) > depth and _starts_with(used, first.path):
+            token = used[depth]
+            if (
+                isinstance(token, Marker)
+                and token.index is not None
+                and not (
+                    deleted is not None
+                    and deleted.index is not None
+                    and token.index < deleted.index
+                )
+            ):
+                return Conflict(
+                    "shifted",
+                    indexes[0],
+                    indexes[1],
+                    "{} of action {} selects other element after action {} "
+                    "deletes element of {}".format(
+                        token.key,
+                        indexes[1],
+                        indexes[0],
+                        _path_text(first.path, path_delim),
+                    ),
+                )
+    if (
+        first.name == "replace"
+        and second.name == "replace"
+        and len(removed) == len(used)
+        and _starts_with(used, removed)
+    ):
+        return Conflict(
+            "overwritten",
+            indexes[0],
+            indexes[1],
+            "action {} overwrites {} written by action {}".format(
+                indexes[1], _path_text(used, path_delim), indexes[0]
+            ),
+        )
+    return None
+
+
+def _find_root(parents: typing.List[int], item: int) -> int:
+    while parents[item] != item:
+        parents[item] = parents[parents[item]]
+        item = parents[item]
+    return item
+
+
+def _join(parents: typing.List[int], first: int, second: int) -> bool:
+    """
+    Join sets of union-find forest, the smaller root becomes root of both.
+    :return: False when items were already in the same set
+    """
+    first, second = _find_root(parents, first), _find_root(parents, second)
+    if first == second:
+        return False
+    parents[max(first, second)] = min(first, second)
+    return True
+
+
+def _common_prefix(
+    paths: typing.Iterable[typing.Sequence[PathToken]],
+) -> typing.Tuple[PathToken, ...]:
+    """
+    Longest prefix of keys and index markers shared by all paths.
+    """
+    prefix = None  # type: typing.Optional[typing.Sequence[PathToken]]
+    for path in paths:
+        if prefix is None:
+            prefix = path[: len(_concrete_key(path))]
+            continue
+        depth = 0
+        for first, second in zip(prefix, path):
+            if not _same_token(first, second):
+                break
+            depth += 1
+        prefix = prefix[:depth]
+    return tuple(prefix or ())
+
+
+class _Shard(object):
+    """
+    Group of actions with it's section prefix and plan relative to it.
+    """
+
+    __slots__ = ("indexes", "prefix", "first", "plan")
+
+    def __init__(
+        self,
+        indexes: typing.Tuple[int, ...],
+        prefix: typing.Tuple[PathToken, ...],
+        first: CompiledAction,
+        plan: ActionPlan,
+    ) -> None:
+        self.indexes = indexes
+        self.prefix = prefix
+        self.first = first
+        self.plan = plan
+
+
+class ActionAnalysis(object):
+    """
+    Dependencies between actions and independent groups of them found by
+    analyze_actions.
+    """
+
+    __slots__ = ("groups", "dependencies", "conflicts", "_shards", "_path_delim")
+
+    def __init__(
+        self,
+        groups: typing.List[ActionGroup],
+        dependencies: typing.List[typing.Tuple[int, int]],
+        conflicts: typing.List[Conflict],
+        shards: typing.List[_Shard],
+        path_delim: str,
+    ) -> None:
+        #: groups of actions on disjoint sections, ordered by first action
+        self.groups = groups
+        #: pairs of (earlier, later) indexes of actions, that depend on order
+        self.dependencies = dependencies
+        #: dependencies, that change or break the later action
+        self.conflicts = conflicts
+        self._shards = shards
+        self._path_delim = path_delim
+
+    def __repr__(self) -> str:
+        return "ActionAnalysis({} groups, {} conflicts)".format(
+            len(self.groups), len(self.conflicts)
+        )
+
+    def explain(self) -> str:
+        """
+        Describe groups and conflicts.
+        :return: one line per group and per conflict
+        """
+        lines = [
+            "group {} on {}: {} {}".format(
+                number,
+                self._path_delim.join(group.path) if group.path else "document",
+                "action" if len(group.indexes) == 1 else "actions",
+                ", ".join(str(index) for index in group.indexes),
+            )
+            for number, group in enumerate(self.groups)
+        ]
+        lines.extend(
+            "{}: {}".format(conflict.kind, conflict.description)
+            for conflict in self.conflicts
+        )
+        return "\n".join(lines)
+
+
+def analyze_actions(
+    actions: typing.Iterable[typing.Dict[str, typing.Any]], path_delim: str = "/"
+) -> ActionAnalysis:
+    """
+    Validate actions and find, which of them depend on each other. Actions
+    depend on each other, when one of them changes section, that the other
+    one changes or reads: uses on it's path, checks with filter markers or
+    selects by index in list, where elements are shifted by delete. Actions
+    are split into groups, that change sections on diverging paths and don't
+    depend on each other, so each group can be applied to it's own section
+    (see apply_actions_parallel) with the same result as sequential run.
+    :param actions: list of actions
+    :param path_delim: path delimiter. default is '/'
+    :return: groups of actions, dependencies and conflicts between them
+    """
+    compiled = []  # type: typing.List[CompiledAction]
+    for position, action in enumerate(actions):
+        try:
+            compiled.append(compile_action(action, path_delim))
+        except ActionError as error:
+            error.index = position
+            raise
+
+    parents = list(range(len(compiled)))
+    dependencies = []  # type: typing.List[typing.Tuple[int, int]]
+    conflicts = []  # type: typing.List[Conflict]
+    accesses = [_accesses(action) for action in compiled]
+    keys = [[_concrete_key(path) for path in paths] for paths in accesses]
+    actions_index = _PrefixIndex()
+    for second, later in enumerate(compiled):
+        related = set()  # type: typing.Set[int]
+        for key in keys[second]:
+            related.update(actions_index.related(key))
+        for first in sorted(related):
+            earlier = compiled[first]
+            if not _depends(earlier, later, (accesses[first], accesses[second])):
+                continue
+            dependencies.append((first, second))
+            _join(parents, first, second)
+            conflict = _conflict(earlier, later, (first, second), path_delim)
+            if conflict is not None:
+                conflicts.append(conflict)
+        for key in set(keys[second]):
+            actions_index.add(key, second)
+
+    # Groups are merged, until their sections are disjoint, so that changes
+    # of one group are never inside section of the other one.
+    while True:
+        members = collections.OrderedDict()  # type: typing.Dict[int, typing.List[int]]
+        for item in range(len(compiled)):
+            members.setdefault(_find_root(parents, item), []).append(item)
+        prefixes = {
+            root: _common_prefix(compiled[item].path for item in items)
+            for root, items in members.items()
+        }
+        groups_index = _PrefixIndex()
+        roots = {}  # type: typing.Dict[typing.Tuple[typing.Any, ...], int]
+        merged = False
+        for root, prefix in prefixes.items():
+            key = _concrete_key(prefix)
+            if key in roots:
+                merged = _join(parents, roots[key], root) or merged
+                continue
+            roots[key] = root
+            for other in list(groups_index.related(key)):
+                merged = _join(parents, other, root) or merged
+            groups_index.add(key, root)
+        if not merged:
+            break
+
+    groups = []  # type: typing.List[ActionGroup]
+    shards = []  # type: typing.List[_Shard]
+    for root, items in members.items():
+        prefix = prefixes[root]
+        depth = len(prefix)
+        groups.append(
+            ActionGroup(
+                tuple(items),
+                [token.key if isinstance(token, Marker) else token for token in prefix],
+                [
+                    dict(
+                        compiled[item].action,
+                        path=get_path(compiled[item].action, path_delim)[depth:],
+                    )
+                    for item in items
+                ],
+            )
+        )
+        relative = ActionPlan(
+            [
+                compiled[item]._replace(path=compiled[item].path[depth:])
+                for item in items
+            ],
+            path_delim,
+        )
+        shards.append(_Shard(tuple(items), prefix, compiled[items[0]], relative))
+    return ActionAnalysis(groups, dependencies, conflicts, shards, path_delim)
+
+
+def _failed_index(shard: _Shard, section: typing.Any) -> int:
+    """
+    Find action of shard, that raises error without index, by applying it's
+    actions one by one to copy of the section.
+    """
+    section = deepcopy(section)
+    for position, action in enumerate(shard.plan.actions):
+        try:
+            ActionPlan([action], shard.plan.path_delim).apply(section)
+        except Exception:
+            return shard.indexes[position]
+    return shard.indexes[0]
+
+
+def apply_actions_parallel(
+    source: typing.Union[typing.Dict[str, typing.Any], str],
+    actions: typing.Union[
+        typing.List[typing.Dict[str, typing.Any]], ActionAnalysis, str
+    ],
+    copy: bool = False,
+    path_delim: str = "/",
+    executor: typing.Union[str, "Executor"] = "thread",
+    max_workers: typing.Optional[int] = None,
+) -> typing.Iterable[typing.Any]:
+    """
+    Apply independent groups of actions (see analyze_actions) concurrently.
+    Section of each group is resolved once and only it is passed to worker
+    (process pool pickles only sections, not the whole document), changed
+    sections are put into source, when all groups succeed. Result is the same
+    as of apply_actions, but containers shared by several paths of source
+    are changed only on path, where they're changed by actions.
+    :param source: dictionary or json/yaml file with data that should be modified
+    :param actions: list, result of analyze_actions or json/yaml file with
+        actions, that should be applied to source
+    :param copy: should source be copied before modification or changed in
+        place (works only when source is dictionary not file). default is False
+    :param path_delim: path delimiter. default is '/'
+    :param executor: 'thread', 'process' or instance of
+        concurrent.futures.Executor. default is 'thread'
+    :param max_workers: number of workers for created pool
+    :return: source modified after applying actions. When any action fails,
+        error of the first failed action is raised and source isn't changed
+    """
+    from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+    if executor not in ("thread", "process") and not isinstance(executor, Executor):
+        raise ValueError("executor should be 'thread', 'process' or Executor")
+    if isinstance(actions, str):
+        actions = typing.cast(
+            typing.List[typing.Dict[str, typing.Any]], _read_file(actions)
+        )
+    if not isinstance(actions, ActionAnalysis):
+        actions = analyze_actions(actions, path_delim)
+    source_data = _load_source(source, copy)
+    shards = actions._shards
+    if len(shards) == 1 and not shards[0].prefix:
+        shards[0].plan.apply(source_data, transactional=True)
+        return source_data
+
+    errors = []  # type: typing.List[typing.Tuple[int, Exception]]
+    targets = []  # type: typing.List[typing.Tuple[_Shard, typing.Any, typing.Any]]
+    for shard in shards:
+        try:
+            section = _resolve_section(source_data, shard.first, stop=len(shard.prefix))
+        except ActionError as error:
+            error.index = shard.indexes[0]
+            errors.append((error.index, error))
+            continue
+        parent = _resolve_section(source_data, shard.first, stop=len(shard.prefix) - 1)
+        token = shard.prefix[-1]
+        key = token.index if isinstance(token, Marker) else token
+        targets.append((shard, (parent, key), section))
+
+    if isinstance(executor, Executor):
+        pool = executor
+    elif executor == "process":
+        pool = ProcessPoolExecutor(max_workers)
+    else:
+        pool = ThreadPoolExecutor(max_workers)
+    try:
+        futures = [
+            pool.submit(shard.plan.apply, section, "path")
+            for shard, _, section in targets
+        ]
+        results = []
+        for (shard, _, section), future in zip(targets, futures):
+            try:
+                results.append(future.result())
+            except ActionError as error:
+                error.index = shard.indexes[error.index or 0]
+                errors.append((error.index, error))
+            except Exception as exc:
+                errors.append((_failed_index(shard, section), exc))
+    finally:
+        if pool is not executor:
+            pool.shutdown(wait=True)
+
+    if errors:
+        raise min(errors, key=lambda error: error[0])[1]
+    for (_, (parent, key), _), result in zip(targets, results):
+        parent[key] = result
+    return source_data
+
+
+_IMMUTABLE = frozenset((str, int, float, bool, bytes, type(None)))
+
+
+def _clone(value: typing.Any, memo: typing.Dict[int, typing.Any]) -> typing.Any:
+    """
+    Copy parsed document faster than deepcopy: dictionaries and lists are
+    copied, immutable scalars are shared and other values are deep copied.
+    Containers referenced several times (yaml aliases) stay shared in copy.
+    :param value: value to copy
+    :param memo: copies of containers by id of original
+    :return: copy of value
+    """
+    kind = type(value)
+    if kind is dict:
+        copied = memo.get(id(value))
+        if copied is None:
+            copied = memo[id(value)] = {}
+            for key, item in value.items():
+                copied[key] = _clone(item, memo)
+        return copied
+    if kind is list:
+        copied = memo.get(id(value))
+        if copied is None:
+            copied = memo[id(value)] = []
+            for item in value:
+                copied.append(_clone(item, memo))
+        return copied
+    if kind in _IMMUTABLE:
+        return value
+    return deepcopy(value, memo)
+
+
+class FileCache(object):
+    """
+    LRU cache of parsed source files and compiled actions files, bounded by
+    number of files and their total size on disk. Files are identified by
+    path, modification time, size and inode (and hash of content, when it's
+    enabled), so changed files are read again. Documents are copied, when
+    they are taken from cache, so that actions never modify cached ones.
+    """
+
+    __slots__ = ("_entries", "_hash")
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        maxbytes: typing.Optional[int] = 64 * 1024 * 1024,
+        hash: bool = False,
+    ) -> None:
+        """
+        :param maxsize: maximal number of cached files. default is 128
+        :param maxbytes: maximal total size of cached files, None for no limit.
+            default is 64 MiB
+        :param hash: compare hash of content too, it's read on each lookup.
+            default is False
+        """
+        self._entries = _LRUCache(maxsize, maxbytes)
+        self._hash = hash
+
+    def _load(
+        self,
+        file_name: str,
+        kind: typing.Tuple[typing.Any, ...],
+        loader: typing.Callable[[str], typing.Any],
+    ) -> typing.Any:
+        """
+        Get parsed file from cache or load and cache it.
+        :param file_name: name of the file
+        :param kind: what is cached for the file, part of the key
+        :param loader: function to parse file on miss
+        :return: cached value
+        """
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+        key = (
+            path,
+            kind,
+            stat.st_mtime_ns,
+            stat.st_size,
+            stat.st_ino,
+        )  # type: typing.Tuple[typing.Any, ...]
+        if self._hash:
+            with open(path, "rb") as f:
+                key += (hashlib.sha1(f.read()).digest(),)
+        value = self._entries.get(key)
+        if value is _MISSING:
+            value = loader(file_name)
+            # Previous versions of the file will never be found again.
+            self._entries.discard(lambda other: other[:2] == (path, kind))
+            self._entries.put(key, value, stat.st_size)
+        return value
+
+    def document(self, file_name: str) -> typing.Any:
+        """
+        Read json/yaml file or take it from cache.
+        :param file_name: name of the file
+        :return: copy of parsed document, that can be modified
+        """
+        return _clone(self._load(file_name, ("document",), _read_file), {})
+
+    def plan(
+        self,
+        file_name: str,
+        path_delim: str = "/",
+        validate: bool = True,
+        observer: typing.Optional[Observer] = None,
+    ) -> "ActionPlan":
+        """
+        Read and compile json/yaml file with actions or take it from cache.
+        :param file_name: name of the file
+        :param path_delim: path delimiter. default is '/'
+        :param validate: False to skip validation of actions. default is True
+        :param observer: observer to be notified about validation of actions,
+            when file isn't cached
+        :return: compiled plan
+        """
+
+        def load(name: str) -> ActionPlan:
+            return compile_actions(_read_file(name), path_delim, observer, validate)
+
+        return typing.cast(
+            ActionPlan, self._load(file_name, ("plan", path_delim, validate), load)
+        )
+
+    def invalidate(self, file_name: typing.Optional[str] = None) -> int:
+        """
+        Remove file or all files from cache.
+        :param file_name: name of the file. default is None (all files)
+        :return: number of removed entries
+        """
+        if file_name is None:
+            return self._entries.discard(lambda key: True)
+        path = os.path.abspath(file_name)
+        return self._entries.discard(lambda key: key[0] == path)
+
+    def info(self) -> CacheInfo:
+        """
+        :return: hits, misses, maximal and current number and size of files
+        """
+        return self._entries.info()
+
+
+_file_cache = None  # type: typing.Optional[FileCache]
+
+
+def set_file_cache(cache: typing.Optional[FileCache]) -> typing.Optional[FileCache]:
+    """
+    Set cache, that is used to read source and actions files by apply_actions
+    and other functions, that accept file names. Files are not cached by
+    default.
+    :param cache: cache to use or None to disable caching
+    :return: previous cache
+    """
+    global _file_cache
+    previous = _file_cache
+    _file_cache = cache
+    return previous
+
+
+def _read_file(file_name: str) -> typing.Iterable[typing.Any]:
+    reader = get_reader(file_name)
+    with open(file_name, "r") as f:
+        return reader(f)
+
+
+def _load_source(
+    source: typing.Union[typing.Dict[str, typing.Any], str],
+    copy: typing.Union[bool, str],
+) -> typing.Iterable[typing.Any]:
+    """
+    Read source data from file or copy it if needed.
+    :param source: dictionary or json/yaml file with data
+    :param copy: should dictionary source be copied
+    :return: source data
+    """
+    if isinstance(source, str):
+        if _file_cache is not None:
+            return typing.cast(
+                typing.Iterable[typing.Any], _file_cache.document(source)
+            )
+        return _read_file(source)
+    elif isinstance(source, typing.Dict):
+        if copy is True:
+            return deepcopy(source)
+        return source
+    raise TypeError("source should be data dictionary or file_name with data")
+
+
+def _load_plan(
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    path_delim: str,
+    observer: typing.Optional[Observer] = None,
+    validate: bool = True,
+) -> ActionPlan:
+    """
+    Read actions from file if needed and compile them.
+    :param actions: list, compiled plan or json/yaml file with actions
+    :param path_delim: path delimiter
+    :param observer: observer to be notified about validation of actions
+    :param validate: False to skip validation of actions
+    :return: compiled plan
+    """
+    if isinstance(actions, ActionPlan):
+        return actions
+    elif isinstance(actions, str):
+        if _file_cache is not None:
+            return _file_cache.plan(actions, path_delim, validate, observer)
+        return compile_actions(_read_file(actions), path_delim, observer, validate)
+    elif isinstance(actions, typing.List):
+        if not validate and observer is None:
+            # Plan is applied once and values are copied on every change, so
+            # trusted actions are used without validation and copies.
+            return ActionPlan(
+                [
+                    _compile(action, path_delim, action.get("value"))
+                    for action in actions
+                ],
+                path_delim,
+            )
+        return compile_actions(actions, path_delim, observer, validate)
+    raise TypeError("actions should be data dictionary or file_name with actions list")
+
+
+def _apply_plan(
+    plan: ActionPlan,
+    source: typing.Union[typing.Dict[str, typing.Any], str],
+    copy: typing.Union[bool, str],
+    observer: typing.Optional[Observer] = None,
+    transactional: bool = False,
+    undo: typing.Optional[UndoLog] = None,
+) -> typing.Iterable[typing.Any]:
+    """
+    Load source and apply plan to it.
+    :param plan: compiled actions
+    :param source: dictionary or json/yaml file with data that should be modified
+    :param copy: copy mode for dictionary source
+    :param observer: observer to be notified about each phase of each action
+    :param transactional: revert all changes, when any action fails
+    :param undo: log for inverse of each change
+    :return: source modified after applying actions
+    """
+    if copy not in (True, False, "path"):
+        raise ValueError("copy should be True, False or 'path'")
+    source_data = _load_source(source, copy)
+    options = {
+        "observer": observer,
+        "transactional": transactional,
+        "undo": undo,
+    }  # type: typing.Dict[str, typing.Any]
+    if copy == "path" and not isinstance(source, str):
+        return plan.apply(source_data, copy="path", **options)  # type: ignore
+    plan.apply(source_data, **options)
+    return source_data
+
+
+def apply_actions(
+    source: typing.Union[typing.Dict[str, typing.Any], str],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    copy: typing.Union[bool, str] = False,
+    path_delim: str = "/",
+    observer: typing.Optional[Observer] = None,
+    profile: typing.Optional[str] = None,
+    transactional: bool = False,
+    undo: typing.Optional[UndoLog] = None,
+    validate: bool = True,
+    destination: typing.Union[str, bool, None] = None,
+    skip_unchanged: bool = False,
+) -> typing.Iterable[typing.Any]:
+    """
+    Apply actions on source_data.
+    :param source: dictionary or json/yaml file with data that should be modified
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to source
+    :param copy: should source be copied before modification or changed in place
+        (works only when source is dictionary not file). True makes deep copy,
+        'path' copies only containers on paths of actions and shares the rest
+        with source. default is False
+    :param path_delim: path delimiter. default is '/'
+    :param observer: observer to be notified about each phase of each action
+    :param profile: file name, where pstats of the run under cProfile should be
+        written. default is None (no profiling)
+    :param transactional: revert all changes of source, when any action fails,
+        without copying it up front. default is False
+    :param undo: log, where inverse of each change is recorded, so that changes
+        can be reverted later with undo.revert()
+    :param validate: False to skip validation of actions, that are known to be
+        valid (compiled plans are never validated again). default is True
+    :param destination: name of json/yaml file, where result is written
+        atomically with writer chosen by it's extension, or True to write it
+        back to source file. default is None (result is only returned)
+    :param skip_unchanged: don't write destination, when actions changed
+        nothing in source file or destination already has the same content.
+        default is False
+    :return: source modified after applying actions
+    """
+    if destination is True:
+        if not isinstance(source, str):
+            raise TypeError("destination=True requires file_name as source")
+        destination = source
+    with profiled(profile):
+        plan = _load_plan(actions, path_delim, observer, validate)
+        if not isinstance(destination, str):
+            return _apply_plan(plan, source, copy, observer, transactional, undo)
+        if skip_unchanged and undo is None:
+            # Every change is recorded, so unchanged source is detected
+            # without encoding it.
+            undo = UndoLog()
+        mark = len(undo) if undo is not None else 0
+        result = _apply_plan(plan, source, copy, observer, transactional, undo)
+        if (
+            skip_unchanged
+            and undo is not None
+            and len(undo) == mark
+            and isinstance(source, str)
+            and os.path.abspath(source) == os.path.abspath(destination)
+        ):
+            return result
+        write_file(result, destination, skip_unchanged)
+        return result
+
+
+BatchResult = typing.NamedTuple(
+    "BatchResult",
+    [
+        ("index", int),
+        ("source", typing.Any),
+        ("result", typing.Any),
+        ("error", typing.Optional[BaseException]),
+    ],
+)
+BatchResult.__doc__ = """
+Result of applying actions to single document of batch.
+:param index: position of the document in sources
+:param source: dictionary or file name as it was passed in sources
+:param result: modified document, None when error occurred
+:param error: exception raised for this document, None on success
+"""
+
+
+def _apply_chunk(
+    plan: ActionPlan,
+    chunk: typing.List[typing.Tuple[int, typing.Any]],
+    copy: typing.Union[bool, str],
+    return_source: bool,
+) -> typing.List[BatchResult]:
+    """
+    Apply plan to chunk of documents, collecting errors for each of them.
+    :param plan: compiled actions
+    :param chunk: pairs of (index, source)
+    :param copy: copy mode for dictionary sources
+    :param return_source: should source be included into results
+    :return: results for each document of chunk
+    """
+    results = []
+    for index, source in chunk:
+        reported = source if return_source else None
+        try:
+            result = _apply_plan(plan, source, copy)
+        except Exception as exc:
+            results.append(BatchResult(index, reported, None, exc))
+        else:
+            results.append(BatchResult(index, reported, result, None))
+    return results
+
+
+# Plan of the batch in worker of process pool, set once by pool initializer.
+_worker_plan = None  # type: typing.Any
+
+
+def _set_worker_plan(plan: typing.Any) -> None:
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _apply_worker_plan(
+    task: typing.Callable[..., typing.List[BatchResult]],
+    chunk: typing.List[typing.Tuple[int, typing.Any]],
+    copy: typing.Union[bool, str],
+    return_source: bool,
+) -> typing.List[BatchResult]:
+    """
+    Run task of batch with plan, that was sent to this worker by initializer.
+    """
+    return task(_worker_plan, chunk, copy, return_source)
+
+
+def _chunks(
+    sources: typing.Iterable[typing.Any], chunk_size: int
+) -> typing.Iterator[typing.List[typing.Tuple[int, typing.Any]]]:
+    chunk = []  # type: typing.List[typing.Tuple[int, typing.Any]]
+    for item in enumerate(sources):
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_batch(
+    plan: typing.Any,
+    sources: typing.Iterable[typing.Any],
+    copy: typing.Union[bool, str],
+    executor: typing.Union[str, "Executor"],
+    max_workers: typing.Optional[int],
+    chunk_size: int,
+    ordered: bool,
+    task: typing.Callable[..., typing.List[BatchResult]] = _apply_chunk,
+) -> typing.Iterator[BatchResult]:
+    # Pools are imported here, since multiprocessing and logging, that is
+    # used by concurrent.futures, are slow to import.
+    from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+    own_pool = not isinstance(executor, Executor)
+    # Plan is pickled for each submitted chunk, unless workers of own process
+    # pool get it once from initializer (it has no initializer before 3.7).
+    shipped = own_pool and executor == "process" and sys.version_info >= (3, 7)
+    if isinstance(executor, Executor):
+        pool = executor
+    elif shipped:
+        pool = ProcessPoolExecutor(
+            max_workers, initializer=_set_worker_plan, initargs=(plan,)
+        )
+    elif executor == "process":
+        pool = ProcessPoolExecutor(max_workers)
+    else:
+        pool = ThreadPoolExecutor(max_workers)
+    # Sources of process pool are pickled anyway, so there is nothing to return.
+    return_source = not isinstance(pool, ProcessPoolExecutor)
+    window = 2 * (max_workers or os.cpu_count() or 1)
+
+    pending = (
+        collections.deque()
+    )  # type: typing.Deque[Future[typing.List[BatchResult]]]
+    try:
+        for chunk in _chunks(sources, chunk_size):
+            if shipped:
+                future = pool.submit(
+                    _apply_worker_plan, task, chunk, copy, return_source
+                )
+            else:
+                future = pool.submit(task, plan, chunk, copy, return_source)
+            pending.append(future)
+            while len(pending) >= window:
+                for result in _collect(pending, ordered):
+                    yield result
+        while pending:
+            for result in _collect(pending, ordered):
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_pool:
+            pool.shutdown(wait=True)
+
+
+def _collect(
+    pending: typing.Deque["Future[typing.List[BatchResult]]"], ordered: bool
+) -> typing.List[BatchResult]:
+    """
+    Wait for the next finished chunk and remove it from pending.
+    :param pending: submitted chunks
+    :param ordered: wait for the oldest chunk instead of any finished one
+    :return: results of finished chunk
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = next(iter(done))
+    pending.remove(future)
+    return future.result()
+
+
+def apply_actions_many(
+    sources: typing.Iterable[typing.Union[typing.Dict[str, typing.Any], str]],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    copy: typing.Union[bool, str] = False,
+    path_delim: str = "/",
+    executor: typing.Union[str, "Executor"] = "thread",
+    max_workers: typing.Optional[int] = None,
+    chunk_size: int = 16,
+    ordered: bool = True,
+) -> typing.Iterator[BatchResult]:
+    """
+    Apply the same actions on many sources using pool of workers.
+    Actions are validated once, before any source is processed.
+    :param sources: iterable of dictionaries or json/yaml files with data
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to each source
+    :param copy: copy mode for dictionary sources, same as for apply_actions
+        (with process pool sources are always copied). default is False
+    :param path_delim: path delimiter. default is '/'
+    :param executor: 'thread', 'process' or instance of
+        concurrent.futures.Executor. default is 'thread'
+    :param max_workers: number of workers for created pool
+    :param chunk_size: number of sources sent to worker at once. default is 16
+    :param ordered: should results be yielded in order of sources or as soon
+        as they are ready. default is True
+    :return: iterator of BatchResult, one for each source. Errors are reported
+        in BatchResult.error instead of being raised.
+    """
+    from concurrent.futures import Executor
+
+    if executor not in ("thread", "process") and not isinstance(executor, Executor):
+        raise ValueError("executor should be 'thread', 'process' or Executor")
+    if chunk_size < 1:
+        raise ValueError("chunk_size should be positive")
+
+    plan = _load_plan(actions, path_delim)
+    return _iter_batch(plan, sources, copy, executor, max_workers, chunk_size, ordered)
+
+
+def read_json_lines(file: typing.IO[str]) -> typing.Iterator[typing.Any]:
+    """
+    Read records from JSON Lines file one line at a time. Blank lines are skipped.
+    :param file: opened file with one json document per line
+    :return: iterator of records
+    """
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise ValueError("Line {}: {}".format(line_number, exc))
+
+
+def write_json_lines(records: typing.Iterable[typing.Any], file: typing.IO[str]) -> int:
+    """
+    Write records to file in JSON Lines format.
+    :param records: records to be written
+    :param file: opened file for writing
+    :return: number of written records
+    """
+    count = 0
+    for record in records:
+        file.write(json.dumps(record))
+        file.write("\n")
+        count += 1
+    return count
+
+
+def _compile_selector(
+    selector: typing.Union[
+        typing.Callable[[typing.Any], bool], typing.Dict[str, typing.Any], None
+    ],
+    path_delim: str,
+) -> typing.Optional[typing.Callable[[typing.Any], bool]]:
+    """
+    Turn selector into function, that checks record.
+    :param selector: function, that accepts record, or dictionary of
+        {path: value}, that should all be equal in selected record
+    :param path_delim: delimiter of paths in selector dictionary
+    :return: function or None, when every record is selected
+    """
+    if selector is None or callable(selector):
+        return selector
+    if not isinstance(selector, typing.Dict):
+        raise TypeError("selector should be function or dictionary")
+    expected = [
+        (key.split(path_delim), value) for key, value in selector.items()
+    ]  # type: typing.List[typing.Tuple[typing.List[str], typing.Any]]
+    missing = object()
+
+    def select(record: typing.Any) -> bool:
+        for keys, value in expected:
+            section = record
+            for key in keys:
+                if not isinstance(section, typing.Dict):
+                    return False
+                section = section.get(key, missing)
+            if section != value:
+                return False
+        return True
+
+    return select
+
+
+def apply_actions_stream(
+    records: typing.Iterable[typing.Any],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    path_delim: str = "/",
+    on_error: str = "raise",
+    errors: typing.Optional[typing.List[BatchResult]] = None,
+    selector: typing.Union[
+        typing.Callable[[typing.Any], bool], typing.Dict[str, typing.Any], None
+    ] = None,
+) -> typing.Iterator[typing.Any]:
+    """
+    Apply actions on each record of stream, modifying records in place.
+    Only one record is processed at a time, so memory use doesn't depend on
+    the size of the stream.
+    :param records: iterable of records
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to each record
+    :param path_delim: path delimiter. default is '/'
+    :param on_error: what to do with record, that failed an action: 'raise',
+        'skip' or 'collect' (skip and append to errors). default is 'raise'
+    :param errors: list, where BatchResult of failed records is appended
+        when on_error is 'collect'. Failed record may be partially modified.
+    :param selector: function, that accepts record, or dictionary of
+        {path: value} (for example {"kind": "Service", "metadata/name": "web"}).
+        Actions are applied only to selected records, others are passed as is.
+        default is None (all records are selected)
+    :return: iterator of modified records
+    """
+    if on_error not in ("raise", "skip", "collect"):
+        raise ValueError("on_error should be 'raise', 'skip' or 'collect'")
+    if on_error == "collect" and errors is None:
+        raise ValueError("errors list is required when on_error is 'collect'")
+
+    select = _compile_selector(selector, path_delim)
+    plan = _load_plan(actions, path_delim)
+    return _iter_stream(plan, records, on_error, errors, select)
+
+
+def _iter_stream(
+    plan: ActionPlan,
+    records: typing.Iterable[typing.Any],
+    on_error: str,
+    errors: typing.Optional[typing.List[BatchResult]],
+    select: typing.Optional[typing.Callable[[typing.Any], bool]] = None,
+) -> typing.Iterator[typing.Any]:
+    for index, record in enumerate(records):
+        if select is not None and not select(record):
+            yield record
+            continue
+        try:
+            plan.apply(record)
+        except Exception as exc:
+            if on_error == "raise":
+                raise
+            if errors is not None:
+                errors.append(BatchResult(index, record, None, exc))
+            continue
+        yield record
+
+
+def apply_actions_jsonl(
+    source: typing.Union[str, typing.IO[str]],
+    destination: typing.Union[str, typing.IO[str]],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    path_delim: str = "/",
+    on_error: str = "raise",
+    errors: typing.Optional[typing.List[BatchResult]] = None,
+) -> int:
+    """
+    Apply actions on each record of JSON Lines file and write modified records
+    to destination, one record at a time.
+    :param source: JSON Lines file name or opened file
+    :param destination: file name or opened file for modified records
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to each record
+    :param path_delim: path delimiter. default is '/'
+    :param on_error: what to do with record, that failed an action: 'raise',
+        'skip' or 'collect'. default is 'raise'
+    :param errors: list for failed records when on_error is 'collect'
+    :return: number of written records
+    """
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, str):
+            source = stack.enter_context(open(source, "r"))
+        # Actions are validated before destination is opened, so that invalid
+        # actions never truncate it.
+        records = apply_actions_stream(
+            read_json_lines(source), actions, path_delim, on_error, errors
+        )
+        if isinstance(destination, str):
+            destination = stack.enter_context(open(destination, "w"))
+        return write_json_lines(records, destination)
+
+
+def read_yaml_documents(file: typing.IO[str]) -> typing.Iterator[typing.Any]:
+    """
+    Read documents of multi-document yaml stream (separated by ---) one at a
+    time, using libyaml based loader when it's available.
+    :param file: opened yaml file
+    :return: iterator of documents
+    """
+    yaml = _yaml()
+    return yaml.load_all(  # type: ignore
+        file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    )
+
+
+def write_yaml_documents(
+    documents: typing.Iterable[typing.Any], file: typing.IO[str]
+) -> int:
+    """
+    Write documents to file as multi-document yaml stream, one at a time.
+    :param documents: documents to be written
+    :param file: opened file for writing
+    :return: number of written documents
+    """
+    yaml = _yaml()
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    count = 0
+    for document in documents:
+        yaml.dump(
+            document,
+            file,
+            Dumper=dumper,
+            default_flow_style=False,
+            explicit_start=True,
+            sort_keys=False,
+        )
+        count += 1
+    return count
+
+
+def apply_actions_yaml_stream(
+    source: typing.Union[str, typing.IO[str]],
+    destination: typing.Union[str, typing.IO[str]],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    path_delim: str = "/",
+    selector: typing.Union[
+        typing.Callable[[typing.Any], bool], typing.Dict[str, typing.Any], None
+    ] = None,
+    on_error: str = "raise",
+    errors: typing.Optional[typing.List[BatchResult]] = None,
+) -> int:
+    """
+    Apply actions on documents of multi-document yaml file (for example bundle
+    of Kubernetes manifests) and write them to destination, one document at
+    a time. Documents, that aren't dictionaries (empty ones), are written as is.
+    :param source: yaml file name or opened file
+    :param destination: file name or opened file for modified documents
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to each selected document
+    :param path_delim: path delimiter. default is '/'
+    :param selector: function, that accepts document, or dictionary of
+        {path: value}, to choose documents that should be modified.
+        default is None (all documents)
+    :param on_error: what to do with document, that failed an action: 'raise',
+        'skip' or 'collect'. default is 'raise'
+    :param errors: list for failed documents when on_error is 'collect'
+    :return: number of written documents
+    """
+    select = _compile_selector(selector, path_delim)
+
+    def select_document(document: typing.Any) -> bool:
+        if not isinstance(document, typing.Dict):
+            return False
+        return select is None or select(document)
+
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, str):
+            source = stack.enter_context(open(source, "r"))
+        # Actions are validated before destination is opened, so that invalid
+        # actions never truncate it.
+        documents = apply_actions_stream(
+            read_yaml_documents(source),
+            actions,
+            path_delim,
+            on_error,
+            errors,
+            select_document,
+        )
+        if isinstance(destination, str):
+            destination = stack.enter_context(open(destination, "w"))
+        return write_yaml_documents(documents, destination)
+
+
+def _same_content(first: str, second: str) -> bool:
+    """
+    Compare content of two files chunk by chunk.
+    """
+    if os.path.getsize(first) != os.path.getsize(second):
+        return False
+    with open(first, "rb") as f1, open(second, "rb") as f2:
+        while True:
+            chunk = f1.read(_WRITE_BUFFER)
+            if chunk != f2.read(_WRITE_BUFFER):
+                return False
+            if not chunk:
+                return True
+
+
+_umask = None  # type: typing.Optional[int]
+
+
+def _new_file_mode() -> int:
+    """
+    Get permissions, that open() gives to new files. Umask can be read only by
+    changing it, so it's read once.
+    """
+    global _umask
+    if _umask is None:
+        _umask = os.umask(0o022)
+        os.umask(_umask)
+    return 0o666 & ~_umask
+
+
+class _AtomicFile(object):
+    """
+    Temporary file next to file_name, that replaces it only when writing
+    finishes without errors.
+    :param file_name: name of the file to write
+    :param mode: mode to open temporary file with. default is 'w'
+    :param like: file, which permissions are given to new file, when
+        file_name doesn't exist
+    :param skip_same: keep file_name untouched, when it already has the same
+        content. default is False
+    """
+
+    __slots__ = ("file_name", "mode", "like", "skip_same", "replaced", "_temp")
+
+    def __init__(
+        self,
+        file_name: str,
+        mode: str = "w",
+        like: typing.Optional[str] = None,
+        skip_same: bool = False,
+    ) -> None:
+        self.file_name = file_name
+        self.mode = mode
+        self.like = like
+        self.skip_same = skip_same
+        self.replaced = False
+        self._temp = (
+            None
+        )  # type: typing.Optional[typing.Tuple[str, typing.IO[typing.Any]]]
+
+    def __enter__(self) -> typing.IO[typing.Any]:
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        fd, temp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            f = os.fdopen(fd, self.mode)
+        except BaseException:
+            os.close(fd)
+            os.unlink(temp_name)
+            raise
+        self._temp = (temp_name, f)
+        return f
+
+    def __exit__(self, exc_type: typing.Any, *args: typing.Any) -> None:
+        assert self._temp is not None
+        temp_name, f = self._temp
+        self._temp = None
+        try:
+            f.close()
+            if exc_type is not None or (
+                self.skip_same
+                and os.path.exists(self.file_name)
+                and _same_content(temp_name, self.file_name)
+            ):
+                return
+            # Temporary file is created with 0600 permissions.
+            for existing in (self.file_name, self.like):
+                if existing is not None and os.path.exists(existing):
+                    os.chmod(temp_name, os.stat(existing).st_mode & 0o7777)
+                    break
+            else:
+                os.chmod(temp_name, _new_file_mode())
+            os.replace(temp_name, self.file_name)
+            self.replaced = True
+        finally:
+            if not self.replaced:
+                os.unlink(temp_name)
+
+
+def write_file(data: typing.Any, file_name: str, skip_unchanged: bool = False) -> bool:
+    """
+    Write data to file with writer chosen by extension of the file. Data is
+    written to temporary file, that replaces file only after writing finishes,
+    so readers never see partially written file.
+    :param data: data that should be written
+    :param file_name: name of json/yaml file
+    :param skip_unchanged: keep file untouched (with it's modification time),
+        when it already has exactly the same content. default is False
+    :return: True when file was written, False when it was unchanged
+    """
+    writer = get_writer(file_name)
+    atomic = _AtomicFile(file_name, skip_same=skip_unchanged)
+    with atomic as f:
+        writer(data, f)
+    return atomic.replaced
+
+
+_JSON_WS = re.compile(rb"[ \t\n\r]*")
+_JSON_STRING_PATTERN = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_JSON_STRING = re.compile(_JSON_STRING_PATTERN, re.DOTALL)
+_JSON_SCALAR = re.compile(rb"[^ \t\n\r,\]}]+")
+_JSON_KEY = re.compile(
+    b"(" + _JSON_STRING_PATTERN + rb")[ \t\n\r]*:[ \t\n\r]*", re.DOTALL
+)
+# String or other scalar, containers are skipped separately.
+_JSON_ATOM = re.compile(
+    b"(?:" + _JSON_STRING_PATTERN + rb'|[^ \t\n\r,\]}\[{"]+)', re.DOTALL
+)
+_JSON_NEXT = re.compile(rb"[ \t\n\r]*([^ \t\n\r]?)")
+
+
+def _json_nested(depth: int) -> bytes:
+    """
+    Build pattern for content of container with nested containers up to depth
+    levels. Alternatives never overlap, so failed match doesn't backtrack
+    more than once over each byte.
+    """
+    flat = rb'[^"\[\]{}]*(?:' + _JSON_STRING_PATTERN + rb'[^"\[\]{}]*)*'
+    content = flat
+    for _ in range(depth):
+        content = flat + rb"(?:[\[{]" + content + rb"[\]}]" + flat + rb")*"
+    return content
+
+
+# Small containers are skipped by single match, deeper ones bracket by bracket.
+_JSON_CONTAINER = re.compile(rb"[\[{]" + _json_nested(2) + rb"[\]}]", re.DOTALL)
+_JSON_SKIP = re.compile(_json_nested(3), re.DOTALL)
+_JSON_WINDOW = 1 << 16
+
+
+class _SpliceSpan(object):
+    """
+    Range of bytes with undecoded JSON value.
+    """
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+
+
+def _json_char(buf: typing.Any, pos: int) -> bytes:
+    end = pos + 1
+    return buf[pos:end]  # type: ignore
+
+
+def _json_error(buf: typing.Any, pos: int) -> ValueError:
+    end = pos + 20
+    return ValueError("Invalid JSON at byte {}: {!r}".format(pos, buf[pos:end]))
+
+
+def _skip_json_value(buf: typing.Any, pos: int) -> int:
+    """
+    Find end of JSON value without decoding it. Containers are skipped by
+    bracket matching, with matches limited to window, because regex engine
+    keeps state for each repetition of matched part.
+    :param buf: bytes or mmap with JSON
+    :param pos: position, where value starts
+    :return: position after the value
+    """
+    char = _json_char(buf, pos)
+    if char == b"{" or char == b"[":
+        match = _JSON_CONTAINER.match(buf, pos, pos + _JSON_WINDOW)
+        if match is not None:
+            return match.end()
+        depth = 0
+        while True:
+            char = _json_char(buf, pos)
+            if char == b"{" or char == b"[":
+                depth += 1
+                pos += 1
+            elif char == b"}" or char == b"]":
+                depth -= 1
+                pos += 1
+                if depth == 0:
+                    return pos
+            elif char == b'"':
+                # String crosses the end of window.
+                match = _JSON_STRING.match(buf, pos)
+                if match is None:
+                    raise _json_error(buf, pos)
+                pos = match.end()
+            elif not char:
+                raise _json_error(buf, pos)
+            pos = _JSON_SKIP.match(buf, pos, pos + _JSON_WINDOW).end()  # type: ignore
+    match = (_JSON_STRING if char == b'"' else _JSON_SCALAR).match(buf, pos)
+    if match is None:
+        raise _json_error(buf, pos)
+    return match.end()
+
+
+def _scan_json_container(
+    buf: typing.Any, start: int, keyed: bool
+) -> typing.Tuple[typing.List[typing.Tuple[typing.Any, int, _SpliceSpan]], int]:
+    """
+    Find members of JSON object or array, without decoding their values.
+    :param buf: bytes or mmap with JSON
+    :param start: position of opening bracket
+    :param keyed: True for object, False for array
+    :return: list of (key, start of member, span of value) and position after
+        closing bracket. key is None for array.
+    """
+    close = b"}" if keyed else b"]"
+    members = []  # type: typing.List[typing.Tuple[typing.Any, int, _SpliceSpan]]
+    pos = _JSON_WS.match(buf, start + 1).end()  # type: ignore
+    if _json_char(buf, pos) == close:
+        return members, pos + 1
+    while True:
+        member_start = pos
+        key = None
+        if keyed:
+            match = _JSON_KEY.match(buf, pos)
+            if match is None:
+                raise _json_error(buf, pos)
+            raw = match.group(1)
+            if b"\\" in raw:
+                key = json.loads(raw.decode("utf-8"))
+            else:
+                key = raw[1:-1].decode("utf-8")
+            pos = match.end()
+        match = _JSON_ATOM.match(buf, pos)
+        end = match.end() if match is not None else _skip_json_value(buf, pos)
+        members.append((key, member_start, _SpliceSpan(pos, end)))
+        match = _JSON_NEXT.match(buf, end)
+        char = match.group(1)  # type: ignore
+        if char == close:
+            return members, match.end()  # type: ignore
+        if char != b",":
+            raise _json_error(buf, match.start(1))  # type: ignore
+        pos = _JSON_WS.match(buf, match.end()).end()  # type: ignore
+
+
+def _splice_value(buf: typing.Any, span: _SpliceSpan) -> typing.Any:
+    """
+    Turn span into lazy container or decoded scalar.
+    """
+    char = _json_char(buf, span.start)
+    if char == b"{":
+        return _SpliceDict(buf, span)
+    if char == b"[":
+        return _SpliceList(buf, span)
+    return _decode_span(buf, span)
+
+
+def _decode_span(buf: typing.Any, span: _SpliceSpan) -> typing.Any:
+    start, end = span.start, span.end
+    return json.loads(bytes(buf[start:end]).decode("utf-8"))
+
+
+def _splice_plain(value: typing.Any) -> typing.Any:
+    """
+    Turn lazy container into plain one, so that it can be compared.
+    """
+    if isinstance(value, (_SpliceDict, _SpliceList)):
+        return value.plain()
+    return value
+
+
+class _SpliceWriter(object):
+    """
+    Writes output of splice editing, copying unchanged ranges of source.
+    Adjacent ranges are joined and copied by single write.
+    """
+
+    __slots__ = ("_file", "_view", "_start", "_end", "copied", "written")
+
+    def __init__(self, file: typing.IO[bytes], view: memoryview) -> None:
+        self._file = file
+        self._view = view
+        self._start = 0
+        self._end = 0
+        self.copied = 0
+        self.written = 0
+
+    def copy(self, start: int, end: int) -> None:
+        if end <= start:
+            return
+        if start != self._end:
+            self.flush()
+            self._start = start
+        self._end = end
+        self.copied += end - start
+
+    def flush(self) -> None:
+        start, end = self._start, self._end
+        if end > start:
+            self._file.write(self._view[start:end])
+        self._start = self._end = 0
+
+    def read(self, start: int, end: int) -> bytes:
+        return bytes(self._view[start:end])
+
+    def write(self, data: bytes) -> None:
+        self.flush()
+        self._file.write(data)
+        self.written += len(data)
+
+    def write_value(self, value: typing.Any) -> None:
+        if isinstance(value, _SpliceSpan):
+            self.copy(value.start, value.end)
+        elif isinstance(value, (_SpliceDict, _SpliceList)):
+            value.write(self)
+        else:
+            self.write(json.dumps(value).encode("utf-8"))
+
+
+def _write_members(
+    writer: _SpliceWriter,
+    origin: _SpliceSpan,
+    bounds: typing.List[typing.Tuple[int, int]],
+    members: typing.List[typing.Tuple[typing.Optional[int], typing.Any]],
+    write: typing.Callable[[typing.Optional[int], typing.Any], None],
+    brackets: bytes,
+) -> None:
+    """
+    Write changed container. Original members keep their bytes and
+    separators, new members are separated like the first original ones.
+    :param writer: output
+    :param origin: span of original container
+    :param bounds: (start, end) of original members
+    :param members: pairs of (original index or None, member)
+    :param write: function to write single member
+    :param brackets: opening and closing bracket
+    """
+    if not bounds:
+        writer.write(brackets[:1])
+        for position, (index, member) in enumerate(members):
+            if position:
+                writer.write(b", ")
+            write(index, member)
+        writer.write(brackets[1:])
+        return
+
+    separator = b", "
+    if len(bounds) > 1:
+        separator = writer.read(bounds[0][1], bounds[1][0])
+    writer.copy(origin.start, bounds[0][0])
+    previous = None  # type: typing.Optional[int]
+    for position, (index, member) in enumerate(members):
+        if position:
+            if previous is not None and index == previous + 1:
+                writer.copy(bounds[previous][1], bounds[index][0])
+            else:
+                writer.write(separator)
+        write(index, member)
+        previous = index
+    writer.copy(bounds[-1][1], origin.end)
+
+
+class _SpliceDict(typing.Dict[str, typing.Any]):
+    """
+    JSON object from source bytes. Members are found on creation, but their
+    values are decoded only when accessed by key.
+    """
+
+    __slots__ = ("_buf", "_origin", "_members", "_positions")
+
+    def __init__(self, buf: typing.Any, origin: _SpliceSpan) -> None:
+        super().__init__()
+        self._buf = buf
+        self._origin = origin
+        self._members, origin.end = _scan_json_container(buf, origin.start, True)
+        self._positions = {}  # type: typing.Dict[str, int]
+        for index, (key, _, span) in enumerate(self._members):
+            dict.__setitem__(self, key, span)
+            self._positions[key] = index
+
+    def __getitem__(self, key: str) -> typing.Any:
+        value = dict.__getitem__(self, key)
+        if isinstance(value, _SpliceSpan):
+            value = _splice_value(self._buf, value)
+            if isinstance(value, (_SpliceDict, _SpliceList)):
+                dict.__setitem__(self, key, value)
+        return value
+
+    def __eq__(self, other: typing.Any) -> bool:
+        # Storage keeps undecoded spans, so it can't be compared as is.
+        return bool(self.plain() == _splice_plain(other))
+
+    def __ne__(self, other: typing.Any) -> bool:
+        return not self == other
+
+    def plain(self) -> typing.Dict[str, typing.Any]:
+        """
+        Decode object with all it's members into plain dictionary.
+        """
+        if not self.changed():
+            return typing.cast(
+                typing.Dict[str, typing.Any], _decode_span(self._buf, self._origin)
+            )
+        return {key: _splice_plain(self[key]) for key in self}
+
+    def changed(self) -> bool:
+        if len(self) != len(self._members):
+            return True
+        for (key, _, span), (current, value) in zip(self._members, self.items()):
+            if current != key or not _is_original(value, span):
+                return True
+        return False
+
+    def write(self, writer: _SpliceWriter) -> None:
+        if not self.changed():
+            writer.copy(self._origin.start, self._origin.end)
+            return
+        members = [
+            (self._positions.get(key), (key, value)) for key, value in self.items()
+        ]
+        bounds = [(start, span.end) for _, start, span in self._members]
+        _write_members(
+            writer,
+            self._origin,
+            bounds,
+            members,
+            functools.partial(self._write_member, writer),
+            b"{}",
+        )
+
+    def _write_member(
+        self,
+        writer: _SpliceWriter,
+        index: typing.Optional[int],
+        member: typing.Tuple[str, typing.Any],
+    ) -> None:
+        key, value = member
+        if index is None:
+            writer.write(json.dumps(key).encode("utf-8") + b": ")
+        else:
+            start, span = self._members[index][1:]
+            writer.copy(start, span.start)
+        writer.write_value(value)
+
+
+class _SpliceItem(_SpliceSpan):
+    """
+    Object or array element of JSON array, that is scanned only when it's
+    needed. Keys are looked up without building the object, so that filter
+    markers can check elements of long lists.
+    """
+
+    __slots__ = ("buf", "index")
+
+    def __init__(self, buf: typing.Any, index: int, span: _SpliceSpan) -> None:
+        super().__init__(span.start, span.end)
+        self.buf = buf
+        self.index = index
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if _json_char(self.buf, self.start) != b"{":
+            raise TypeError("list indices must be integers or slices, not str")
+        found = None
+        for member_key, _, span in _scan_json_container(self.buf, self.start, True)[0]:
+            if member_key == key:
+                found = span
+        if found is None:
+            raise KeyError(key)
+        # Filters compare values with plain ones, so containers are decoded.
+        return _decode_span(self.buf, found)
+
+
+class _SpliceList(typing.List[typing.Any]):
+    """
+    JSON array from source bytes. Scalar elements are decoded on creation,
+    containers are turned into lazy ones when accessed by index.
+    """
+
+    __slots__ = ("_buf", "_origin", "_members")
+
+    def __init__(self, buf: typing.Any, origin: _SpliceSpan) -> None:
+        super().__init__()
+        self._buf = buf
+        self._origin = origin
+        self._members = []  # type: typing.List[typing.Tuple[_SpliceSpan, typing.Any]]
+        members, origin.end = _scan_json_container(buf, origin.start, False)
+        for index, (_, _, span) in enumerate(members):
+            if _json_char(buf, span.start) in (b"{", b"["):
+                item = _SpliceItem(buf, index, span)
+                self._members.append((item, item))
+            else:
+                self._members.append((span, _splice_value(buf, span)))
+        self.extend(value for _, value in self._members)
+
+    def __getitem__(self, index: typing.Any) -> typing.Any:
+        value = list.__getitem__(self, index)
+        if isinstance(value, _SpliceItem):
+            container = _splice_value(self._buf, value)
+            list.__setitem__(self, index, container)
+            self._members[value.index] = (value, container)
+            return container
+        return value
+
+    def __eq__(self, other: typing.Any) -> bool:
+        # Storage keeps unscanned elements, so it can't be compared as is.
+        return bool(self.plain() == _splice_plain(other))
+
+    def __ne__(self, other: typing.Any) -> bool:
+        return not self == other
+
+    def plain(self) -> typing.List[typing.Any]:
+        """
+        Decode array with all it's elements into plain list.
+        """
+        if not self.changed():
+            return typing.cast(
+                typing.List[typing.Any], _decode_span(self._buf, self._origin)
+            )
+        return [_splice_plain(self[index]) for index in range(len(self))]
+
+    def changed(self) -> bool:
+        if len(self) != len(self._members):
+            return True
+        for (_, original), value in zip(self._members, self):
+            if value is not original or not _is_original(value, None):
+                return True
+        return False
+
+    def write(self, writer: _SpliceWriter) -> None:
+        if not self.changed():
+            writer.copy(self._origin.start, self._origin.end)
+            return
+        _write_members(
+            writer,
+            self._origin,
+            [(span.start, span.end) for span, _ in self._members],
+            self._match_members(),
+            functools.partial(self._write_member, writer),
+            b"[]",
+        )
+
+    def _match_members(
+        self,
+    ) -> typing.List[typing.Tuple[typing.Optional[int], typing.Any]]:
+        """
+        Find original index of each element. Actions keep order of elements,
+        so originals are matched by identity, moving forward through the
+        original list.
+        """
+        count = len(self._members)
+        positions = None  # type: typing.Optional[typing.Dict[int, typing.List[int]]]
+        members = (
+            []
+        )  # type: typing.List[typing.Tuple[typing.Optional[int], typing.Any]]
+        next_index = 0
+        for value in self:
+            index = None  # type: typing.Optional[int]
+            if next_index < count and self._members[next_index][1] is value:
+                index = next_index
+            else:
+                if positions is None:
+                    positions = {}
+                    for position, (_, original) in enumerate(self._members):
+                        positions.setdefault(id(original), []).append(position)
+                candidates = positions.get(id(value), [])
+                found = bisect.bisect_left(candidates, next_index)
+                if found < len(candidates):
+                    index = candidates[found]
+            if index is not None:
+                next_index = index + 1
+            members.append((index, value))
+        return members
+
+    @staticmethod
+    def _write_member(
+        writer: _SpliceWriter, index: typing.Optional[int], value: typing.Any
+    ) -> None:
+        writer.write_value(value)
+
+
+def _is_original(value: typing.Any, span: typing.Optional[_SpliceSpan]) -> bool:
+    """
+    Check that value wasn't changed since it was read from span.
+    """
+    if isinstance(value, (_SpliceDict, _SpliceList)):
+        return (span is None or value._origin is span) and not value.changed()
+    return span is None or value is span
+
+
+def apply_actions_splice(
+    source: str,
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    destination: typing.Optional[str] = None,
+    path_delim: str = "/",
+) -> int:
+    """
+    Apply actions on JSON file without loading it whole. Only objects and arrays
+    on paths of actions are scanned, other values are skipped by bracket
+    matching, and bytes of unchanged parts are copied to destination as is,
+    so their formatting is preserved.
+    :param source: name of JSON file with data that should be modified
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to source
+    :param destination: name of file for the result, that is replaced only after
+        all actions are applied. default is source itself
+    :param path_delim: path delimiter. default is '/'
+    :return: number of bytes, that were encoded instead of copied from source
+    """
+    if get_codec(source).name != "json":
+        raise ValueError("Splice editing supports only json files")
+    plan = _load_plan(actions, path_delim)
+    with open(source, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # type: typing.Any
+        except ValueError:
+            # Empty files can't be mapped.
+            buf = f.read()
+        try:
+            start = _JSON_WS.match(buf).end()  # type: ignore
+            if _json_char(buf, start) != b"{":
+                raise TypeError(
+                    "source should be data dictionary or file_name with data"
+                )
+            # End of root is found while it's scanned.
+            root = _SpliceDict(buf, _SpliceSpan(start, start))
+            plan.apply(root)
+            with memoryview(buf) as view, _AtomicFile(
+                destination or source, "wb"
+            ) as out:
+                writer = _SpliceWriter(out, view)
+                writer.copy(0, start)
+                root.write(writer)
+                writer.copy(root._origin.end, len(buf))
+                writer.flush()
+            return writer.written
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+class _Differ(object):
+    """
+    Structural diff of two documents, that produces actions. Subtrees are
+    compared by identity first and by builtin equality next, so shared and
+    identical subtrees are skipped without walking them in Python.
+    """
+
+    __slots__ = ("_list_keys",)
+
+    def __init__(self, list_keys: typing.Sequence[str]) -> None:
+        self._list_keys = list_keys
+
+    def same(self, old: typing.Any, new: typing.Any) -> bool:
+        if old is new:
+            return True
+        if type(old) is not type(new) or not old == new:
+            return False
+        if not isinstance(old, (typing.Dict, typing.List)):
+            return True
+        # Builtin equality treats 1, 1.0 and True as equal, so equal
+        # containers are also compared by serialized form, which keeps types.
+        # Version 2 has no references, so it doesn't depend on sharing.
+        try:
+            return marshal.dumps(old, 2) == marshal.dumps(new, 2)
+        except ValueError:
+            return self._same_types(old, new)
+
+    def _same_types(self, old: typing.Any, new: typing.Any) -> bool:
+        """
+        Check that values, which are known to be equal, have the same types.
+        """
+        if old is new:
+            return True
+        if type(old) is not type(new):
+            return False
+        if isinstance(old, typing.Dict):
+            return all(self._same_types(value, new[key]) for key, value in old.items())
+        if isinstance(old, typing.List):
+            return all(
+                self._same_types(old_item, new_item)
+                for old_item, new_item in zip(old, new)
+            )
+        return True
+
+    @staticmethod
+    def _addressable(key: typing.Any) -> bool:
+        """
+        Check that key can be used in path as is.
+        """
+        return isinstance(key, str) and key == key.strip() and not key.startswith("$")
+
+    @staticmethod
+    def _action(
+        name: str,
+        path: typing.List[str],
+        markers: typing.Dict[str, typing.Any],
+        value: typing.Any = None,
+    ) -> typing.Dict[str, typing.Any]:
+        action = {
+            "action": name,
+            "path": list(path),
+        }  # type: typing.Dict[str, typing.Any]
+        action.update(markers)
+        if name != "delete":
+            action["value"] = deepcopy(value)
+        return action
+
+    def diff_dict(
+        self,
+        old: typing.Dict[str, typing.Any],
+        new: typing.Dict[str, typing.Any],
+        path: typing.List[str],
+        markers: typing.Dict[str, typing.Any],
+        actions: typing.List[typing.Dict[str, typing.Any]],
+    ) -> bool:
+        """
+        Add actions, that turn old dictionary into new one.
+        :return: False when difference can't be expressed by actions on
+            dictionary's content and the whole dictionary should be replaced
+        """
+        changes = []  # type: typing.List[typing.Dict[str, typing.Any]]
+        values = {}  # type: typing.Dict[str, typing.Any]
+        for key in old:
+            if key not in new:
+                if not self._addressable(key):
+                    return False
+                changes.append(self._action("delete", path + [key], markers))
+
+        for key, value in new.items():
+            if key in old:
+                old_value = old[key]
+                if old_value is value:
+                    continue
+                addressable = self._addressable(key)
+                nested = []  # type: typing.List[typing.Dict[str, typing.Any]]
+                # Dictionaries are walked without hashing, so that only
+                # changed paths are visited when documents share subtrees.
+                if (
+                    addressable
+                    and isinstance(value, typing.Dict)
+                    and type(old_value) is type(value)
+                    and self.diff_dict(old_value, value, path + [key], markers, nested)
+                ):
+                    changes.extend(nested)
+                    continue
+                if self.same(old_value, value):
+                    continue
+                if (
+                    addressable
+                    and isinstance(value, typing.List)
+                    and type(old_value) is type(value)
+                    and self.diff_list(old_value, value, path + [key], markers, nested)
+                ):
+                    changes.extend(nested)
+                    continue
+            values[key] = value
+
+        if values:
+            # Add updates dictionary, but it's not allowed on list elements,
+            # since they're addressed by marker.
+            if path and not path[-1].startswith("$"):
+                changes.append(self._action("add", path, markers, values))
+            else:
+                for key, value in values.items():
+                    # Actions with empty values don't pass validation.
+                    if not self._addressable(key) or not value:
+                        return False
+                    changes.append(
+                        self._action("replace", path + [key], markers, value)
+                    )
+        actions.extend(changes)
+        return True
+
+    def _identity_key(
+        self, old: typing.List[typing.Any], new: typing.List[typing.Any]
+    ) -> typing.Optional[str]:
+        """
+        Find key, that identifies dictionaries in both lists.
+        """
+        for key in self._list_keys:
+            valid = True
+            for items in (old, new):
+                seen = set()  # type: typing.Set[typing.Any]
+                for item in items:
+                    if not isinstance(item, typing.Dict) or not item.get(key):
+                        valid = False
+                        break
+                    try:
+                        if item[key] in seen:
+                            valid = False
+                            break
+                        seen.add(item[key])
+                    except TypeError:
+                        valid = False
+                        break
+                if not valid:
+                    break
+            if valid:
+                return key
+        return None
+
+    def diff_list(
+        self,
+        old: typing.List[typing.Any],
+        new: typing.List[typing.Any],
+        path: typing.List[str],
+        markers: typing.Dict[str, typing.Any],
+        actions: typing.List[typing.Dict[str, typing.Any]],
+    ) -> bool:
+        """
+        Add actions, that turn old list into new one.
+        :return: False when the whole list should be replaced
+        """
+        if not old:
+            return False
+        if not new:
+            # Empty list can't be value of action, so elements are deleted.
+            for index in range(len(old) - 1, -1, -1):
+                actions.append(
+                    self._action("delete", path + ["${}".format(index)], markers)
+                )
+            return True
+        key = self._identity_key(old, new)
+        if key is not None:
+            return self._diff_keyed_list(old, new, key, path, markers, actions)
+        if len(new) > len(old):
+            return False
+
+        changes = []  # type: typing.List[typing.Dict[str, typing.Any]]
+        for index in range(len(old) - 1, len(new) - 1, -1):
+            changes.append(
+                self._action("delete", path + ["${}".format(index)], markers)
+            )
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            if self.same(old_item, new_item):
+                continue
+            item_path = path + ["${}".format(index)]
+            if not self._diff_item(old_item, new_item, item_path, markers, changes):
+                return False
+        actions.extend(changes)
+        return True
+
+    def _diff_keyed_list(
+        self,
+        old: typing.List[typing.Dict[str, typing.Any]],
+        new: typing.List[typing.Dict[str, typing.Any]],
+        key: str,
+        path: typing.List[str],
+        markers: typing.Dict[str, typing.Any],
+        actions: typing.List[typing.Dict[str, typing.Any]],
+    ) -> bool:
+        old_items = {item[key]: item for item in old}
+        new_items = {item[key]: item for item in new}
+        kept_old = [item[key] for item in old if item[key] in new_items]
+        kept_new = [item[key] for item in new if item[key] in old_items]
+        # Elements can't be inserted or moved, only deleted and changed.
+        if len(kept_new) != len(new) or kept_old != kept_new:
+            return False
+
+        marker = "m{}".format(len(markers))
+        changes = []  # type: typing.List[typing.Dict[str, typing.Any]]
+        for identity, old_item in old_items.items():
+            item_markers = dict(markers)
+            item_markers[marker] = [{"key": key, "value": identity}]
+            item_path = path + ["$" + marker]
+            if identity not in new_items:
+                changes.append(self._action("delete", item_path, item_markers))
+            elif not self.same(old_item, new_items[identity]):
+                if not self._diff_item(
+                    old_item, new_items[identity], item_path, item_markers, changes
+                ):
+                    return False
+        actions.extend(changes)
+        return True
+
+    def _diff_item(
+        self,
+        old: typing.Any,
+        new: typing.Any,
+        path: typing.List[str],
+        markers: typing.Dict[str, typing.Any],
+        actions: typing.List[typing.Dict[str, typing.Any]],
+    ) -> bool:
+        """
+        Add actions, that turn list element into new one, replacing it when
+        it can't be changed in place.
+        """
+        nested = []  # type: typing.List[typing.Dict[str, typing.Any]]
+        if type(old) is type(new):
+            if isinstance(new, typing.Dict) and self.diff_dict(
+                old, new, path, markers, nested
+            ):
+                actions.extend(nested)
+                return True
+            if isinstance(new, typing.List) and self.diff_list(
+                old, new, path, markers, nested
+            ):
+                actions.extend(nested)
+                return True
+        if not new:
+            return False
+        actions.append(self._action("replace", path, markers, new))
+        return True
+
+
+def diff_to_actions(
+    old: typing.Dict[str, typing.Any],
+    new: typing.Dict[str, typing.Any],
+    list_keys: typing.Sequence[str] = ("name", "id", "key"),
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """
+    Create actions, that turn old document into new one.
+    Lists of dictionaries, identified by one of list_keys, are changed with
+    filter markers, other lists with index markers. Identical subtrees are
+    skipped by identity or builtin equality, so documents that share
+    unchanged subtrees (for example result of copy='path') are compared in
+    time proportional to the change. ValueError is raised, when top level key
+    gets empty scalar value, since it can't be set by valid action.
+    :param old: original document
+    :param new: changed document
+    :param list_keys: keys, that can identify dictionaries in lists
+    :return: list of actions with paths as lists of keys
+    """
+    if not isinstance(old, typing.Dict) or not isinstance(new, typing.Dict):
+        raise TypeError("old and new should be dictionaries")
+    actions = []  # type: typing.List[typing.Dict[str, typing.Any]]
+    differ = _Differ(list_keys)
+    if not differ.diff_dict(old, new, [], {}, actions):
+        raise ValueError("Difference can't be expressed by actions")
+    return actions
+
+
+_PatchOperation = typing.NamedTuple(
+    "_PatchOperation",
+    [
+        ("op", str),
+        ("path", typing.Tuple[PathToken, ...]),
+        ("source", typing.Tuple[PathToken, ...]),
+        ("value", typing.Any),
+        ("operation", typing.Dict[str, typing.Any]),
+    ],
+)
+
+_PATCH_OPS = frozenset(("add", "remove", "replace", "move", "copy", "test"))
+_POINTER_INDEX = re.compile(r"(?:0|[1-9][0-9]*)\Z")
+_POINTER_ESCAPE = re.compile(r"~(?![01])")
+# Token '-' of pointer selects position after the last element of array.
+_APPEND = Marker("-", None, None, False)
+
+
+def _pointer_token(
+    raw: str, operation: typing.Any, field: str, tokens: typing.Dict[str, PathToken]
+) -> PathToken:
+    """
+    Parse reference token of JSON Pointer and remember it in tokens. Tokens,
+    that can be array indexes, are parsed as index markers, that keep the
+    token as key for objects.
+    """
+    tokens[raw] = token = _parse_token(raw, operation, field)
+    return token
+
+
+def _parse_token(raw: str, operation: typing.Any, field: str) -> PathToken:
+    key = raw
+    if "~" in raw:
+        if _POINTER_ESCAPE.search(raw):
+            raise ActionValueError(
+                "invalid escape in {key}", operation, field, pointer=raw
+            )
+        key = raw.replace("~1", "/").replace("~0", "~")
+    if raw == "-":
+        return _APPEND
+    if _POINTER_INDEX.match(raw):
+        return Marker(raw, int(raw), None, False)
+    return key
+
+
+def _parse_pointer(
+    operation: typing.Dict[str, typing.Any],
+    field: str,
+    tokens: typing.Dict[str, PathToken],
+) -> typing.Tuple[PathToken, ...]:
+    """
+    Parse RFC 6901 JSON Pointer from field of operation into path tokens.
+    :param operation: JSON Patch operation
+    :param field: 'path' or 'from'
+    :param tokens: already parsed tokens, shared by operations of patch
+    :return: tuple of keys and markers, empty for the whole document
+    """
+    if field not in operation:
+        raise ActionKeyError("key {key} is required", operation, field)
+    pointer = operation[field]
+    if not isinstance(pointer, str):
+        raise ActionTypeError("{key} should be JSON Pointer string", operation, field)
+    if not pointer:
+        return ()
+    if pointer[0] != "/":
+        raise ActionValueError("{key} should start with /", operation, field)
+    return tuple(
+        [
+            (
+                tokens[raw]
+                if raw in tokens
+                else _pointer_token(raw, operation, field, tokens)
+            )
+            for raw in pointer[1:].split("/")
+        ]
+    )
+
+
+def _compile_operation(
+    operation: typing.Any, tokens: typing.Dict[str, PathToken]
+) -> _PatchOperation:
+    if not isinstance(operation, dict):
+        raise ActionTypeError("operation should be object", operation)
+    name = operation.get("op")
+    if name not in _PATCH_OPS:
+        if name is None:
+            raise ActionKeyError("key {key} is required", operation, "op")
+        raise ActionValueError("unknown operation {key}", operation, name)
+    path = _parse_pointer(operation, "path", tokens)
+    source = ()  # type: typing.Tuple[PathToken, ...]
+    if name in ("move", "copy"):
+        source = _parse_pointer(operation, "from", tokens)
+        if name == "move" and len(source) < len(path) and path[: len(source)] == source:
+            raise ActionValueError("path can't be inside {key}", operation, "from")
+    elif name != "remove" and "value" not in operation:
+        raise ActionKeyError(
+            "for {name} operation key {key} is required", operation, "value", name=name
+        )
+    return _PatchOperation(name, path, source, operation.get("value"), operation)
+
+
+def _pointer_child(
+    section: typing.Any, token: PathToken, operation: typing.Any
+) -> typing.Any:
+    if isinstance(section, dict):
+        key = token if isinstance(token, str) else token.key
+        try:
+            return section[key]
+        except KeyError:
+            raise ActionKeyError("no such key {key}", operation, key, section) from None
+    if isinstance(section, list):
+        if isinstance(token, str):
+            raise ActionTypeError(
+                "{key} is not index of list {section}", operation, token, section
+            )
+        if token.index is None or token.index >= len(section):
+            raise ActionIndexError("no element {key}", operation, token.key, section)
+        return section[token.index]
+    raise ActionTypeError(
+        "section {section} is not of type dict or list", operation, None, section
+    )
+
+
+def _pointer_section(
+    document: typing.Any,
+    path: typing.Sequence[PathToken],
+    operation: typing.Any,
+) -> typing.Any:
+    # Pointers are compiled into the same tokens as paths of actions, but
+    # they're walked here instead of _resolve_section: index-shaped tokens
+    # are keys of objects too, and arrays can't be addressed by filters.
+    for token in path:
+        document = _pointer_child(document, token, operation)
+    return document
+
+
+def _patch_index(
+    section: typing.List[typing.Any],
+    token: PathToken,
+    operation: typing.Any,
+    insert: bool = False,
+) -> int:
+    """
+    Get index of array element, selected by last token of path. Position after
+    the last element is valid only for insertion.
+    """
+    if isinstance(token, str):
+        raise ActionTypeError(
+            "{key} is not index of list {section}", operation, token, section
+        )
+    index = len(section) if token == _APPEND else token.index
+    if index is None or index > len(section) or (index == len(section) and not insert):
+        raise ActionIndexError("no element {key}", operation, token.key, section)
+    return index
+
+
+def _patch_add(
+    document: typing.Any,
+    operation: _PatchOperation,
+    value: typing.Any,
+    undo: typing.Optional[UndoLog],
+) -> typing.Any:
+    if not operation.path:
+        return value
+    target = operation.path[-1]
+    section = _pointer_section(document, operation.path[:-1], operation.operation)
+    if isinstance(section, dict):
+        key = target if isinstance(target, str) else target.key
+        if undo is not None:
+            undo.record_dict_set(section, key)
+        section[key] = value
+    elif isinstance(section, list):
+        index = _patch_index(section, target, operation.operation, insert=True)
+        if undo is not None:
+            undo.record_list_insert(section, index)
+        section.insert(index, value)
+    else:
+        raise ActionTypeError(
+            "section {section} is not of type dict or list",
+            operation.operation,
+            None,
+            section,
+        )
+    return document
+
+
+def _patch_remove(
+    document: typing.Any,
+    path: typing.Tuple[PathToken, ...],
+    operation: typing.Dict[str, typing.Any],
+    undo: typing.Optional[UndoLog],
+    replace: bool = False,
+    value: typing.Any = None,
+) -> typing.Any:
+    """
+    Remove or replace existing value on path.
+    :return: removed or replaced value
+    """
+    section = _pointer_section(document, path[:-1], operation)
+    target = path[-1]
+    if isinstance(section, dict):
+        key = target if isinstance(target, str) else target.key
+        if key not in section:
+            raise ActionKeyError("no such key {key}", operation, key, section)
+        removed = section[key]
+        if replace:
+            if undo is not None:
+                undo.record_dict_set(section, key)
+            section[key] = value
+        else:
+            if undo is not None:
+                undo.record_dict_del(section, key)
+            del section[key]
+        return removed
+    if isinstance(section, list):
+        index = _patch_index(section, target, operation)
+        removed = section[index]
+        if replace:
+            if undo is not None:
+                undo.record_list_set(section, index)
+            section[index] = value
+        else:
+            if undo is not None:
+                undo.record_list_del(section, index)
+            del section[index]
+        return removed
+    raise ActionTypeError(
+        "section {section} is not of type dict or list", operation, None, section
+    )
+
+
+def _json_equal(first: typing.Any, second: typing.Any) -> bool:
+    """
+    Compare JSON values like test operation of JSON Patch: numbers are equal
+    by value, but booleans are not numbers, objects are compared regardless
+    of order of keys.
+    """
+    if isinstance(first, bool) or isinstance(second, bool):
+        return type(first) is type(second) and first == second
+    if isinstance(first, (int, float)) and isinstance(second, (int, float)):
+        return first == second
+    if isinstance(first, dict):
+        return (
+            isinstance(second, dict)
+            and len(first) == len(second)
+            and all(
+                key in second and _json_equal(value, second[key])
+                for key, value in first.items()
+            )
+        )
+    if isinstance(first, list):
+        return (
+            isinstance(second, list)
+            and len(first) == len(second)
+            and all(_json_equal(*pair) for pair in zip(first, second))
+        )
+    return type(first) is type(second) and first == second
+
+
+def _apply_operation(
+    document: typing.Any, operation: _PatchOperation, undo: typing.Optional[UndoLog]
+) -> typing.Any:
+    """
+    Apply single compiled operation.
+    :return: document, or new document when operation replaces the whole one
+    """
+    name = operation.op
+    path = operation.path
+    if name == "add":
+        return _patch_add(document, operation, _copy_value(operation.value), undo)
+    if name == "replace" or name == "remove":
+        if not path:
+            if name == "replace":
+                return _copy_value(operation.value)
+            raise ActionValueError(
+                "the whole document can't be removed", operation.operation, "path"
+            )
+        _patch_remove(
+            document,
+            path,
+            operation.operation,
+            undo,
+            replace=name == "replace",
+            value=_copy_value(operation.value),
+        )
+        return document
+    if name == "test":
+        value = _pointer_section(document, path, operation.operation)
+        if not _json_equal(value, operation.value):
+            raise ActionValueError(
+                "test failed: {section:r} is not equal to {value:r}",
+                operation.operation,
+                "value",
+                value,
+                value=operation.value,
+            )
+        return document
+    if name == "copy":
+        value = _pointer_section(document, operation.source, operation.operation)
+        return _patch_add(document, operation, deepcopy(value), undo)
+    if operation.source == path:
+        _pointer_section(document, path, operation.operation)
+        return document
+    # Whole document is never removed here, as path can't be inside from.
+    value = _patch_remove(document, operation.source, operation.operation, undo)
+    return _patch_add(document, operation, value, undo)
+
+
+class JsonPatch(object):
+    """
+    Immutable RFC 6902 JSON Patch compiled by compile_patch, that can be
+    applied to many documents.
+    """
+
+    __slots__ = ("_operations",)
+
+    def __init__(self, operations: typing.Iterable[_PatchOperation]) -> None:
+        self._operations = tuple(operations)
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def __repr__(self) -> str:
+        return "JsonPatch({} operations)".format(len(self._operations))
+
+    def apply(
+        self,
+        document: typing.Any,
+        copy: bool = False,
+        transactional: bool = False,
+        undo: typing.Optional[UndoLog] = None,
+    ) -> typing.Any:
+        """
+        Apply operations of patch on document.
+        :param document: data that should be modified
+        :param copy: True to change deep copy of document. default is False
+        :param transactional: revert all changes of this run, when any
+            operation fails. default is False
+        :param undo: log, where inverse of each change is recorded
+        :return: document modified after applying operations, or new document,
+            when operation replaces the whole one
+        """
+        if copy is True:
+            document = deepcopy(document)
+        elif copy is not False:
+            raise ValueError("copy should be True or False")
+        if transactional and undo is None:
+            undo = UndoLog()
+        mark = len(undo) if undo is not None else 0
+        index = 0
+        try:
+            for index, operation in enumerate(self._operations):
+                document = _apply_operation(document, operation, undo)
+        except BaseException as error:
+            if isinstance(error, ActionError):
+                error.index = index
+            if transactional and undo is not None:
+                undo.revert(mark)
+            raise
+        return document
+
+
+def compile_patch(patch: typing.Iterable[typing.Dict[str, typing.Any]]) -> JsonPatch:
+    """
+    Validate RFC 6902 JSON Patch and compile it for the engine: JSON Pointers
+    of operations are parsed into the same path tokens, that compiled
+    actions use, without converting operations to actions.
+    :param patch: list of operations (add, remove, replace, move, copy, test)
+    :return: compiled patch
+    """
+    tokens = {}  # type: typing.Dict[str, PathToken]
+    operations = []
+    for index, operation in enumerate(patch):
+        try:
+            operations.append(_compile_operation(operation, tokens))
+        except ActionError as error:
+            error.index = index
+            raise
+    return JsonPatch(operations)
+
+
+def apply_patch(
+    source: typing.Union[typing.Dict[str, typing.Any], str],
+    patch: typing.Union[typing.List[typing.Dict[str, typing.Any]], JsonPatch, str],
+    copy: bool = False,
+    transactional: bool = False,
+) -> typing.Any:
+    """
+    Apply RFC 6902 JSON Patch on source.
+    :param source: dictionary or json/yaml file with data that should be modified
+    :param patch: list of operations, compiled patch or json/yaml file with
+        operations
+    :param copy: should source be copied before modification or changed in
+        place (works only when source is dictionary not file). default is False
+    :param transactional: revert all changes of source, when any operation
+        fails. default is False
+    :return: source modified after applying patch
+    """
+    if isinstance(patch, str):
+        patch = typing.cast(
+            typing.List[typing.Dict[str, typing.Any]], _read_file(patch)
+        )
+    if not isinstance(patch, JsonPatch):
+        patch = compile_patch(patch)
+    return patch.apply(_load_source(source, copy), transactional=transactional)
+
+
+def resolve_pointer(document: typing.Any, pointer: str) -> typing.Any:
+    """
+    Get value from document by RFC 6901 JSON Pointer.
+    :param document: data where to search
+    :param pointer: JSON Pointer, for example '/spec/containers/0/name'
+    :return: value on pointer
+    """
+    operation = {"path": pointer}
+    path = _parse_pointer(operation, "path", {})
+    return _pointer_section(document, path, operation)
+
+
+_VariantJob = typing.NamedTuple(
+    "_VariantJob",
+    [
+        ("base", int),
+        ("path_delim", str),
+        ("destination", typing.Optional[str]),
+        ("skip_unchanged", bool),
+    ],
+)
+
+# Base documents of running apply_variants calls. Forked workers inherit them
+# with memory of the parent, so they are never pickled.
+_variant_bases = {}  # type: typing.Dict[int, typing.Any]
+_variant_keys = itertools.count()
+
+
+def _apply_variant_chunk(
+    job: _VariantJob,
+    chunk: typing.List[typing.Tuple[int, typing.Any]],
+    copy: typing.Union[bool, str],
+    return_source: bool,
+) -> typing.List[BatchResult]:
+    """
+    Apply actions of variants to base document, shared with parent process.
+    :param job: key of base document and options of apply_variants
+    :param chunk: pairs of (index, (name, actions))
+    :param copy: not used, containers on paths of actions are always copied
+    :param return_source: not used, names of variants are always returned
+    :return: results for each variant with actions, that turn base into
+        variant, or name of the written file as result
+    """
+    base = _variant_bases[job.base]
+    results = []
+    for index, (name, actions) in chunk:
+        try:
+            variant = _load_plan(actions, job.path_delim).apply(base, copy="path")
+            if job.destination is None:
+                result = diff_to_actions(base, variant)  # type: typing.Any
+            else:
+                result = job.destination.format(name=name)
+                directory = os.path.dirname(result)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                write_file(variant, result, job.skip_unchanged)
+        except Exception as exc:
+            results.append(BatchResult(index, name, None, exc))
+        else:
+            results.append(BatchResult(index, name, result, None))
+    return results
+
+
+def apply_variants(
+    base: typing.Union[typing.Dict[str, typing.Any], str],
+    variants: typing.Union[
+        typing.Mapping[str, typing.Any], typing.Iterable[typing.Tuple[str, typing.Any]]
+    ],
+    destination: typing.Optional[str] = None,
+    path_delim: str = "/",
+    executor: str = "process",
+    max_workers: typing.Optional[int] = None,
+    ordered: bool = True,
+    skip_unchanged: bool = False,
+) -> typing.Iterator[BatchResult]:
+    """
+    Create variants of one base document, each with it's own actions. Base is
+    loaded once and is never copied or pickled: forked workers share it's
+    memory with parent process, and each variant copies only containers on
+    paths of it's actions. Workers send back only small results: actions,
+    that turn base into variant, or name of the file with variant.
+    :param base: dictionary or json/yaml file with base data
+    :param variants: mapping or iterable of pairs of variant name and it's
+        actions (list, compiled plan or json/yaml file with actions)
+    :param destination: file name template with {name} field, for example
+        'out/{name}.yaml', where variants are written. default is None
+        (actions, that turn base into variant, are returned instead)
+    :param path_delim: path delimiter. default is '/'
+    :param executor: 'process' for forked workers or 'thread'. Platforms
+        without fork always use threads. default is 'process'
+    :param max_workers: number of workers
+    :param ordered: should results be yielded in order of variants or as soon
+        as they are ready. default is True
+    :param skip_unchanged: don't rewrite files of variants, that already have
+        the same content. default is False
+    :return: iterator of BatchResult with variant name as source. Errors are
+        reported in BatchResult.error instead of being raised.
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError("executor should be 'thread' or 'process'")
+    if isinstance(variants, typing.Mapping):
+        variants = variants.items()
+    base_data = _load_source(base, False)
+    return _iter_variants(
+        base_data,
+        variants,
+        destination,
+        path_delim,
+        executor,
+        max_workers,
+        ordered,
+        skip_unchanged,
+    )
+
+
+def _iter_variants(
+    base: typing.Any,
+    variants: typing.Iterable[typing.Tuple[str, typing.Any]],
+    destination: typing.Optional[str],
+    path_delim: str,
+    executor: str,
+    max_workers: typing.Optional[int],
+    ordered: bool,
+    skip_unchanged: bool,
+) -> typing.Iterator[BatchResult]:
+    import gc
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    key = next(_variant_keys)
+    _variant_bases[key] = base
+    frozen = False
+    if executor == "process" and "fork" in multiprocessing.get_all_start_methods():
+        options = {}  # type: typing.Dict[str, typing.Any]
+        if sys.version_info >= (3, 7):
+            options["mp_context"] = multiprocessing.get_context("fork")
+        # Collector of workers doesn't touch frozen objects, so pages of base
+        # stay shared instead of being copied on write. Objects can be only
+        # unfrozen all together, so nothing is frozen, when caller froze some.
+        if hasattr(gc, "freeze") and not gc.get_freeze_count():
+            gc.freeze()
+            frozen = True
+        pool = ProcessPoolExecutor(max_workers, **options)  # type: Executor
+    else:
+        pool = ThreadPoolExecutor(max_workers)
+    job = _VariantJob(key, path_delim, destination, skip_unchanged)
+    try:
+        for result in _iter_batch(
+            job, variants, False, pool, max_workers, 1, ordered, _apply_variant_chunk
+        ):
+            yield result
+    finally:
+        pool.shutdown(wait=True)
+        del _variant_bases[key]
+        if frozen:
+            gc.unfreeze()
+
+
+def _running_loop() -> "asyncio.AbstractEventLoop":
+    """
+    Get loop of the running coroutine. asyncio.get_running_loop is added in
+    Python 3.7, before it get_event_loop returns the running loop too.
+    """
+    import asyncio
+
+    get_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+    return typing.cast("asyncio.AbstractEventLoop", get_loop())
+
+
+async def apply_actions_async(
+    source: typing.Union[typing.Dict[str, typing.Any], str],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    copy: typing.Union[bool, str] = False,
+    path_delim: str = "/",
+    executor: typing.Optional["Executor"] = None,
+) -> typing.Iterable[typing.Any]:
+    """
+    Apply actions on source without blocking event loop: reading and parsing
+    of files and applying of actions run in executor.
+    :param source: dictionary or json/yaml file with data that should be modified
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to source
+    :param copy: copy mode, same as for apply_actions. default is False
+    :param path_delim: path delimiter. default is '/'
+    :param executor: executor to run in. default is loop's default executor
+    :return: source modified after applying actions
+    """
+    loop = _running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(apply_actions, source, actions, copy, path_delim)
+    )
+
+
+class _AsyncBatch(object):
+    """
+    Async iterator over results of applying plan to sources, that keeps at
+    most `concurrency` sources in progress. Next source is taken only when
+    one of them is finished, so sources are consumed with backpressure.
+    """
+
+    def __init__(
+        self,
+        sources: typing.Union[
+            typing.Iterable[typing.Any], typing.AsyncIterable[typing.Any]
+        ],
+        actions: typing.Union[
+            typing.List[typing.Dict[str, typing.Any]], ActionPlan, str
+        ],
+        copy: typing.Union[bool, str],
+        path_delim: str,
+        concurrency: int,
+        executor: typing.Optional["Executor"],
+    ) -> None:
+        import asyncio
+
+        if isinstance(sources, typing.AsyncIterable):
+            self._async_sources = sources.__aiter__()  # type: typing.Any
+            self._sources = None  # type: typing.Optional[typing.Iterator[typing.Any]]
+        else:
+            self._async_sources = None
+            self._sources = iter(sources)
+        self._actions = actions
+        self._plan = None  # type: typing.Optional[ActionPlan]
+        self._copy = copy
+        self._path_delim = path_delim
+        self._executor = executor
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending = set()  # type: typing.Set[typing.Any]
+        self._ready = collections.deque()  # type: typing.Deque[BatchResult]
+        self._exhausted = False
+        self._index = 0
+
+    def __aiter__(self) -> "_AsyncBatch":
+        return self
+
+    async def __anext__(self) -> BatchResult:
+        import asyncio
+
+        loop = _running_loop()
+        if self._plan is None:
+            self._plan = await loop.run_in_executor(
+                self._executor, _load_plan, self._actions, self._path_delim
+            )
+        while not self._ready:
+            await self._fill()
+            if not self._pending:
+                raise StopAsyncIteration
+            done, self._pending = await asyncio.wait(
+                self._pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                self._ready.append(task.result())
+        return self._ready.popleft()
+
+    async def _next_source(self) -> typing.Tuple[bool, typing.Any]:
+        try:
+            if self._sources is not None:
+                return True, next(self._sources)
+            return True, await self._async_sources.__anext__()
+        except (StopIteration, StopAsyncIteration):
+            return False, None
+
+    async def _fill(self) -> None:
+        """
+        Start processing of next sources, while there are free slots.
+        """
+        import asyncio
+
+        while not self._exhausted and not self._semaphore.locked():
+            await self._semaphore.acquire()
+            found, source = await self._next_source()
+            if not found:
+                self._semaphore.release()
+                self._exhausted = True
+                break
+            self._pending.add(asyncio.ensure_future(self._process(self._index, source)))
+            self._index += 1
+
+    async def _process(self, index: int, source: typing.Any) -> BatchResult:
+        loop = _running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    _apply_plan, typing.cast(ActionPlan, self._plan), source, self._copy
+                ),
+            )
+        except Exception as exc:
+            return BatchResult(index, source, None, exc)
+        finally:
+            self._semaphore.release()
+        return BatchResult(index, source, result, None)
+
+    async def aclose(self) -> None:
+        """
+        Stop taking new sources and cancel processing of started ones.
+        """
+        self._exhausted = True
+        for task in self._pending:
+            task.cancel()
+        self._pending = set()
+
+
+def apply_actions_many_async(
+    sources: typing.Union[
+        typing.Iterable[typing.Any], typing.AsyncIterable[typing.Any]
+    ],
+    actions: typing.Union[typing.List[typing.Dict[str, typing.Any]], "ActionPlan", str],
+    copy: typing.Union[bool, str] = False,
+    path_delim: str = "/",
+    concurrency: int = 8,
+    executor: typing.Optional["Executor"] = None,
+) -> _AsyncBatch:
+    """
+    Apply the same actions on many sources without blocking event loop.
+    Actions are read and validated once, on the first iteration.
+    :param sources: iterable or async iterable of dictionaries or json/yaml files
+    :param actions: list, compiled plan or json/yaml file with actions, that should
+        be applied to each source
+    :param copy: copy mode for dictionary sources, same as for apply_actions.
+        default is False
+    :param path_delim: path delimiter. default is '/'
+    :param concurrency: maximal number of sources processed at the same time.
+        default is 8
+    :param executor: executor to run in. default is loop's default executor
+    :return: async iterator of BatchResult in order of completion. Errors are
+        reported in BatchResult.error instead of being raised.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency should be positive")
+    return _AsyncBatch(sources, actions, copy, path_delim, concurrency, executor)
+
+
+def _apply_file_chunk(
+    plan: ActionPlan,
+    chunk: typing.List[typing.Tuple[int, typing.Any]],
+    copy: typing.Union[bool, str],
+    return_source: bool,
+) -> typing.List[BatchResult]:
+    """
+    Apply plan to chunk of files and write results atomically.
+    :param plan: compiled actions
+    :param chunk: pairs of (index, (source, destination))
+    :param copy: not used, files are always loaded
+    :param return_source: not used, file names are always returned
+    :return: results for each file with (bytes read, bytes written) as result,
+        files, that already have the same content, are not written
+    """
+    results = []
+    for index, (source, destination) in chunk:
+        try:
+            size = os.path.getsize(source)
+            result = _apply_plan(plan, source, False)
+            directory = os.path.dirname(destination)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            atomic = _AtomicFile(destination, like=source, skip_same=True)
+            with atomic as f:
+                get_writer(destination)(result, f)
+            written = os.path.getsize(destination) if atomic.replaced else 0
+        except Exception as exc:
+            results.append(BatchResult(index, (source, destination), None, exc))
+        else:
+            results.append(
+                BatchResult(index, (source, destination), (size, written), None)
+            )
+    return results
+
+
+def _find_files(
+    inputs: typing.Iterable[str], output_dir: typing.Optional[str]
+) -> typing.Iterator[typing.Tuple[str, str]]:
+    """
+    Expand files, directories and glob patterns into files to process.
+    Directories are walked recursively for files with registered extensions.
+    :param inputs: files, directories or glob patterns
+    :param output_dir: directory for results, None to change files in place
+    :return: iterator of (source, destination) pairs
+    """
+    import glob
+
+    excluded = os.path.join(os.path.abspath(output_dir), "") if output_dir else None
+    seen = set()  # type: typing.Set[str]
+    for pattern in inputs:
+        root = pattern
+        while glob.has_magic(root):
+            root = os.path.dirname(root)
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+            if not os.path.isdir(pattern):
+                root = os.path.dirname(pattern)
+        for match in matches:
+            if os.path.isdir(match):
+                files = _walk_files(match)
+                if matches == [pattern]:
+                    root = match
+            else:
+                files = iter([match])
+            for file_name in files:
+                real = os.path.realpath(file_name)
+                if real in seen or (
+                    excluded is not None
+                    and os.path.abspath(file_name).startswith(excluded)
+                ):
+                    continue
+                seen.add(real)
+                if output_dir:
+                    destination = os.path.join(
+                        output_dir, os.path.relpath(file_name, root or ".")
+                    )
+                else:
+                    destination = file_name
+                yield file_name, destination
+
+
+def _walk_files(directory: str) -> typing.Iterator[str]:
+    for path, directories, files in os.walk(directory):
+        directories.sort()
+        for file_name in sorted(files):
+            if os.path.splitext(file_name)[-1].lower() in _EXTENSIONS:
+                yield os.path.join(path, file_name)
+
+
+def _read_ahead(
+    files: typing.Iterable[typing.Tuple[str, str]],
+) -> typing.Iterator[typing.Tuple[str, str]]:
+    """
+    Ask OS to start reading files, when they are queued for workers, so that
+    workers find them in page cache.
+    """
+    advise = getattr(os, "posix_fadvise", None)
+    for source, destination in files:
+        if advise is not None:
+            try:
+                fd = os.open(source, os.O_RDONLY)
+            except OSError:
+                pass
+            else:
+                try:
+                    advise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+        yield source, destination
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """
+    Entry point of json-modify command, that applies actions to files.
+    :param argv: command line arguments. default is sys.argv[1:]
+    :return: exit status: 0 on success, 1 when some files failed, 2 when
+        actions can't be loaded
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="json-modify", description="Apply actions to json/yaml files."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="files, directories or glob patterns to modify"
+    )
+    parser.add_argument(
+        "-a", "--actions", required=True, help="json/yaml file with actions"
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="directory to write results to, keeping paths relative to inputs. "
+        "default is to change files in place",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, help="number of workers. default is number of CPUs"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["process", "thread"],
+        default="process",
+        help="pool of workers. default is process",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1,
+        help="number of files sent to worker at once. default is 1",
+    )
+    parser.add_argument(
+        "-d", "--path-delim", default="/", help="path delimiter. default is /"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't print statistics"
+    )
+    args = parser.parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("jobs should be positive")
+    if args.chunk_size < 1:
+        parser.error("chunk-size should be positive")
+
+    try:
+        plan = _load_plan(args.actions, args.path_delim)
+    except Exception as exc:
+        print("json-modify: can't load actions: {}".format(exc), file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    files = failed = unchanged = read = written = 0
+    for result in _iter_batch(
+        plan,
+        _read_ahead(_find_files(args.inputs, args.output_dir)),
+        False,
+        args.executor,
+        args.jobs,
+        args.chunk_size,
+        False,
+        _apply_file_chunk,
+    ):
+        files += 1
+        if result.error is not None:
+            failed += 1
+            print(
+                "json-modify: {}: {}".format(result.source[0], result.error),
+                file=sys.stderr,
+            )
+        else:
+            read += result.result[0]
+            written += result.result[1]
+            unchanged += not result.result[1]
+    elapsed = time.perf_counter() - start
+
+    if not args.quiet:
+        rate = max(elapsed, 1e-9)
+        print(
+            "{} files ({} failed) in {:.2f}s: {:.1f} files/s, "
+            "{:.2f} MB/s read, {:.2f} MB/s written, {} unchanged".format(
+                files,
+                failed,
+                elapsed,
+                files / rate,
+                read / rate / 1e6,
+                written / rate / 1e6,
+                unchanged,
+            )
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
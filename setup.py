@@ -15,6 +15,7 @@ setup(
     version=metadata["version"],
     py_modules=["json_modify"],
     install_requires=["PyYAML>=5.3.1"],
+    entry_points={"console_scripts": ["json-modify=json_modify:main"]},
     author="Oleksii Petrenko",
     author_email="oleksiiypetrenko@gmail.com",
     description="Simple to use json/yaml modifier",
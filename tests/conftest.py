@@ -0,0 +1,61 @@
+import json
+import random
+from copy import deepcopy
+
+import pytest
+
+from json_modify import apply_actions
+
+SOURCE = {
+    "spec": {"name": "test", "old": 1, "labels": {"a": "b"}},
+    "items": [{"name": "a", "value": 1}, {"name": "b", "value": 2}],
+    "meta": {"owner": "x"},
+}
+
+KEYS = ["name", "old", "labels", "value", "owner"]
+
+
+def random_action(rand):
+    path = rand.choice(
+        ["spec", "spec/labels", "meta", "items/$0", "items/$1", "items/$item"]
+    )
+    action = {"action": rand.choice(["add", "replace", "delete", "rename"])}
+    if action["action"] == "add":
+        action["path"] = "spec" if "$" in path else path
+        action["value"] = {rand.choice(KEYS): rand.randint(1, 3)}
+    else:
+        if rand.random() > 0.2 or not path.startswith("items"):
+            path += "/" + rand.choice(KEYS)
+        action["path"] = path
+        if action["action"] == "replace":
+            action["value"] = rand.randint(1, 3)
+        elif action["action"] == "rename":
+            action["value"] = rand.choice(KEYS)
+    action["item"] = [{"key": "name", "value": rand.choice(["a", "b"])}]
+    return action
+
+
+def run_actions(apply, actions, error_index):
+    try:
+        return json.dumps(apply(deepcopy(SOURCE), actions))
+    except (KeyError, IndexError, TypeError) as error:
+        return getattr(error, "index", None) if error_index else None
+
+
+@pytest.fixture
+def assert_equivalent_to_apply_actions():
+    """
+    Check, that apply(source, actions) gives the same result as apply_actions
+    for lists of random actions.
+    :param error_index: compare index of failed action too
+    """
+
+    def check(apply, explain, error_index=True):
+        rand = random.Random(0)
+        for _ in range(500):
+            actions = [random_action(rand) for _ in range(rand.randint(2, 6))]
+            expected = run_actions(apply_actions, actions, error_index)
+            result = run_actions(apply, actions, error_index)
+            assert result == expected, explain(actions)
+
+    return check
@@ -0,0 +1,144 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import pytest
+
+from json_modify import (
+    ActionGroup,
+    analyze_actions,
+    apply_actions,
+    apply_actions_parallel,
+    Conflict,
+)
+
+SOURCE = {
+    "spec": {"name": "test", "labels": {"a": "b"}},
+    "items": [{"name": "a", "value": 1}, {"name": "b", "value": 2}],
+    "meta": {"owner": "x"},
+}
+
+ITEM = [{"key": "name", "value": "b"}]
+
+
+def test_analyze_actions_groups_disjoint_sections():
+    actions = [
+        {"action": "replace", "path": "items/$0/value", "value": 5},
+        {"action": "replace", "path": "spec/name", "value": "new"},
+        {"action": "replace", "path": "items/$1/value", "value": 6},
+        {"action": "add", "path": "spec", "value": {"replicas": 3}},
+        {"action": "delete", "path": "meta/owner"},
+    ]
+    analysis = analyze_actions(actions)
+    assert analysis.groups == [
+        ActionGroup(
+            (0,),
+            ["items", "$0"],
+            [{"action": "replace", "path": ["value"], "value": 5}],
+        ),
+        ActionGroup(
+            (1, 3),
+            ["spec"],
+            [
+                {"action": "replace", "path": ["name"], "value": "new"},
+                {"action": "add", "path": [], "value": {"replicas": 3}},
+            ],
+        ),
+        ActionGroup(
+            (2,),
+            ["items", "$1"],
+            [{"action": "replace", "path": ["value"], "value": 6}],
+        ),
+        ActionGroup((4,), ["meta"], [{"action": "delete", "path": ["owner"]}]),
+    ]
+    assert analysis.dependencies == [(1, 3)]
+    assert analysis.conflicts == []
+    assert analysis.explain().splitlines()[:2] == [
+        "group 0 on items/$0: action 0",
+        "group 1 on spec: actions 1, 3",
+    ]
+
+
+def test_analyze_actions_filter_reads_keys():
+    actions = [
+        {"action": "replace", "path": "items/$0/name", "value": "b"},
+        {"action": "replace", "path": "items/$item/value", "value": 5, "item": ITEM},
+        {"action": "replace", "path": "items/$1/other", "value": 6},
+    ]
+    analysis = analyze_actions(actions)
+    assert analysis.dependencies == [(0, 1)]
+    assert [group.indexes for group in analysis.groups] == [(0, 1, 2)]
+    assert [group.path for group in analysis.groups] == [["items"]]
+
+
+def test_analyze_actions_reports_conflicts():
+    actions = [
+        {"action": "delete", "path": "spec/labels"},
+        {"action": "replace", "path": "spec/labels/a", "value": "c"},
+        {"action": "delete", "path": "items/$0"},
+        {"action": "replace", "path": "items/$1/value", "value": 3},
+        {"action": "replace", "path": "meta/owner", "value": "y"},
+        {"action": "replace", "path": "meta/owner", "value": "z"},
+    ]
+    analysis = analyze_actions(actions)
+    assert analysis.conflicts == [
+        Conflict(
+            "deleted", 0, 1, "action 1 uses spec/labels after action 0 deletes it"
+        ),
+        Conflict(
+            "shifted",
+            2,
+            3,
+            "$1 of action 3 selects other element after action 2 deletes element "
+            "of items",
+        ),
+        Conflict(
+            "overwritten", 4, 5, "action 5 overwrites meta/owner written by action 4"
+        ),
+    ]
+    assert "deleted: action 1 uses spec/labels" in analysis.explain()
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_apply_actions_parallel(executor):
+    actions = [
+        {"action": "replace", "path": "items/$0/value", "value": 5},
+        {"action": "rename", "path": "spec/labels", "value": "tags"},
+        {"action": "replace", "path": "items/$1/value", "value": 6},
+        {"action": "delete", "path": "meta/owner"},
+    ]
+    source = deepcopy(SOURCE)
+    result = apply_actions_parallel(source, actions, executor=executor)
+    assert result is source
+    assert json.dumps(result) == json.dumps(apply_actions(deepcopy(SOURCE), actions))
+
+
+def test_apply_actions_parallel_raises_first_error():
+    actions = [
+        {"action": "replace", "path": "items/$0/value", "value": 5},
+        {"action": "delete", "path": "spec/missing/key"},
+        {"action": "delete", "path": "items/$1/missing"},
+    ]
+    source = deepcopy(SOURCE)
+    with pytest.raises(KeyError) as error:
+        apply_actions_parallel(source, analyze_actions(actions))
+    assert error.value.index == 1
+    assert source == SOURCE
+
+
+def test_apply_actions_parallel_is_equivalent_to_sequential(
+    assert_equivalent_to_apply_actions,
+):
+    def apply(source, actions):
+        original = deepcopy(source)
+        try:
+            return apply_actions_parallel(source, actions, executor=executor)
+        except (KeyError, IndexError, TypeError):
+            assert source == original
+            raise
+
+    def explain(actions):
+        return analyze_actions(actions).explain()
+
+    with ThreadPoolExecutor(2) as executor:
+        assert_equivalent_to_apply_actions(apply, explain)
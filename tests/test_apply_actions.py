@@ -8,9 +8,7 @@ from json_modify import apply_actions
 
 
 def test_apply_actions(mocker):
-    mocker.patch("json_modify.validate_action")
-    mocker.patch("json_modify.get_section")
-    mocker.patch("json_modify.apply_action")
+    mocker.patch("json_modify.compile_actions")
     mocker.patch("json_modify.get_reader")
     assert apply_actions({}, [{}]) == {}
 
@@ -60,9 +58,7 @@ def test_apply_actions_with_source_as_filename(mocker):
 
 
 def test_apply_actions_with_actions_as_filename(mocker):
-    mocker.patch("json_modify.validate_action")
-    mocker.patch("json_modify.get_section")
-    mocker.patch("json_modify.apply_action")
+    mocker.patch("json_modify.compile_actions")
     mocker.patch("json_modify.get_reader")
 
     basepath = os.path.dirname(__file__)
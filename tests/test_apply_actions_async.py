@@ -0,0 +1,112 @@
+import asyncio
+import os
+
+import pytest
+
+from json_modify import apply_actions_async, apply_actions_many_async
+
+ACTIONS = [{"action": "replace", "path": "spec/name", "value": "new"}]
+
+
+def get_sources(size=10):
+    return [{"spec": {"name": "test{}".format(i)}} for i in range(size)]
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def collect(batch):
+    results = []
+    async for result in batch:
+        results.append(result)
+    return results
+
+
+class AsyncSources(object):
+    def __init__(self, sources):
+        self.sources = iter(sources)
+        self.taken = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            source = next(self.sources)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.taken += 1
+        return source
+
+
+def test_apply_actions_async():
+    source = {"spec": {"name": "test"}}
+    result = run(apply_actions_async(source, ACTIONS))
+    assert result is source
+    assert result == {"spec": {"name": "new"}}
+
+
+def test_apply_actions_async_with_file():
+    basepath = os.path.dirname(__file__)
+    source = os.path.join(basepath, "data/test_data.json")
+    result = run(apply_actions_async(source, ACTIONS, copy=True))
+    assert result["spec"]["name"] == "new"
+
+
+def test_apply_actions_async_raises():
+    with pytest.raises(KeyError):
+        run(apply_actions_async({"other": {}}, ACTIONS))
+
+
+def test_apply_actions_many_async():
+    sources = get_sources()
+    results = run(collect(apply_actions_many_async(sources, ACTIONS, concurrency=3)))
+    assert sorted(result.index for result in results) == list(range(10))
+    assert all(result.error is None for result in results)
+    assert all(result.result == {"spec": {"name": "new"}} for result in results)
+
+
+def test_apply_actions_many_async_with_async_iterable():
+    sources = AsyncSources(get_sources(5))
+    results = run(collect(apply_actions_many_async(sources, ACTIONS, copy=True)))
+    assert sources.taken == 5
+    assert sorted(result.index for result in results) == list(range(5))
+
+
+def test_apply_actions_many_async_backpressure():
+    sources = AsyncSources(get_sources())
+
+    async def first(batch):
+        result = await batch.__anext__()
+        await batch.aclose()
+        return result
+
+    result = run(first(apply_actions_many_async(sources, ACTIONS, concurrency=2)))
+    assert result.error is None
+    assert sources.taken == 2
+
+
+def test_apply_actions_many_async_reports_errors_per_document():
+    sources = get_sources(3)
+    sources[1] = {"other": {}}
+    results = run(collect(apply_actions_many_async(sources, ACTIONS)))
+    errors = {result.index: result.error for result in results}
+    assert errors[0] is None
+    assert isinstance(errors[1], KeyError)
+    assert errors[2] is None
+
+
+def test_apply_actions_many_async_validates_actions():
+    batch = apply_actions_many_async(get_sources(), [{"action": "delete"}])
+    with pytest.raises(KeyError):
+        run(collect(batch))
+
+
+def test_apply_actions_many_async_raises_with_wrong_concurrency():
+    with pytest.raises(ValueError):
+        apply_actions_many_async(get_sources(), ACTIONS, concurrency=0)
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pytest
+
+from json_modify import ActionPlan, apply_actions_many, compile_actions
+
+ACTIONS = [{"action": "replace", "path": "spec/name", "value": "new"}]
+
+
+def get_sources(size=10):
+    return [{"spec": {"name": "test{}".format(i)}} for i in range(size)]
+
+
+def test_apply_actions_many_with_threads():
+    sources = get_sources()
+    results = list(apply_actions_many(sources, ACTIONS, chunk_size=3))
+    assert [result.index for result in results] == list(range(10))
+    assert all(result.error is None for result in results)
+    assert all(result.result == {"spec": {"name": "new"}} for result in results)
+    assert results[0].result is sources[0]
+
+
+def test_apply_actions_many_with_copy():
+    sources = get_sources(2)
+    results = list(apply_actions_many(sources, ACTIONS, copy=True))
+    assert sources == get_sources(2)
+    assert results[0].result == {"spec": {"name": "new"}}
+
+
+def test_apply_actions_many_with_processes():
+    results = list(
+        apply_actions_many(
+            get_sources(), ACTIONS, executor="process", max_workers=2, chunk_size=4
+        )
+    )
+    assert [result.index for result in results] == list(range(10))
+    assert all(result.result == {"spec": {"name": "new"}} for result in results)
+
+
+class PickledPlan(ActionPlan):
+    pickled = 0
+
+    def __reduce__(self):
+        PickledPlan.pickled += 1
+        return PickledPlan, (self.actions, self.path_delim)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="pool has no initializer")
+def test_apply_actions_many_sends_plan_to_processes_once():
+    plan = PickledPlan(compile_actions(ACTIONS).actions)
+    results = apply_actions_many(
+        get_sources(20), plan, executor="process", max_workers=2, chunk_size=1
+    )
+    assert all(result.result == {"spec": {"name": "new"}} for result in results)
+    # Forked workers inherit plan, spawned ones get it pickled once.
+    assert PickledPlan.pickled <= 2
+
+
+def test_apply_actions_many_unordered():
+    results = list(apply_actions_many(get_sources(), ACTIONS, ordered=False))
+    assert sorted(result.index for result in results) == list(range(10))
+
+
+def test_apply_actions_many_reports_errors_per_document():
+    sources = get_sources(3)
+    sources[1] = {"other": {}}
+    results = list(apply_actions_many(sources, ACTIONS))
+    assert results[0].error is None
+    assert isinstance(results[1].error, KeyError)
+    assert results[1].result is None
+    assert results[1].source is sources[1]
+    assert results[2].error is None
+
+
+def test_apply_actions_many_with_files():
+    basepath = os.path.dirname(__file__)
+    json_file = os.path.join(basepath, "data/test_data.json")
+    yaml_file = os.path.join(basepath, "data/test_data.yaml")
+    results = list(apply_actions_many([json_file, yaml_file], ACTIONS))
+    assert all(result.result["spec"]["name"] == "new" for result in results)
+
+
+def test_apply_actions_many_validates_actions_once():
+    with pytest.raises(KeyError):
+        apply_actions_many(get_sources(), [{"action": "delete"}])
+
+
+def test_apply_actions_many_raises_with_wrong_arguments():
+    with pytest.raises(ValueError):
+        apply_actions_many(get_sources(), ACTIONS, executor="fiber")
+    with pytest.raises(ValueError):
+        apply_actions_many(get_sources(), ACTIONS, chunk_size=0)
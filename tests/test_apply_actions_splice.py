@@ -0,0 +1,134 @@
+import json
+import os
+
+import pytest
+
+from json_modify import apply_actions, apply_actions_splice
+
+SOURCE = """{
+    "spec": {
+        "name":   "test",
+        "ratio": 1.50,
+        "containers": [
+            {"name": "app", "image": "app:1", "ports": [80,  443]},
+            {"name": "sidecar", "image": "proxy:1"}
+        ],
+        "labels": {"a": "\\u0041"}
+    },
+    "status": [ 1, 2, 3 ]
+}
+"""
+
+
+def write_source(tmpdir, content=SOURCE):
+    source = str(tmpdir.join("source.json"))
+    with open(source, "w") as f:
+        f.write(content)
+    return source
+
+
+def splice(tmpdir, actions, content=SOURCE):
+    source = write_source(tmpdir, content)
+    destination = str(tmpdir.join("result.json"))
+    apply_actions_splice(source, actions, destination)
+    with open(destination) as f:
+        return f.read()
+
+
+def test_apply_actions_splice_keeps_formatting(tmpdir):
+    actions = [{"action": "replace", "path": "spec/name", "value": "new"}]
+    assert splice(tmpdir, actions) == SOURCE.replace('"test"', '"new"')
+
+
+def test_apply_actions_splice_does_not_write_on_error(tmpdir):
+    actions = [{"action": "delete", "path": "spec/missing/$0"}]
+    with pytest.raises(KeyError):
+        splice(tmpdir, actions)
+    assert not os.path.exists(str(tmpdir.join("result.json")))
+
+
+def test_apply_actions_splice_with_filter(tmpdir):
+    actions = [
+        {
+            "action": "replace",
+            "path": "spec/containers/$app/image",
+            "value": "app:2",
+            "app": [{"key": "name", "value": "app"}],
+        }
+    ]
+    result = splice(tmpdir, actions)
+    assert result == SOURCE.replace('"app:1"', '"app:2"')
+
+
+def test_apply_actions_splice_matches_apply_actions(tmpdir):
+    actions = [
+        {"action": "add", "path": "spec", "value": {"replicas": 3}},
+        {"action": "delete", "path": "spec/containers/$1"},
+        {"action": "rename", "path": "spec/labels", "value": "tags"},
+        {"action": "delete", "path": "status/$0"},
+        {"action": "replace", "path": "status/$1", "value": {"phase": "ok"}},
+    ]
+    result = splice(tmpdir, actions)
+    expected = apply_actions(json.loads(SOURCE), actions)
+    assert json.loads(result) == expected
+    assert list(json.loads(result)["spec"]) == list(expected["spec"])
+    assert '"ratio": 1.50' in result
+    assert '"a": "\\u0041"' in result
+
+
+@pytest.mark.parametrize(
+    "actions",
+    [
+        [
+            {
+                "action": "replace",
+                "path": "items/$m/v",
+                "m": [{"key": "id", "value": {"a": 1}}],
+                "value": 9,
+            }
+        ],
+        [
+            {"action": "replace", "path": "items/$0/v", "value": 2},
+            {
+                "action": "replace",
+                "path": "items/$m/v",
+                "m": [{"key": "id", "value": {"a": 1}}, {"key": "t", "value": [1]}],
+                "value": 9,
+            },
+        ],
+    ],
+)
+def test_apply_actions_splice_with_container_filter_values(tmpdir, actions):
+    content = '{"items": [{"id": {"a": 1}, "t": [1], "v": 1}]}'
+    result = splice(tmpdir, actions, content)
+    assert json.loads(result) == apply_actions(json.loads(content), actions)
+    assert json.loads(result)["items"][0]["v"] == 9
+
+
+def test_apply_actions_splice_in_place(tmpdir):
+    source = write_source(tmpdir)
+    actions = [{"action": "delete", "path": "status"}]
+    apply_actions_splice(source, actions)
+    with open(source) as f:
+        assert json.load(f) == apply_actions(json.loads(SOURCE), actions)
+
+
+def test_apply_actions_splice_skips_deep_values(tmpdir):
+    deep = "[" * 100 + '"]}"' + "]" * 100
+    content = '{"deep": ' + deep + ', "name": "test"}'
+    actions = [{"action": "replace", "path": "name", "value": "new"}]
+    assert splice(tmpdir, actions, content) == content.replace("test", "new")
+
+
+def test_apply_actions_splice_raises_with_invalid_json(tmpdir):
+    actions = [{"action": "replace", "path": "name", "value": "new"}]
+    with pytest.raises(ValueError):
+        splice(tmpdir, actions, '{"name": "test", "value": [1, 2}')
+    with pytest.raises(TypeError):
+        splice(tmpdir, actions, '["name"]')
+
+
+def test_apply_actions_splice_raises_with_yaml(tmpdir):
+    source = str(tmpdir.join("source.yaml"))
+    with pytest.raises(ValueError):
+        apply_actions_splice(source, [])
@@ -0,0 +1,85 @@
+import gc
+import json
+
+import pytest
+import yaml
+
+from json_modify import apply_actions, apply_variants
+
+
+def get_base():
+    return {
+        "spec": {
+            "tenant": "base",
+            "containers": [{"name": "app", "image": "app:1"}],
+        }
+    }
+
+
+VARIANTS = {
+    "a": [{"action": "replace", "path": "spec/tenant", "value": "a"}],
+    "b": [
+        {
+            "action": "replace",
+            "path": "spec/containers/$app/image",
+            "value": "app:2",
+            "app": [{"key": "name", "value": "app"}],
+        }
+    ],
+}
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_apply_variants_returns_delta(executor):
+    base = get_base()
+    results = list(apply_variants(base, VARIANTS, executor=executor, max_workers=2))
+    assert [result.source for result in results] == ["a", "b"]
+    assert all(result.error is None for result in results)
+    assert base == get_base()
+    for result in results:
+        expected = apply_actions(get_base(), VARIANTS[result.source])
+        assert apply_actions(get_base(), result.result) == expected
+
+
+@pytest.mark.skipif(not hasattr(gc, "freeze"), reason="gc.freeze is missing")
+def test_apply_variants_keeps_objects_frozen_by_caller():
+    gc.freeze()
+    try:
+        frozen = gc.get_freeze_count()
+        results = list(apply_variants(get_base(), VARIANTS, executor="process"))
+        assert all(result.error is None for result in results)
+        assert gc.get_freeze_count() == frozen
+    finally:
+        gc.unfreeze()
+
+
+def test_apply_variants_writes_files(tmpdir):
+    base = str(tmpdir.join("base.json"))
+    with open(base, "w") as f:
+        json.dump(get_base(), f)
+    destination = str(tmpdir.join("out", "{name}.yaml"))
+    variants = [("a", VARIANTS["a"]), ("b", VARIANTS["b"])]
+    results = list(apply_variants(base, variants, destination, ordered=False))
+    assert sorted(result.result for result in results) == [
+        destination.format(name="a"),
+        destination.format(name="b"),
+    ]
+    with open(destination.format(name="a")) as f:
+        assert yaml.safe_load(f)["spec"]["tenant"] == "a"
+
+
+def test_apply_variants_reports_errors_per_variant():
+    variants = [
+        ("missing", [{"action": "delete", "path": "spec/missing"}]),
+        ("invalid", [{"action": "delete"}]),
+        ("a", VARIANTS["a"]),
+    ]
+    results = list(apply_variants(get_base(), variants, executor="thread"))
+    assert isinstance(results[0].error, KeyError)
+    assert isinstance(results[1].error, KeyError)
+    assert results[2].error is None
+
+
+def test_apply_variants_raises_with_wrong_executor():
+    with pytest.raises(ValueError):
+        apply_variants(get_base(), VARIANTS, executor="fork")
@@ -0,0 +1,58 @@
+import pytest
+from benchmarks.generate import ACTION_KINDS, generate_actions, generate_document
+from benchmarks.measure import compare, load_baseline, percentile, run_scenario
+
+from json_modify import apply_actions
+
+
+@pytest.mark.parametrize("kind", ACTION_KINDS)
+def test_generated_actions_apply_to_generated_document(kind):
+    shape = {"depth": 2, "fan_out": 2, "list_length": 10}
+    actions = generate_actions(30, mix={kind: 1.0}, **shape)
+    assert len(actions) == 30
+    apply_actions(generate_document(**shape), actions)
+
+
+def test_generate_actions_raises_with_unknown_kind():
+    with pytest.raises(ValueError):
+        generate_actions(1, mix={"move": 1.0})
+
+
+def test_percentile():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2], 50) == 1.5
+    assert percentile([1, 2], 100) == 2
+
+
+def test_compare():
+    baseline = {"s": {"p50_ms": 10.0, "documents_per_second": 100.0}}
+    results = {"s": {"p50_ms": 11.0, "documents_per_second": 95.0}}
+    assert compare(results, baseline, tolerance=0.2) == []
+
+    results = {"s": {"p50_ms": 13.0, "documents_per_second": 70.0}}
+    assert len(compare(results, baseline, tolerance=0.2)) == 2
+    assert compare({"other": {"p50_ms": 1.0}}, baseline) == []
+
+
+def test_load_baseline(tmpdir, capsys):
+    file_name = str(tmpdir.join("baseline.json"))
+    assert load_baseline(file_name) is None
+    assert "--save-baseline" in capsys.readouterr().err
+    with open(file_name, "w") as f:
+        f.write('{"s": {"p50_ms": 1.0}}')
+    assert load_baseline(file_name) == {"s": {"p50_ms": 1.0}}
+
+
+def test_run_scenario():
+    scenario = {
+        "name": "tiny",
+        "depth": 1,
+        "fan_out": 1,
+        "list_length": 5,
+        "actions": 5,
+        "mix": None,
+        "copy": "path",
+    }
+    metrics = run_scenario(scenario, repeat=2)
+    assert metrics["documents_per_second"] > 0
+    assert metrics["peak_memory_kb"] >= 0
@@ -0,0 +1,64 @@
+import json
+import os
+
+import yaml
+
+from json_modify import main
+
+ACTIONS = [{"action": "replace", "path": "spec/name", "value": "new"}]
+
+
+def make_tree(tmpdir):
+    root = tmpdir.mkdir("configs")
+    for name in ("a", "b"):
+        root.join(name + ".json").write(json.dumps({"spec": {"name": name}}))
+    root.mkdir("nested").join("c.yaml").write("spec:\n  name: c\n")
+    root.join("notes.txt").write("not a document")
+    actions = tmpdir.join("actions.json")
+    actions.write(json.dumps(ACTIONS))
+    return root, str(actions)
+
+
+def test_main_with_output_dir(tmpdir, capsys):
+    root, actions = make_tree(tmpdir)
+    output = tmpdir.join("output")
+    status = main(["-a", actions, "-o", str(output), "--executor", "thread", str(root)])
+    assert status == 0
+    assert json.loads(output.join("a.json").read()) == {"spec": {"name": "new"}}
+    assert yaml.safe_load(output.join("nested", "c.yaml").read()) == {
+        "spec": {"name": "new"}
+    }
+    assert not output.join("notes.txt").exists()
+    assert json.loads(root.join("a.json").read()) == {"spec": {"name": "a"}}
+    assert capsys.readouterr().out.startswith("3 files (0 failed)")
+
+
+def test_main_in_place_with_glob(tmpdir):
+    root, actions = make_tree(tmpdir)
+    pattern = os.path.join(str(root), "*.json")
+    assert (
+        main(["-q", "-a", actions, "-j", "2", pattern, str(root.join("a.json"))]) == 0
+    )
+    assert json.loads(root.join("b.json").read()) == {"spec": {"name": "new"}}
+    assert yaml.safe_load(root.join("nested", "c.yaml").read()) == {
+        "spec": {"name": "c"}
+    }
+    assert sorted(os.listdir(str(root))) == ["a.json", "b.json", "nested", "notes.txt"]
+
+
+def test_main_reports_failed_files(tmpdir, capsys):
+    root, actions = make_tree(tmpdir)
+    root.join("bad.json").write(json.dumps({"spec": 1}))
+    assert main(["-a", actions, str(root)]) == 1
+    captured = capsys.readouterr()
+    assert "bad.json" in captured.err
+    assert captured.out.startswith("4 files (1 failed)")
+    assert root.join("bad.json").read() == json.dumps({"spec": 1})
+
+
+def test_main_with_invalid_actions(tmpdir, capsys):
+    root, _ = make_tree(tmpdir)
+    actions = tmpdir.join("invalid.json")
+    actions.write(json.dumps([{"action": "replace"}]))
+    assert main(["-a", str(actions), str(root)]) == 2
+    assert "can't load actions" in capsys.readouterr().err
@@ -0,0 +1,100 @@
+from copy import deepcopy
+
+import pytest
+
+from json_modify import ActionPlan, Marker, apply_actions, compile_actions
+
+SOURCE = {
+    "spec": {
+        "name": "test",
+        "metadata": [
+            {"name": "test1", "value": "test1"},
+            {"name": "test2", "value": "test2"},
+        ],
+        "values": {"value1": 10, "value2": 20},
+    }
+}
+
+ACTIONS = [
+    {"action": "add", "path": "spec/values", "value": {"value3": 30}},
+    {
+        "action": "replace",
+        "path": "spec/metadata/$meta/value",
+        "meta": [{"key": "name", "value": "test2"}],
+        "value": "new",
+    },
+    {"action": "delete", "path": ["spec", "metadata", "$0"]},
+    {"action": "rename", "path": "spec/ name", "value": "title"},
+]
+
+EXPECTED = {
+    "spec": {
+        "title": "test",
+        "metadata": [{"name": "test2", "value": "new"}],
+        "values": {"value1": 10, "value2": 20, "value3": 30},
+    }
+}
+
+
+def test_compile_actions_splits_path():
+    plan = compile_actions(ACTIONS)
+    assert isinstance(plan, ActionPlan)
+    assert len(plan) == 4
+
+    add, replace, delete, rename = plan.actions
+    assert add.path == ("spec", "values")
+    assert add.target is None
+    assert replace.path == (
+        "spec",
+        "metadata",
+        Marker("$meta", None, (("name", "test2"),)),
+    )
+    assert replace.target == "value"
+    assert delete.path == ("spec", "metadata")
+    assert delete.target_marker == Marker("$0", 0, None)
+    assert rename.target == "name"
+
+
+def test_compile_actions_validates_actions():
+    with pytest.raises(KeyError):
+        compile_actions([{"action": "delete"}])
+
+
+def test_action_plan_apply():
+    plan = compile_actions(ACTIONS)
+    assert plan.apply(deepcopy(SOURCE)) == EXPECTED
+    assert plan.apply(deepcopy(SOURCE)) == EXPECTED
+
+
+def test_action_plan_is_immutable():
+    plan = compile_actions(ACTIONS)
+    with pytest.raises(AttributeError):
+        plan.actions = ()
+
+
+def test_action_plan_does_not_share_values():
+    plan = compile_actions([{"action": "replace", "path": "a", "value": {"b": 1}}])
+    first = plan.apply({"a": None})
+    first["a"]["b"] = 2
+    assert plan.apply({"a": None}) == {"a": {"b": 1}}
+
+
+def test_action_plan_raises_filter_not_found():
+    action = {
+        "action": "delete",
+        "path": "spec/metadata/$meta",
+        "meta": [{"key": "name", "value": "test3"}],
+    }
+    plan = compile_actions([action])
+    with pytest.raises(IndexError) as exc:
+        plan.apply(deepcopy(SOURCE))
+
+    expected = "Action {}: Value with {} filters not found".format(
+        action, action["meta"]
+    )
+    assert str(exc.value) == expected
+
+
+def test_apply_actions_accepts_plan():
+    plan = compile_actions(ACTIONS)
+    assert apply_actions(deepcopy(SOURCE), plan) == EXPECTED
@@ -0,0 +1,124 @@
+from copy import deepcopy
+
+import pytest
+
+from json_modify import apply_actions, diff_to_actions
+
+OLD = {
+    "spec": {
+        "name": "test",
+        "metadata": [
+            {"name": "test1", "value": "test1"},
+            {"name": "test2", "value": "test2"},
+            {"name": "test3", "value": "test3"},
+        ],
+        "values": {"value1": 10, "value2": 20},
+        "ports": [80, 443],
+    }
+}
+
+
+def check(old, new):
+    actions = diff_to_actions(old, new)
+    assert apply_actions(deepcopy(old), actions) == new
+    return actions
+
+
+def test_diff_to_actions_without_changes():
+    assert diff_to_actions(OLD, deepcopy(OLD)) == []
+
+
+def test_diff_to_actions_dict():
+    new = deepcopy(OLD)
+    new["spec"]["values"] = {"value1": 0, "value3": 30}
+    actions = check(OLD, new)
+    assert actions == [
+        {"action": "delete", "path": ["spec", "values", "value2"]},
+        {
+            "action": "add",
+            "path": ["spec", "values"],
+            "value": {"value1": 0, "value3": 30},
+        },
+    ]
+
+
+def test_diff_to_actions_keyed_list():
+    new = deepcopy(OLD)
+    del new["spec"]["metadata"][0]
+    new["spec"]["metadata"][1]["value"] = "new"
+    actions = check(OLD, new)
+    assert actions == [
+        {
+            "action": "delete",
+            "path": ["spec", "metadata", "$m0"],
+            "m0": [{"key": "name", "value": "test1"}],
+        },
+        {
+            "action": "replace",
+            "path": ["spec", "metadata", "$m0", "value"],
+            "m0": [{"key": "name", "value": "test3"}],
+            "value": "new",
+        },
+    ]
+
+
+def test_diff_to_actions_positional_list():
+    new = deepcopy(OLD)
+    new["spec"]["ports"] = [8080]
+    actions = check(OLD, new)
+    assert actions == [
+        {"action": "delete", "path": ["spec", "ports", "$1"]},
+        {"action": "replace", "path": ["spec", "ports", "$0"], "value": 8080},
+    ]
+
+
+def test_diff_to_actions_replaces_list_with_new_elements():
+    new = deepcopy(OLD)
+    new["spec"]["metadata"].insert(0, {"name": "test0", "value": "test0"})
+    new["spec"]["ports"].append(8080)
+    check(OLD, new)
+
+
+def test_diff_to_actions_skips_shared_subtrees():
+    new = dict(OLD)
+    new["status"] = {"ready": True}
+    assert check(OLD, new) == [
+        {"action": "replace", "path": ["status"], "value": {"ready": True}}
+    ]
+
+
+def test_diff_to_actions_with_special_keys():
+    old = {"spec": {"a/b": 1, "$c": 2, "d": {}}}
+    new = {"spec": {"a/b": 2, "$c": 2, "d": {"e": 1}}}
+    check(old, new)
+
+
+def test_diff_to_actions_keeps_types_of_equal_values():
+    old = {"spec": {"values": [1, {"a": 1}]}}
+    new = {"spec": {"values": [True, {"a": 1.0}]}}
+    assert check(old, new) == [
+        {"action": "replace", "path": ["spec", "values", "$0"], "value": True},
+        {"action": "replace", "path": ["spec", "values", "$1", "a"], "value": 1.0},
+    ]
+
+
+def test_diff_to_actions_with_empty_values():
+    old = {"a": {"b": 1}, "c": [1, 2], "d": {"e": 1, "f": [1]}}
+    new = {"a": {}, "c": [], "d": {"e": 0, "f": []}}
+    assert check(old, new) == [
+        {"action": "delete", "path": ["a", "b"]},
+        {"action": "delete", "path": ["c", "$1"]},
+        {"action": "delete", "path": ["c", "$0"]},
+        {"action": "delete", "path": ["d", "f", "$0"]},
+        {"action": "add", "path": ["d"], "value": {"e": 0}},
+    ]
+
+
+def test_diff_to_actions_raises_when_not_expressible():
+    with pytest.raises(ValueError):
+        diff_to_actions({"$a": 1}, {"$a": 2})
+    for value in (0, "", False, None):
+        with pytest.raises(ValueError):
+            diff_to_actions({"a": 1}, {"a": value})
+    with pytest.raises(TypeError):
+        diff_to_actions([], {})
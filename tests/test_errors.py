@@ -0,0 +1,81 @@
+import pickle
+
+import pytest
+
+from json_modify import (
+    ActionError,
+    ActionIndexError,
+    ActionKeyError,
+    ActionTypeError,
+    apply_action,
+    apply_actions,
+    compile_actions,
+)
+
+
+class Section(object):
+    rendered = 0
+
+    def __repr__(self):
+        Section.rendered += 1
+        return "Section()"
+
+
+def test_error_message_is_built_when_rendered():
+    section = Section()
+    action = {"action": "delete", "path": "name"}
+    with pytest.raises(ActionTypeError) as exc:
+        apply_action(section, action, "/")
+    assert Section.rendered == 0
+    assert exc.value.section is section
+    assert str(exc.value) == (
+        "Action {}: Section Section() is not of type dict or list".format(action)
+    )
+
+
+def test_error_message_is_truncated():
+    source = {"spec": list(range(100000))}
+    actions = [{"action": "replace", "path": "spec/name/value", "value": 1}]
+    with pytest.raises(TypeError) as exc:
+        apply_actions(source, actions)
+    message = str(exc.value)
+    assert len(message) < 500
+    assert "49, 50, 51, 5... is not dict" in message
+    assert exc.value.section is source["spec"]
+
+
+def test_error_fields():
+    actions = [
+        {"action": "replace", "path": "spec/name", "value": "new"},
+        {"action": "delete", "path": "spec/containers/$1"},
+    ]
+    with pytest.raises(ActionIndexError) as exc:
+        apply_actions({"spec": {"containers": [{}]}}, actions)
+    error = exc.value
+    assert isinstance(error, IndexError)
+    assert (error.index, error.path, error.key) == (1, "spec/containers/$1", "$1")
+
+
+def test_missing_key_error():
+    action = {"action": "replace", "path": "spec/name", "value": "new"}
+    with pytest.raises(ActionKeyError) as exc:
+        apply_actions({"other": {}}, [action])
+    assert exc.value.key == "spec"
+    assert str(exc.value) == repr("Action {}: no such key spec".format(action))
+
+
+def test_validation_error_index():
+    actions = [{"action": "delete", "path": "spec"}, {"action": "replace"}]
+    with pytest.raises(ActionKeyError) as exc:
+        compile_actions(actions)
+    assert (exc.value.index, exc.value.key) == (1, "path")
+
+
+def test_error_can_be_pickled_without_section():
+    source = {"spec": list(range(1000))}
+    with pytest.raises(ActionError) as exc:
+        apply_actions(source, [{"action": "delete", "path": "spec/name/value"}])
+    error = pickle.loads(pickle.dumps(exc.value))
+    assert isinstance(error, ActionTypeError)
+    assert str(error) == str(exc.value)
+    assert (error.index, error.key, error.section) == (0, "name", None)
@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+import json_modify
+from json_modify import apply_actions, FileCache, set_file_cache
+
+ACTIONS = [{"action": "replace", "path": "spec/name", "value": "new"}]
+
+
+@pytest.fixture
+def cache():
+    cache = FileCache()
+    previous = set_file_cache(cache)
+    yield cache
+    set_file_cache(previous)
+
+
+def write(tmpdir, name, data):
+    file_name = str(tmpdir.join(name))
+    with open(file_name, "w") as f:
+        json.dump(data, f)
+    return file_name
+
+
+def test_file_cache_hands_out_copies(tmpdir, cache):
+    source = write(tmpdir, "source.json", {"spec": {"name": "test", "list": [1]}})
+    actions = write(tmpdir, "actions.json", ACTIONS)
+    first = apply_actions(source, actions)
+    first["spec"]["list"].append(2)
+    second = apply_actions(source, actions)
+    assert second == {"spec": {"name": "new", "list": [1]}}
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+
+
+def test_file_cache_reads_changed_file(tmpdir, cache):
+    source = write(tmpdir, "source.json", {"spec": {"name": "test"}})
+    assert cache.document(source) == {"spec": {"name": "test"}}
+    write(tmpdir, "source.json", {"spec": {"name": "changed"}})
+    os.utime(source, (0, 0))
+    assert cache.document(source) == {"spec": {"name": "changed"}}
+    assert cache.info().currsize == 1
+
+
+def test_file_cache_with_hash(tmpdir):
+    cache = FileCache(hash=True)
+    source = write(tmpdir, "source.json", {"name": "a"})
+    stat = os.stat(source)
+    assert cache.document(source) == {"name": "a"}
+    write(tmpdir, "source.json", {"name": "b"})
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.document(source) == {"name": "b"}
+
+
+def test_file_cache_keeps_yaml_aliases(tmpdir):
+    source = str(tmpdir.join("source.yaml"))
+    with open(source, "w") as f:
+        f.write("base: &base {name: test}\nfirst: *base\n")
+    document = FileCache().document(source)
+    assert document["first"] is document["base"]
+
+
+def test_file_cache_with_empty_yaml_file(tmpdir, monkeypatch):
+    read = []
+    monkeypatch.setattr(json_modify, "_read_file", read.append)
+    cache = FileCache()
+    source = str(tmpdir.join("empty.yaml"))
+    open(source, "w").close()
+    assert cache.document(source) is None
+    assert cache.document(source) is None
+    assert read == [source]
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_file_cache_caches_compiled_plan(tmpdir):
+    cache = FileCache()
+    actions = write(tmpdir, "actions.json", ACTIONS)
+    assert cache.plan(actions) is cache.plan(actions)
+    assert cache.plan(actions, path_delim=".") is not cache.plan(actions)
+
+
+def test_file_cache_limits(tmpdir):
+    cache = FileCache(maxsize=2, maxbytes=100)
+    names = [write(tmpdir, "{}.json".format(i), {"i": i}) for i in range(3)]
+    for name in names:
+        cache.document(name)
+    assert cache.info().currsize == 2
+    big = write(tmpdir, "big.json", {"data": "x" * 100})
+    cache.document(big)
+    assert cache.info().currsize == 2
+    cache.document(names[2])
+    assert cache.info().hits == 1
+
+
+def test_file_cache_invalidate(tmpdir):
+    cache = FileCache()
+    first = write(tmpdir, "first.json", {"a": 1})
+    second = write(tmpdir, "second.json", ACTIONS)
+    cache.document(first)
+    cache.document(second)
+    cache.plan(second)
+    assert cache.invalidate(second) == 2
+    assert cache.invalidate() == 1
+    assert cache.info().currbytes == 0
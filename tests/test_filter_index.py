@@ -0,0 +1,93 @@
+import pytest
+
+from json_modify import compile_actions
+
+
+def get_items(size=10):
+    return {"items": [{"name": "n{}".format(i), "value": i} for i in range(size)]}
+
+
+def replace_value(name, value):
+    return {
+        "action": "replace",
+        "path": "items/$item/value",
+        "item": [{"key": "name", "value": name}],
+        "value": value,
+    }
+
+
+def delete_item(name):
+    return {
+        "action": "delete",
+        "path": "items/$item",
+        "item": [{"key": "name", "value": name}],
+    }
+
+
+def test_filter_index_reused_between_actions():
+    actions = [replace_value("n{}".format(i), i * 10 + 1) for i in range(10)]
+    result = compile_actions(actions).apply(get_items())
+    assert [item["value"] for item in result["items"]] == [
+        i * 10 + 1 for i in range(10)
+    ]
+
+
+def test_filter_index_returns_first_match():
+    source = {"items": [{"name": "a", "value": 1}, {"name": "a", "value": 2}]}
+    actions = [replace_value("a", 10), replace_value("a", 20)]
+    result = compile_actions(actions).apply(source)
+    assert result["items"] == [{"name": "a", "value": 20}, {"name": "a", "value": 2}]
+
+
+def test_filter_index_invalidated_by_delete():
+    actions = [
+        replace_value("n5", 50),
+        delete_item("n1"),
+        delete_item("n2"),
+        replace_value("n5", 55),
+        replace_value("n9", 99),
+    ]
+    result = compile_actions(actions).apply(get_items())
+    assert [item["name"] for item in result["items"]] == [
+        "n0",
+        "n3",
+        "n4",
+        "n5",
+        "n6",
+        "n7",
+        "n8",
+        "n9",
+    ]
+    assert result["items"][3]["value"] == 55
+    assert result["items"][7]["value"] == 99
+
+
+def test_filter_index_invalidated_by_change_of_filter_key():
+    rename = {
+        "action": "replace",
+        "path": "items/$item/name",
+        "item": [{"key": "name", "value": "n3"}],
+        "value": "n1",
+    }
+    actions = [replace_value("n1", 10), replace_value("n3", 30), rename]
+    actions += [replace_value("n1", 11)]
+    result = compile_actions(actions).apply(get_items())
+    assert result["items"][1] == {"name": "n1", "value": 11}
+    assert result["items"][3] == {"name": "n1", "value": 30}
+
+
+def test_filter_index_falls_back_for_elements_without_key():
+    source = {"items": [{"name": "a", "value": 1}, {"value": 2}, {"name": "b"}]}
+    actions = [replace_value("a", 10), replace_value("a", 20)]
+    compile_actions(actions).apply(source)
+    assert source["items"][0]["value"] == 20
+
+    actions = [replace_value("a", 10), replace_value("b", 20)]
+    with pytest.raises(KeyError):
+        compile_actions(actions).apply(source)
+
+
+def test_filter_index_raises_when_not_found():
+    actions = [replace_value("n1", 10), replace_value("missing", 20)]
+    with pytest.raises(IndexError):
+        compile_actions(actions).apply(get_items())
@@ -37,3 +37,4 @@ def test_find_section_in_list_value_for_marker_not_found():
         action, action["name"]
     )
     assert str(exc.value) == expected
+    assert exc.value.section is complex_section
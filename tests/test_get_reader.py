@@ -1,14 +1,80 @@
+import io
 import json
+import os
+import subprocess
+import sys
 
 import pytest
 import yaml
 
-from json_modify import get_reader
+import json_modify
+from json_modify import get_codec, get_reader, get_writer, register_codec, sniff_codec
+
+BASEPATH = os.path.dirname(__file__)
+
+
+@pytest.fixture
+def codecs(monkeypatch):
+    """Registry of codecs, that is restored after test."""
+    monkeypatch.setattr(json_modify, "_CODECS", dict(json_modify._CODECS))
+    monkeypatch.setattr(json_modify, "_EXTENSIONS", dict(json_modify._EXTENSIONS))
 
 
 def test_get_reader():
-    assert get_reader("test.yaml") == yaml.safe_load
-    assert get_reader("test.json") == json.load
+    json_file = os.path.join(BASEPATH, "data/test_data.json")
+    with open(json_file, "r") as f:
+        expected = json.load(f)
+    with open(json_file, "r") as f:
+        assert get_reader("test.json")(f) == expected
+
+    yaml_file = os.path.join(BASEPATH, "data/test_data.yaml")
+    with open(yaml_file, "r") as f:
+        expected = yaml.safe_load(f)
+    for file_name in ("test.yaml", "test.yml", "TEST.YAML"):
+        with open(yaml_file, "r") as f:
+            assert get_reader(file_name)(f) == expected
+
     with pytest.raises(ValueError) as exc:
         get_reader("test.cfg")
     assert str(exc.value) == "Cant determine reader for .cfg extension"
+
+
+def test_get_reader_falls_back_to_json_module():
+    assert get_reader("test.json")(io.StringIO('{"a": NaN}'))["a"] != 0
+
+
+def test_get_reader_sniffs_content(tmpdir):
+    json_file = tmpdir.join("data.cfg")
+    json_file.write('  {"a": 1}')
+    assert get_codec(str(json_file), sniff=True).name == "json"
+    with open(str(json_file), "r") as f:
+        assert get_reader(str(json_file), sniff=True)(f) == {"a": 1}
+
+    assert sniff_codec("[1, 2]") == "json"
+    assert sniff_codec("a: 1") == "yaml"
+
+
+def test_get_writer():
+    for file_name in ("test.json", "test.yaml"):
+        output = io.StringIO()
+        get_writer(file_name)({"a": [1, 2]}, output)
+        output.seek(0)
+        assert get_reader(file_name)(output) == {"a": [1, 2]}
+
+
+def test_register_codec(codecs):
+    register_codec("lines", [".lines"], lambda f: f.read().split(), lambda d, f: None)
+    assert get_reader("test.lines")(io.StringIO("a b")) == ["a", "b"]
+
+
+def test_register_codec_replaces_codec(codecs):
+    register_codec("text", [".json"], lambda f: f.read(), lambda d, f: None)
+    assert get_reader("test.json")(io.StringIO("[1]")) == "[1]"
+
+
+def test_import_does_not_import_yaml():
+    code = "import sys, json_modify; print('yaml' in sys.modules)"
+    output = subprocess.check_output(
+        [sys.executable, "-c", code], cwd=os.path.dirname(BASEPATH)
+    )
+    assert output.strip() == b"False"
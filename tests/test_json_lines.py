@@ -0,0 +1,97 @@
+import io
+import json
+
+import pytest
+
+from json_modify import (
+    apply_actions_jsonl,
+    apply_actions_stream,
+    read_json_lines,
+    write_json_lines,
+)
+
+ACTIONS = [{"action": "replace", "path": "spec/name", "value": "new"}]
+
+
+def get_lines():
+    records = [{"spec": {"name": "a"}}, {"other": 1}, {"spec": {"name": "b"}}]
+    return "\n".join(json.dumps(record) for record in records) + "\n\n"
+
+
+def test_read_json_lines():
+    records = list(read_json_lines(io.StringIO(get_lines())))
+    assert records == [{"spec": {"name": "a"}}, {"other": 1}, {"spec": {"name": "b"}}]
+
+
+def test_read_json_lines_raises_with_line_number():
+    with pytest.raises(ValueError) as exc:
+        list(read_json_lines(io.StringIO('{}\n{"a": \n')))
+    assert str(exc.value).startswith("Line 2:")
+
+
+def test_write_json_lines():
+    output = io.StringIO()
+    assert write_json_lines([{"a": 1}, [2]], output) == 2
+    assert output.getvalue() == '{"a": 1}\n[2]\n'
+
+
+def test_apply_actions_stream_is_lazy():
+    def records():
+        yield {"spec": {"name": "a"}}
+        raise AssertionError("stream should not be read ahead")
+
+    stream = apply_actions_stream(records(), ACTIONS)
+    assert next(stream) == {"spec": {"name": "new"}}
+
+
+def test_apply_actions_stream_on_error():
+    records = read_json_lines(io.StringIO(get_lines()))
+    with pytest.raises(KeyError):
+        list(apply_actions_stream(records, ACTIONS))
+
+    records = read_json_lines(io.StringIO(get_lines()))
+    assert len(list(apply_actions_stream(records, ACTIONS, on_error="skip"))) == 2
+
+    errors = []
+    records = read_json_lines(io.StringIO(get_lines()))
+    result = list(
+        apply_actions_stream(records, ACTIONS, on_error="collect", errors=errors)
+    )
+    assert len(result) == 2
+    assert len(errors) == 1
+    assert errors[0].index == 1
+    assert errors[0].source == {"other": 1}
+    assert isinstance(errors[0].error, KeyError)
+
+
+def test_apply_actions_stream_raises_with_wrong_on_error():
+    with pytest.raises(ValueError):
+        apply_actions_stream([], ACTIONS, on_error="ignore")
+    with pytest.raises(ValueError):
+        apply_actions_stream([], ACTIONS, on_error="collect")
+
+
+def test_apply_actions_jsonl(tmpdir):
+    source = tmpdir.join("source.jsonl")
+    source.write(get_lines())
+    destination = tmpdir.join("destination.jsonl")
+
+    count = apply_actions_jsonl(str(source), str(destination), ACTIONS, on_error="skip")
+    assert count == 2
+    assert destination.read() == (
+        '{"spec": {"name": "new"}}\n{"spec": {"name": "new"}}\n'
+    )
+
+
+def test_apply_actions_jsonl_does_not_truncate_with_invalid_actions(tmpdir):
+    destination = tmpdir.join("destination.jsonl")
+    destination.write("data")
+    with pytest.raises(KeyError):
+        apply_actions_jsonl(io.StringIO(get_lines()), str(destination), [{}])
+    assert destination.read() == "data"
+
+
+def test_apply_actions_stream_with_selector():
+    records = [{"spec": {"name": "a"}}, {"other": 1}, {"spec": {"name": "b"}}]
+    result = list(apply_actions_stream(records, ACTIONS, selector={"spec/name": "b"}))
+    assert result == [{"spec": {"name": "a"}}, {"other": 1}, {"spec": {"name": "new"}}]
@@ -0,0 +1,183 @@
+import json
+
+import pytest
+
+from json_modify import (
+    ActionValueError,
+    apply_patch,
+    compile_patch,
+    resolve_pointer,
+    UndoLog,
+)
+
+# Examples from appendix A of RFC 6902.
+RFC_EXAMPLES = [
+    (
+        {"foo": "bar"},
+        [{"op": "add", "path": "/baz", "value": "qux"}],
+        {"baz": "qux", "foo": "bar"},
+    ),
+    (
+        {"foo": ["bar", "baz"]},
+        [{"op": "add", "path": "/foo/1", "value": "qux"}],
+        {"foo": ["bar", "qux", "baz"]},
+    ),
+    ({"baz": "qux", "foo": "bar"}, [{"op": "remove", "path": "/baz"}], {"foo": "bar"}),
+    (
+        {"foo": ["bar", "qux", "baz"]},
+        [{"op": "remove", "path": "/foo/1"}],
+        {"foo": ["bar", "baz"]},
+    ),
+    (
+        {"baz": "qux", "foo": "bar"},
+        [{"op": "replace", "path": "/baz", "value": "boo"}],
+        {"baz": "boo", "foo": "bar"},
+    ),
+    (
+        {"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": "grault"}},
+        [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+        {"foo": {"bar": "baz"}, "qux": {"corge": "grault", "thud": "fred"}},
+    ),
+    (
+        {"foo": ["all", "grass", "cows", "eat"]},
+        [{"op": "move", "from": "/foo/1", "path": "/foo/3"}],
+        {"foo": ["all", "cows", "eat", "grass"]},
+    ),
+    (
+        {"foo": "bar"},
+        [{"op": "add", "path": "/child", "value": {"grandchild": {}}}],
+        {"foo": "bar", "child": {"grandchild": {}}},
+    ),
+    (
+        {"foo": ["bar"]},
+        [{"op": "add", "path": "/foo/-", "value": ["abc", "def"]}],
+        {"foo": ["bar", ["abc", "def"]]},
+    ),
+    (
+        {"/": 9, "~1": 10},
+        [
+            {"op": "test", "path": "/~01", "value": 10},
+            {"op": "copy", "from": "/~1", "path": "/0"},
+        ],
+        {"/": 9, "~1": 10, "0": 9},
+    ),
+    (
+        {"baz": "qux", "foo": ["a", 2, "c"]},
+        [
+            {"op": "test", "path": "/baz", "value": "qux"},
+            {"op": "test", "path": "/foo/1", "value": 2.0},
+        ],
+        {"baz": "qux", "foo": ["a", 2, "c"]},
+    ),
+    ({"foo": "bar"}, [{"op": "replace", "path": "", "value": {"baz": 1}}], {"baz": 1}),
+    ({"foo": {"bar": 1}}, [{"op": "move", "from": "/foo", "path": ""}], {"bar": 1}),
+]
+
+
+@pytest.mark.parametrize("source, patch, expected", RFC_EXAMPLES)
+def test_apply_patch(source, patch, expected):
+    assert apply_patch(source, patch) == expected
+
+
+@pytest.mark.parametrize(
+    "source, patch, error",
+    [
+        ({"baz": "qux"}, [{"op": "test", "path": "/baz", "value": "bar"}], ValueError),
+        ({"foo": 1}, [{"op": "test", "path": "/foo", "value": True}], ValueError),
+        ({"foo": "bar"}, [{"op": "add", "path": "/baz/bat", "value": "qux"}], KeyError),
+        ({"foo": [1]}, [{"op": "add", "path": "/foo/2", "value": 2}], IndexError),
+        ({"foo": [1]}, [{"op": "remove", "path": "/foo/-"}], IndexError),
+        ({"foo": [1]}, [{"op": "replace", "path": "/foo/bar", "value": 2}], TypeError),
+        ({"foo": 1}, [{"op": "replace", "path": "/bar", "value": 2}], KeyError),
+        ({"foo": 1}, [{"op": "remove", "path": ""}], ValueError),
+    ],
+)
+def test_apply_patch_raises(source, patch, error):
+    with pytest.raises(error):
+        apply_patch(source, patch)
+
+
+def test_apply_patch_test_failure_message():
+    with pytest.raises(ValueError) as raised:
+        apply_patch({"a": "2"}, [{"op": "test", "path": "/a", "value": 2}])
+    assert str(raised.value).endswith("test failed: '2' is not equal to 2")
+    assert raised.value.index == 0
+
+
+@pytest.mark.parametrize(
+    "operation, error",
+    [
+        ({"path": "/a"}, KeyError),
+        ({"op": "jump", "path": "/a"}, ValueError),
+        ({"op": "add", "path": "/a"}, KeyError),
+        ({"op": "remove", "path": "a"}, ValueError),
+        ({"op": "remove", "path": "/a~2"}, ValueError),
+        ({"op": "remove", "path": 1}, TypeError),
+        ({"op": "copy", "path": "/a"}, KeyError),
+        ({"op": "move", "from": "/a", "path": "/a/b"}, ValueError),
+    ],
+)
+def test_compile_patch_validates_operations(operation, error):
+    with pytest.raises(error) as raised:
+        compile_patch([{"op": "test", "path": "", "value": 1}, operation])
+    assert raised.value.index == 1
+
+
+def test_compiled_patch_is_reusable():
+    patch = compile_patch(
+        [
+            {"op": "add", "path": "/items/0", "value": {"name": "a"}},
+            {"op": "replace", "path": "/items/1/name", "value": "b"},
+        ]
+    )
+    for _ in range(2):
+        document = patch.apply({"items": [{"name": "x"}]})
+        assert document == {"items": [{"name": "a"}, {"name": "b"}]}
+    assert repr(patch) == "JsonPatch(2 operations)"
+
+
+def test_apply_patch_numeric_keys_of_objects():
+    patch = [{"op": "replace", "path": "/map/10", "value": 2}]
+    assert apply_patch({"map": {"10": 1}}, patch) == {"map": {"10": 2}}
+
+
+def test_apply_patch_transactional():
+    source = {"items": [1, 2], "name": "a"}
+    patch = [
+        {"op": "add", "path": "/items/0", "value": 0},
+        {"op": "move", "from": "/name", "path": "/title"},
+        {"op": "test", "path": "/items/0", "value": 1},
+    ]
+    with pytest.raises(ActionValueError) as error:
+        apply_patch(source, patch, transactional=True)
+    assert error.value.index == 2
+    assert json.dumps(source) == json.dumps({"items": [1, 2], "name": "a"})
+
+
+def test_apply_patch_with_undo():
+    source = {"items": [1, 2]}
+    undo = UndoLog()
+    compile_patch([{"op": "add", "path": "/items/-", "value": 3}]).apply(
+        source, undo=undo
+    )
+    assert source == {"items": [1, 2, 3]}
+    undo.revert()
+    assert source == {"items": [1, 2]}
+
+
+def test_apply_patch_with_files(tmpdir):
+    source = tmpdir.join("source.json")
+    source.write(json.dumps({"spec": {"name": "test"}}))
+    patch = tmpdir.join("patch.yaml")
+    patch.write("- op: replace\n  path: /spec/name\n  value: new\n")
+    assert apply_patch(str(source), str(patch)) == {"spec": {"name": "new"}}
+
+
+def test_resolve_pointer():
+    document = {"a/b": {"m~n": [0, {"": 1}]}}
+    assert resolve_pointer(document, "/a~1b/m~0n/1/") == 1
+    assert resolve_pointer(document, "") is document
+    with pytest.raises(TypeError):
+        resolve_pointer(document, "/a~1b/m~0n/01")
+    with pytest.raises(IndexError):
+        resolve_pointer(document, "/a~1b/m~0n/-")
@@ -0,0 +1,68 @@
+from copy import deepcopy
+import pstats
+
+from json_modify import apply_actions, compile_actions, Observer, StatsObserver
+
+SOURCE = {"items": [{"name": "n{}".format(i), "value": i} for i in range(10)]}
+
+ACTIONS = [
+    {
+        "action": "replace",
+        "path": "items/$item/value",
+        "item": [{"key": "name", "value": "n4"}],
+        "value": 40,
+    },
+    {"action": "delete", "path": "items/$0"},
+]
+
+
+class RecordingObserver(Observer):
+    def __init__(self):
+        self.events = []
+
+    def on_validate(self, index, duration, scanned):
+        self.events.append(("validate", index, scanned))
+
+    def on_marker_scan(self, index, duration, scanned):
+        self.events.append(("marker_scan", index, scanned))
+
+    def on_mutate(self, index, duration, scanned):
+        self.events.append(("mutate", index, scanned))
+
+
+def test_observer_hooks():
+    observer = RecordingObserver()
+    apply_actions(deepcopy(SOURCE), ACTIONS, observer=observer)
+    assert observer.events == [
+        ("validate", 0, 0),
+        ("validate", 1, 0),
+        ("marker_scan", 0, 5),
+        ("mutate", 0, 0),
+        ("marker_scan", 1, 0),
+        ("mutate", 1, 0),
+    ]
+
+
+def test_stats_observer():
+    observer = StatsObserver()
+    plan = compile_actions(ACTIONS, observer=observer)
+    plan.apply(deepcopy(SOURCE), observer=observer)
+
+    stats = observer.as_dict()
+    assert stats["phases"]["validate"]["count"] == 2
+    assert stats["phases"]["resolve"]["count"] == 2
+    assert stats["phases"]["resolve"]["scanned"] == 5
+    assert stats["phases"]["marker_scan"]["count"] == 2
+    assert stats["actions"][0]["marker_scan"]["scanned"] == 5
+    assert stats["actions"][1]["mutate"]["seconds"] >= 0
+
+    text = observer.to_prometheus()
+    assert "# TYPE json_modify_phase_calls_total counter" in text
+    assert 'json_modify_phase_scanned_total{phase="resolve"} 5' in text
+    assert 'json_modify_action_calls_total{action="1",phase="mutate"} 1' in text
+
+
+def test_apply_actions_profile(tmpdir):
+    file_name = str(tmpdir.join("apply.pstats"))
+    apply_actions(deepcopy(SOURCE), ACTIONS, profile=file_name)
+    assert pstats.Stats(file_name).total_calls > 0
@@ -0,0 +1,136 @@
+import json
+from copy import deepcopy
+
+import pytest
+
+from json_modify import apply_actions, optimize_actions, OptimizationStep
+
+SOURCE = {
+    "spec": {"name": "test", "old": 1, "labels": {"a": "b"}},
+    "items": [{"name": "a", "value": 1}, {"name": "b", "value": 2}],
+}
+
+
+def assert_equivalent(source, actions, optimized):
+    expected = apply_actions(deepcopy(source), actions)
+    result = apply_actions(deepcopy(source), optimized.actions)
+    assert json.dumps(result) == json.dumps(expected)
+
+
+def test_optimize_actions_fuses_adds():
+    actions = [
+        {"action": "add", "path": "spec", "value": {"a": 1}},
+        {"action": "replace", "path": "items/$0/value", "value": 5},
+        {"action": "add", "path": "spec", "value": {"b": 2, "a": 3}},
+        {"action": "replace", "path": "spec/c", "value": 4},
+    ]
+    optimized = optimize_actions(actions)
+    assert optimized.actions[0] == {
+        "action": "add",
+        "path": "spec",
+        "value": {"a": 3, "b": 2, "c": 4},
+    }
+    assert optimized.origins == [(0, 2, 3), (1,)]
+    assert_equivalent(deepcopy(SOURCE), actions, optimized)
+
+
+def test_optimize_actions_removes_overwritten_replaces():
+    actions = [
+        {"action": "replace", "path": "spec/name", "value": "first"},
+        {"action": "replace", "path": "items/$1", "value": {"name": "c"}},
+        {"action": "replace", "path": "spec/name", "value": "second"},
+        {"action": "replace", "path": "items/$1", "value": {"name": "d"}},
+    ]
+    optimized = optimize_actions(actions)
+    assert [action["value"] for action in optimized.actions] == [
+        "second",
+        {"name": "d"},
+    ]
+    assert [step.kind for step in optimized.steps] == ["removed", "removed"]
+    assert_equivalent(deepcopy(SOURCE), actions, optimized)
+
+
+def test_optimize_actions_keeps_replace_used_by_filter():
+    actions = [
+        {
+            "action": "replace",
+            "path": "items/$item/name",
+            "value": "b",
+            "item": [{"key": "name", "value": "a"}],
+        },
+        {
+            "action": "replace",
+            "path": "items/$item/name",
+            "value": "c",
+            "item": [{"key": "name", "value": "a"}],
+        },
+    ]
+    assert optimize_actions(actions).actions == actions
+
+
+def test_optimize_actions_keeps_actions_on_overlapping_paths():
+    actions = [
+        {"action": "replace", "path": "spec/name", "value": "first"},
+        {"action": "replace", "path": "spec", "value": {"name": "other"}},
+        {"action": "replace", "path": "spec/name", "value": "second"},
+    ]
+    assert optimize_actions(actions).steps == []
+
+
+def test_optimize_actions_collapses_rename_chain():
+    actions = [
+        {"action": "delete", "path": "spec/old"},
+        {"action": "rename", "path": "spec/name", "value": "old"},
+        {"action": "rename", "path": "spec/old", "value": "title"},
+    ]
+    optimized = optimize_actions(actions)
+    assert optimized.actions[1] == {
+        "action": "rename",
+        "path": "spec/name",
+        "value": "title",
+    }
+    assert optimized.steps == [
+        OptimizationStep("collapsed", (1, 2), "rename spec/name to title")
+    ]
+    assert_equivalent(deepcopy(SOURCE), actions, optimized)
+
+
+def test_optimize_actions_keeps_rename_chain_over_existing_key():
+    actions = [
+        {"action": "rename", "path": "spec/name", "value": "old"},
+        {"action": "rename", "path": "spec/old", "value": "title"},
+    ]
+    optimized = optimize_actions(actions)
+    assert optimized.actions == actions
+    assert optimized.explain() == "no actions were fused or removed"
+    assert_equivalent(deepcopy(SOURCE), actions, optimized)
+
+
+def test_optimize_actions_explain():
+    actions = [
+        {"action": "add", "path": ["spec", "labels"], "value": {"c": "d"}},
+        {"action": "add", "path": ["spec", "labels"], "value": {"e": "f"}},
+        {"action": "replace", "path": "spec/name", "value": "first"},
+        {"action": "replace", "path": "spec/name", "value": "second"},
+    ]
+    assert optimize_actions(actions).explain() == (
+        "fused actions 0, 1: add spec/labels\n"
+        "removed action 2: replace spec/name is overwritten by action 3"
+    )
+
+
+def test_optimize_actions_validates_actions():
+    with pytest.raises(KeyError):
+        optimize_actions([{"action": "delete"}])
+
+
+def test_optimize_actions_is_equivalent_to_original(
+    assert_equivalent_to_apply_actions,
+):
+    def apply(source, actions):
+        return apply_actions(source, optimize_actions(actions).actions)
+
+    def explain(actions):
+        return optimize_actions(actions).explain()
+
+    assert_equivalent_to_apply_actions(apply, explain, error_index=False)
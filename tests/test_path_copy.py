@@ -0,0 +1,68 @@
+from copy import deepcopy
+
+import pytest
+
+from json_modify import apply_actions, compile_actions
+
+SOURCE = {
+    "spec": {
+        "name": "test",
+        "metadata": [
+            {"name": "test1", "value": "test1"},
+            {"name": "test2", "value": "test2"},
+        ],
+        "values": {"value1": 10, "value2": 20},
+    },
+    "status": {"ready": True},
+}
+
+ACTIONS = [
+    {
+        "action": "replace",
+        "path": "spec/metadata/$meta/value",
+        "meta": [{"key": "name", "value": "test2"}],
+        "value": "new",
+    },
+    {"action": "add", "path": "spec/values", "value": {"value3": 30}},
+    {"action": "rename", "path": "spec/name", "value": "title"},
+]
+
+
+def test_path_copy_does_not_change_source():
+    source = deepcopy(SOURCE)
+    result = apply_actions(source, ACTIONS, copy="path")
+    assert source == SOURCE
+    assert result == apply_actions(deepcopy(SOURCE), ACTIONS)
+
+
+def test_path_copy_shares_untouched_subtrees():
+    source = deepcopy(SOURCE)
+    result = apply_actions(source, ACTIONS, copy="path")
+    assert result is not source
+    assert result["spec"] is not source["spec"]
+    assert result["status"] is source["status"]
+    assert result["spec"]["metadata"][0] is source["spec"]["metadata"][0]
+    assert result["spec"]["metadata"][1] is not source["spec"]["metadata"][1]
+
+
+def test_path_copy_with_delete_from_list():
+    source = deepcopy(SOURCE)
+    plan = compile_actions([{"action": "delete", "path": "spec/metadata/$0"}])
+    result = plan.apply(source, copy="path")
+    assert len(result["spec"]["metadata"]) == 1
+    assert source == SOURCE
+
+
+def test_path_copy_keeps_source_on_error():
+    source = deepcopy(SOURCE)
+    actions = ACTIONS + [{"action": "delete", "path": "spec/missing"}]
+    with pytest.raises(KeyError):
+        apply_actions(source, actions, copy="path")
+    assert source == SOURCE
+
+
+def test_apply_raises_with_wrong_copy():
+    with pytest.raises(ValueError):
+        apply_actions({}, [], copy="shallow")
+    with pytest.raises(ValueError):
+        compile_actions([]).apply({}, copy="shallow")
@@ -0,0 +1,110 @@
+from copy import deepcopy
+
+from json_modify import ApplyStats, compile_actions
+
+SOURCE = {
+    "spec": {
+        "containers": [
+            {"name": "app", "env": {"A": "1"}, "ports": [80]},
+            {"name": "sidecar", "env": {"B": "2"}, "ports": [81]},
+        ]
+    }
+}
+
+
+def replace_env(key, value, name="app"):
+    return {
+        "action": "replace",
+        "path": "spec/containers/$app/env/{}".format(key),
+        "app": [{"key": "name", "value": name}],
+        "value": value,
+    }
+
+
+def test_shared_prefix_is_resolved_once():
+    stats = ApplyStats()
+    plan = compile_actions([replace_env("A", "a"), replace_env("B", "b")])
+    result = plan.apply(deepcopy(SOURCE), stats=stats)
+    assert result["spec"]["containers"][0]["env"] == {"A": "a", "B": "b"}
+    assert stats.actions == 2
+    assert stats.steps == 4
+    assert stats.steps_saved == 4
+    assert stats.as_dict() == {
+        "actions": 2,
+        "steps": 4,
+        "steps_saved": 4,
+        "section_hits": 1,
+        "section_misses": 1,
+    }
+    assert stats.section_hit_rate == 0.5
+
+
+def test_shared_prefix_after_delete_from_list():
+    actions = [
+        replace_env("A", "a", "sidecar"),
+        {"action": "delete", "path": "spec/containers/$0"},
+        {"action": "replace", "path": "spec/containers/$0/name", "value": "new"},
+    ]
+    result = compile_actions(actions).apply(deepcopy(SOURCE))
+    assert result["spec"]["containers"] == [
+        {"name": "new", "env": {"B": "2", "A": "a"}, "ports": [81]}
+    ]
+
+
+def test_shared_prefix_after_change_of_filter_key():
+    actions = [
+        replace_env("A", "a"),
+        {
+            "action": "replace",
+            "path": "spec/containers/$0/name",
+            "value": "sidecar",
+        },
+        replace_env("C", "c", "sidecar"),
+    ]
+    result = compile_actions(actions).apply(deepcopy(SOURCE))
+    assert result["spec"]["containers"][0]["env"] == {"A": "a", "C": "c"}
+    assert result["spec"]["containers"][1]["env"] == {"B": "2"}
+
+
+def test_shared_prefix_after_replace_of_ancestor():
+    actions = [
+        replace_env("A", "a"),
+        {"action": "replace", "path": "spec/containers/$0/env", "value": {"X": 1}},
+        replace_env("A", "b"),
+    ]
+    stats = ApplyStats()
+    result = compile_actions(actions).apply(deepcopy(SOURCE), stats=stats)
+    assert result["spec"]["containers"][0]["env"] == {"X": 1, "A": "b"}
+    assert stats.steps_saved == 5
+
+
+def test_shared_prefix_kept_after_change_of_other_element():
+    actions = [
+        {"action": "replace", "path": "spec/containers/$1/env/A", "value": "a"},
+        {"action": "replace", "path": "spec/containers/$0", "value": {"name": "new"}},
+        {"action": "replace", "path": "spec/containers/$1/env/B", "value": "b"},
+    ]
+    stats = ApplyStats()
+    result = compile_actions(actions).apply(deepcopy(SOURCE), stats=stats)
+    assert result["spec"]["containers"][0] == {"name": "new"}
+    assert result["spec"]["containers"][1]["env"] == {"A": "a", "B": "b"}
+    assert (stats.section_hits, stats.section_misses) == (2, 1)
+    assert stats.steps_saved == 6
+
+
+def test_shared_prefix_after_replace_of_earlier_element():
+    actions = [
+        replace_env("A", "a", "sidecar"),
+        {
+            "action": "replace",
+            "path": "spec/containers/$0",
+            "value": {"name": "sidecar", "env": {}},
+        },
+        replace_env("B", "b", "sidecar"),
+    ]
+    stats = ApplyStats()
+    result = compile_actions(actions).apply(deepcopy(SOURCE), stats=stats)
+    assert result["spec"]["containers"][0]["env"] == {"B": "b"}
+    assert result["spec"]["containers"][1]["env"] == {"B": "2", "A": "a"}
+    assert (stats.section_hits, stats.section_misses) == (2, 1)
+    assert stats.steps_saved == 4
@@ -0,0 +1,100 @@
+from copy import deepcopy
+
+import pytest
+
+from json_modify import apply_action, apply_actions, compile_actions, UndoLog
+
+SOURCE = {
+    "spec": {
+        "name": "test",
+        "metadata": [
+            {"name": "test1", "value": "test1"},
+            {"name": "test2", "value": "test2"},
+        ],
+        "values": {"value1": 10, "value2": 20, "value3": 30},
+    }
+}
+
+ACTIONS = [
+    {"action": "add", "path": "spec/values", "value": {"value1": 1, "value4": 40}},
+    {"action": "delete", "path": "spec/values/value2"},
+    {"action": "rename", "path": "spec/values/value1", "value": "value3"},
+    {"action": "replace", "path": "spec/metadata/$0", "value": {"name": "new"}},
+    {"action": "delete", "path": "spec/metadata/$1"},
+    {"action": "replace", "path": "spec/name", "value": "new"},
+]
+
+
+def assert_same_order(first, second):
+    assert first == second
+    if isinstance(first, dict):
+        assert list(first) == list(second)
+        for key in first:
+            assert_same_order(first[key], second[key])
+    elif isinstance(first, list):
+        for first_item, second_item in zip(first, second):
+            assert_same_order(first_item, second_item)
+
+
+def test_undo_log_reverts_changes():
+    source = deepcopy(SOURCE)
+    undo = UndoLog()
+    apply_actions(source, ACTIONS, undo=undo)
+    assert source != SOURCE
+    assert len(undo) == 8
+
+    undo.revert()
+    assert len(undo) == 0
+    assert_same_order(source, SOURCE)
+
+
+def test_undo_log_revert_to_mark():
+    source = deepcopy(SOURCE)
+    undo = UndoLog()
+    plan = compile_actions(ACTIONS[:2])
+    plan.apply(source, undo=undo)
+    expected = deepcopy(source)
+    mark = len(undo)
+
+    compile_actions(ACTIONS[2:]).apply(source, undo=undo)
+    undo.revert(mark)
+    assert_same_order(source, expected)
+
+
+def test_transactional_apply_reverts_on_error():
+    source = deepcopy(SOURCE)
+    actions = ACTIONS + [{"action": "delete", "path": "spec/missing"}]
+    with pytest.raises(KeyError):
+        apply_actions(source, actions, transactional=True)
+    assert_same_order(source, SOURCE)
+
+
+def test_transactional_apply_keeps_previous_entries():
+    source = deepcopy(SOURCE)
+    undo = UndoLog()
+    compile_actions(ACTIONS[:1]).apply(source, undo=undo)
+    with pytest.raises(KeyError):
+        plan = compile_actions([ACTIONS[1], {"action": "delete", "path": "a"}])
+        plan.apply(source, transactional=True, undo=undo)
+    assert len(undo) == 2
+    assert source["spec"]["values"]["value2"] == 20
+
+
+def test_apply_action_with_undo_log():
+    section = {"a": 1, "b": 2}
+    undo = UndoLog()
+    apply_action(section, {"action": "rename", "path": "a", "value": "c"}, "/", undo)
+    assert list(section) == ["b", "c"]
+    undo.revert()
+    assert list(section.items()) == [("a", 1), ("b", 2)]
+
+
+@pytest.mark.parametrize("keys", [["a"], ["c"], ["e"], ["b", "d"], ["e", "a", "c"]])
+def test_undo_log_restores_deleted_key_positions(keys):
+    section = {"a": 1, "b": 2, "c": 3, "d": 4, "e": 5}
+    undo = UndoLog()
+    for key in keys:
+        undo.record_dict_del(section, key)
+        del section[key]
+    undo.revert()
+    assert list(section.items()) == [("a", 1), ("b", 2), ("c", 3), ("d", 4), ("e", 5)]
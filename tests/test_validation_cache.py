@@ -0,0 +1,93 @@
+from copy import deepcopy
+
+import pytest
+
+from json_modify import (
+    apply_actions,
+    clear_validation_cache,
+    compile_actions,
+    set_validation_cache_size,
+    validation_cache_info,
+)
+
+SOURCE = {"spec": {"name": "test"}}
+
+ACTIONS = [
+    {"action": "replace", "path": "spec/name", "value": "new"},
+    {"action": "add", "path": "spec", "value": {"a": 1, "b": 2}},
+]
+
+
+@pytest.fixture(autouse=True)
+def validation_cache():
+    clear_validation_cache()
+    yield
+    set_validation_cache_size(1024)
+    clear_validation_cache()
+
+
+def test_validated_actions_are_cached():
+    apply_actions(deepcopy(SOURCE), ACTIONS)
+    apply_actions(deepcopy(SOURCE), [dict(action) for action in ACTIONS])
+    info = validation_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+
+
+def test_changed_action_is_validated_again():
+    actions = [{"action": "replace", "path": "spec/name", "value": "new"}]
+    apply_actions(deepcopy(SOURCE), actions)
+    actions[0]["value"] = None
+    with pytest.raises(KeyError):
+        apply_actions(deepcopy(SOURCE), actions)
+    assert validation_cache_info().hits == 0
+
+
+def test_actions_with_different_values_share_cache_entry():
+    apply_actions(
+        deepcopy(SOURCE), [{"action": "add", "path": "spec", "value": {"a": 1}}]
+    )
+    actions = [{"action": "add", "path": "spec", "value": {"b": [2]}}]
+    assert apply_actions(deepcopy(SOURCE), actions) == {
+        "spec": {"name": "test", "b": [2]}
+    }
+    assert validation_cache_info().hits == 1
+    with pytest.raises(TypeError):
+        apply_actions(
+            deepcopy(SOURCE), [{"action": "add", "path": "spec", "value": [1]}]
+        )
+
+
+def test_cache_keeps_order_of_keys():
+    first = [{"action": "add", "path": "spec", "value": {"a": 1, "b": 2}}]
+    second = [{"action": "add", "path": "spec", "value": {"b": 2, "a": 1}}]
+    assert list(apply_actions(deepcopy(SOURCE), first)["spec"]) == ["name", "a", "b"]
+    assert list(apply_actions(deepcopy(SOURCE), second)["spec"]) == ["name", "b", "a"]
+
+
+def test_cache_size():
+    set_validation_cache_size(1)
+    apply_actions(deepcopy(SOURCE), ACTIONS)
+    apply_actions(deepcopy(SOURCE), ACTIONS)
+    info = validation_cache_info()
+    assert (info.hits, info.maxsize, info.currsize) == (0, 1, 1)
+    set_validation_cache_size(0)
+    apply_actions(deepcopy(SOURCE), ACTIONS)
+    assert validation_cache_info().currsize == 0
+
+
+def test_apply_actions_without_validation():
+    actions = [{"action": "replace", "path": "spec/name", "value": 0}]
+    with pytest.raises(KeyError):
+        apply_actions(deepcopy(SOURCE), actions)
+    result = apply_actions(deepcopy(SOURCE), actions, validate=False)
+    assert result == {"spec": {"name": 0}}
+    assert validation_cache_info().currsize == 0
+
+
+def test_compile_actions_without_validation_copies_values():
+    actions = [{"action": "add", "path": "spec", "value": {"a": [1]}}]
+    plan = compile_actions(actions, validate=False)
+    result = plan.apply(deepcopy(SOURCE))
+    result["spec"]["a"].append(2)
+    assert actions[0]["value"] == {"a": [1]}
+    assert plan.apply(deepcopy(SOURCE)) == {"spec": {"name": "test", "a": [1]}}
@@ -0,0 +1,121 @@
+from copy import deepcopy
+
+import pytest
+
+from json_modify import (
+    apply_actions,
+    compile_action,
+    Marker,
+    StatsObserver,
+    UndoLog,
+    validate_action,
+)
+
+SOURCE = {
+    "spec": {
+        "groups": [
+            {
+                "name": "a",
+                "items": [
+                    {"kind": "x", "value": 1},
+                    {"kind": "y", "value": 2},
+                    {"kind": "x", "value": 3},
+                ],
+            },
+            {"name": "b", "items": [{"kind": "x", "value": 4}, {"other": 5}]},
+        ],
+        "matrix": [[1], [2]],
+    }
+}
+
+X_FILTER = [{"key": "kind", "value": "x"}]
+
+
+def test_compile_wildcard_markers():
+    action = compile_action(
+        {
+            "action": "replace",
+            "path": "spec/groups/$*/items/$*x",
+            "value": 1,
+            "x": X_FILTER,
+        },
+        "/",
+    )
+    assert action.path[2] == Marker("$*", None, (), True)
+    assert action.target_marker == Marker("$*x", None, (("kind", "x"),), True)
+
+
+def test_validate_wildcard_markers():
+    validate_action({"action": "delete", "path": "spec/groups/$*"}, "/")
+    with pytest.raises(KeyError):
+        validate_action({"action": "delete", "path": "spec/groups/$*x"}, "/")
+
+
+def test_wildcard_marker_in_path():
+    actions = [
+        {
+            "action": "replace",
+            "path": "spec/groups/$*/items/$*x/value",
+            "value": 10,
+            "x": X_FILTER,
+        }
+    ]
+    result = apply_actions(deepcopy(SOURCE), actions)
+    values = [
+        [item.get("value") for item in group["items"]]
+        for group in result["spec"]["groups"]
+    ]
+    assert values == [[10, 2, 10], [10, None]]
+
+
+def test_wildcard_marker_as_target():
+    actions = [
+        {"action": "delete", "path": "spec/groups/$*/items/$*x", "x": X_FILTER},
+        {"action": "replace", "path": "spec/groups/$*", "value": {"name": "c"}},
+    ]
+    undo = UndoLog()
+    source = deepcopy(SOURCE)
+    result = apply_actions(source, actions, undo=undo)
+    assert result["spec"]["groups"] == [{"name": "c"}, {"name": "c"}]
+    undo.revert()
+    assert source == SOURCE
+
+
+def test_wildcard_delete_keeps_other_elements():
+    actions = [{"action": "delete", "path": "spec/groups/$0/items/$*x", "x": X_FILTER}]
+    result = apply_actions(deepcopy(SOURCE), actions)
+    assert result["spec"]["groups"][0]["items"] == [{"kind": "y", "value": 2}]
+
+
+def test_wildcard_marker_without_matches():
+    actions = [
+        {
+            "action": "replace",
+            "path": "spec/groups/$*y/name",
+            "value": "new",
+            "y": [{"key": "name", "value": "missing"}],
+        }
+    ]
+    assert apply_actions(deepcopy(SOURCE), actions) == SOURCE
+
+
+def test_wildcard_marker_with_path_copy():
+    source = deepcopy(SOURCE)
+    actions = [{"action": "replace", "path": "spec/groups/$*/name", "value": "new"}]
+    result = apply_actions(source, actions, copy="path")
+    assert source == SOURCE
+    assert [group["name"] for group in result["spec"]["groups"]] == ["new", "new"]
+
+
+def test_wildcard_marker_scans_list_once():
+    observer = StatsObserver()
+    actions = [
+        {
+            "action": "replace",
+            "path": "spec/groups/$0/items/$*x/value",
+            "value": 10,
+            "x": X_FILTER,
+        }
+    ]
+    apply_actions(deepcopy(SOURCE), actions, observer=observer)
+    assert observer.as_dict()["phases"]["marker_scan"]["scanned"] == 3
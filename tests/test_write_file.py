@@ -0,0 +1,118 @@
+import io
+import json
+import os
+
+import pytest
+import yaml
+
+from json_modify import apply_actions, get_writer, write_file
+
+ACTIONS = [{"action": "replace", "path": "spec/name", "value": "new"}]
+
+
+def write_source(tmpdir, name="source.json", data=None):
+    source = str(tmpdir.join(name))
+    with open(source, "w") as f:
+        json.dump(data or {"spec": {"name": "test"}}, f)
+    os.utime(source, (0, 0))
+    return source
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        [],
+        {"items": [{"name": str(i), "values": [i, i / 3, None]} for i in range(100)]},
+        {"wide": {str(i): [[i]] * 70 for i in range(100)}},
+        {1: "a", "b": [float("nan"), True, "ф"]},
+        [[{"a": " "}] * 70] * 70,
+    ],
+)
+def test_json_writer_matches_json_dump(data):
+    output = io.StringIO()
+    get_writer("result.json")(data, output)
+    assert output.getvalue() == json.dumps(data)
+
+
+def test_write_file(tmpdir):
+    file_name = str(tmpdir.join("result.yaml"))
+    assert write_file({"spec": {"name": "test"}}, file_name) is True
+    with open(file_name) as f:
+        assert yaml.safe_load(f) == {"spec": {"name": "test"}}
+    assert tmpdir.listdir() == [tmpdir.join("result.yaml")]
+
+
+def test_write_file_skips_unchanged(tmpdir):
+    source = write_source(tmpdir)
+    assert write_file({"spec": {"name": "test"}}, source, skip_unchanged=True) is False
+    assert os.path.getmtime(source) == 0
+    assert write_file({"spec": {"name": "new"}}, source, skip_unchanged=True) is True
+    assert os.path.getmtime(source) != 0
+    assert len(tmpdir.listdir()) == 1
+
+
+def test_write_file_keeps_yaml_key_order(tmpdir):
+    source = str(tmpdir.join("source.yaml"))
+    with open(source, "w") as f:
+        f.write("spec:\n  name: test\n  image: app\nkind: Pod\n")
+    os.utime(source, (0, 0))
+    data = {"spec": {"name": "test", "image": "app"}, "kind": "Pod"}
+    assert write_file(data, source, skip_unchanged=True) is False
+    assert os.path.getmtime(source) == 0
+    apply_actions(source, ACTIONS, destination=True)
+    with open(source) as f:
+        assert f.read() == "spec:\n  name: new\n  image: app\nkind: Pod\n"
+
+
+def test_write_file_keeps_file_on_error(tmpdir):
+    source = write_source(tmpdir)
+    with pytest.raises(TypeError):
+        write_file({"spec": object()}, source)
+    with open(source) as f:
+        assert json.load(f) == {"spec": {"name": "test"}}
+    assert len(tmpdir.listdir()) == 1
+
+
+def test_apply_actions_with_destination(tmpdir):
+    source = write_source(tmpdir)
+    destination = str(tmpdir.join("result.yaml"))
+    result = apply_actions(source, ACTIONS, destination=destination)
+    with open(destination) as f:
+        assert yaml.safe_load(f) == result == {"spec": {"name": "new"}}
+
+
+def test_apply_actions_writes_back(tmpdir):
+    source = write_source(tmpdir)
+    os.chmod(source, 0o640)
+    apply_actions(source, ACTIONS, destination=True)
+    with open(source) as f:
+        assert json.load(f) == {"spec": {"name": "new"}}
+    assert os.stat(source).st_mode & 0o777 == 0o640
+
+
+def test_write_file_to_new_file_uses_umask(tmpdir):
+    umask = os.umask(0o027)
+    os.umask(umask)
+    file_name = str(tmpdir.join("result.json"))
+    write_file({"spec": {"name": "test"}}, file_name)
+    assert os.stat(file_name).st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_apply_actions_skips_unchanged_source(tmpdir):
+    source = str(tmpdir.join("source.json"))
+    with open(source, "w") as f:
+        f.write('{"spec": {"name": "new"},\n "other": 1}')
+    os.utime(source, (0, 0))
+    # Nothing is changed, so differently formatted file isn't encoded.
+    apply_actions(source, [], destination=True, skip_unchanged=True)
+    assert os.path.getmtime(source) == 0
+    # Same value is written, but it's encoded to the same content.
+    source = write_source(tmpdir, data={"spec": {"name": "new"}})
+    apply_actions(source, ACTIONS, destination=True, skip_unchanged=True)
+    assert os.path.getmtime(source) == 0
+
+
+def test_apply_actions_raises_with_destination_for_dictionary():
+    with pytest.raises(TypeError):
+        apply_actions({"spec": {"name": "test"}}, ACTIONS, destination=True)
@@ -0,0 +1,100 @@
+import io
+
+import pytest
+import yaml
+
+from json_modify import (
+    apply_actions_yaml_stream,
+    read_yaml_documents,
+    write_yaml_documents,
+)
+
+BUNDLE = """---
+kind: Deployment
+metadata:
+  name: web
+spec:
+  replicas: 1
+---
+kind: Deployment
+metadata:
+  name: worker
+spec:
+  replicas: 1
+---
+kind: Service
+metadata:
+  name: web
+---
+"""
+
+ACTIONS = [{"action": "replace", "path": "spec/replicas", "value": 3}]
+
+
+def test_read_yaml_documents_is_lazy():
+    documents = read_yaml_documents(io.StringIO("---\na: 1\n---\nb: [\n"))
+    assert next(documents) == {"a": 1}
+    with pytest.raises(yaml.YAMLError):
+        next(documents)
+
+
+def test_write_yaml_documents():
+    output = io.StringIO()
+    assert write_yaml_documents([{"a": 1}, None, {"b": [1]}], output) == 3
+    assert list(yaml.safe_load_all(output.getvalue())) == [{"a": 1}, None, {"b": [1]}]
+
+
+def test_write_yaml_documents_keeps_key_order():
+    output = io.StringIO()
+    documents = list(read_yaml_documents(io.StringIO(BUNDLE)))[:3]
+    write_yaml_documents(documents, output)
+    assert output.getvalue() == BUNDLE[: -len("---\n")]
+
+
+def test_apply_actions_yaml_stream_with_selector():
+    output = io.StringIO()
+    count = apply_actions_yaml_stream(
+        io.StringIO(BUNDLE),
+        output,
+        ACTIONS,
+        selector={"kind": "Deployment", "metadata/name": "web"},
+    )
+    documents = list(yaml.safe_load_all(output.getvalue()))
+    assert count == 4
+    assert documents[0]["spec"]["replicas"] == 3
+    assert documents[1]["spec"]["replicas"] == 1
+    assert documents[2] == {"kind": "Service", "metadata": {"name": "web"}}
+    assert documents[3] is None
+
+
+def test_apply_actions_yaml_stream_with_function_selector(tmpdir):
+    source = str(tmpdir.join("bundle.yaml"))
+    destination = str(tmpdir.join("result.yaml"))
+    with open(source, "w") as f:
+        f.write(BUNDLE)
+    apply_actions_yaml_stream(
+        source,
+        destination,
+        ACTIONS,
+        selector=lambda document: document["kind"] == "Deployment",
+    )
+    with open(destination) as f:
+        documents = list(yaml.safe_load_all(f))
+    assert [document["spec"]["replicas"] for document in documents[:2]] == [3, 3]
+
+
+def test_apply_actions_yaml_stream_on_error():
+    errors = []
+    output = io.StringIO()
+    count = apply_actions_yaml_stream(
+        io.StringIO(BUNDLE), output, ACTIONS, on_error="collect", errors=errors
+    )
+    assert count == 3
+    assert [error.index for error in errors] == [2]
+
+
+def test_apply_actions_yaml_stream_raises_with_wrong_selector():
+    with pytest.raises(TypeError):
+        apply_actions_yaml_stream(
+            io.StringIO(BUNDLE), io.StringIO(), ACTIONS, selector="kind"
+        )